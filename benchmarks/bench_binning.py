@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark assigning characters to table cells.
+
+Compares the original linear scan with bisect and, when NumPy is
+installed, `numpy.searchsorted`, on the characters of the tables in
+`tests/cases` and on a synthetic 100x100 grid.
+"""
+
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+
+PATH = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(PATH, ".."))
+sys.path.insert(0, os.path.join(PATH, "..", "tests"))
+
+from pdfminer.pdfpage import PDFPage
+
+from pdf2csv import geometry
+from pdf2csv.geometry import merge_splits, split_indices
+from pdf2csv.pdf2csv import scrape_page_data
+
+from reference import reference_split_indices
+
+
+
+def case_batches(border_width):
+    """
+    Yield `(name, splits, values)` for both axes of every table in the
+    `tests/cases` PDFs.
+    """
+
+    for pdf_path in sorted(glob.glob(os.path.join(PATH, "..", "tests", "cases", "*.pdf"))):
+        name = os.path.splitext(os.path.basename(pdf_path))[0]
+        with open(pdf_path, "rb") as fp:
+            for page in PDFPage.get_pages(fp):
+                page_data = scrape_page_data(page, border_width=border_width)
+                chars = page_data["chars"]
+                for table in page_data["tables"]:
+                    x_splits = merge_splits(
+                        [line["x"] for line in table["y_lines"]], border_width)
+                    y_splits = merge_splits(
+                        [line["y"] for line in table["x_lines"]], border_width)
+                    yield (name, x_splits,
+                           [(c.x0 + c.x1) // 2 for c in chars])
+                    yield (name, y_splits,
+                           [(c.y0 + c.y1) // 2 for c in chars])
+
+
+
+def grid_batches(cells=100, chars=50000, seed=1):
+    rng = random.Random(seed)
+    splits = [i * 10.0 for i in range(cells + 1)]
+    extent = cells * 10
+    for _axis in "xy":
+        yield ("grid %dx%d" % (cells, cells), splits,
+               [rng.uniform(0, extent) for _ in range(chars)])
+
+
+
+def best_time(f, args, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f(*args)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+
+def run(label, batches, repeat):
+    totals = {"linear": 0, "bisect": 0, "numpy": 0}
+    numpy = geometry.numpy
+    count = 0
+    for (_name, splits, values) in batches:
+        count += len(values)
+        totals["linear"] += best_time(
+            reference_split_indices, (splits, values), repeat)
+        geometry.numpy = None
+        totals["bisect"] += best_time(split_indices, (splits, values), repeat)
+        geometry.numpy = numpy
+        if numpy is not None:
+            totals["numpy"] += best_time(split_indices, (splits, values), repeat)
+
+    print("%-18s %9d %11.4f %11.4f %11s" % (
+        label, count, totals["linear"], totals["bisect"],
+        "%.4f" % totals["numpy"] if numpy is not None else "-"))
+
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark character cell assignment.")
+    parser.add_argument(
+        "--repeat", "-r",
+        action="store", type=int, default=5,
+        help="Number of repetitions; the best time is reported.")
+    parser.add_argument(
+        "--border-width", "-b",
+        action="store", type=float, default=1.5,
+        help="Width of table borders in page units.")
+    args = parser.parse_args()
+
+    print("%-18s %9s %11s %11s %11s" % (
+        "case", "values", "linear (s)", "bisect (s)", "numpy (s)"))
+    run("tests/cases", list(case_batches(args.border_width)), args.repeat)
+    run("grid 100x100", list(grid_batches()), args.repeat)
+
+
+
+if __name__ == '__main__':
+    main()
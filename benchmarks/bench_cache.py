@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark re-running extraction with different border widths against a
+cold and a warm page cache.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+PATH = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(PATH, ".."))
+sys.path.insert(0, os.path.join(PATH, "..", "tests"))
+
+from pdf2csv import pdf_to_csv_tables, PageCache
+
+from synthetic import write_table_pdf
+
+
+
+BORDER_WIDTHS = (1, 1.5, 2)
+
+
+
+def run(pdf_path, cache, border_width):
+    start = time.perf_counter()
+    for _table in pdf_to_csv_tables(
+            pdf_path, border_width=border_width, cache=cache):
+        pass
+    return time.perf_counter() - start
+
+
+
+def main():
+    logging.getLogger("pdf2csv").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the on-disk page cache.")
+    parser.add_argument(
+        "--pages",
+        action="store", type=int, default=100,
+        help="Number of pages in the synthetic document.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = write_table_pdf(
+            os.path.join(tmp, "long.pdf"), pages=args.pages, rows=8, cols=4)
+        cache = PageCache(os.path.join(tmp, "cache"))
+
+        print("%-8s %-8s %10s %6s %8s" % (
+            "cache", "border", "time (s)", "hits", "misses"))
+        for border_width in BORDER_WIDTHS:
+            duration = run(pdf_path, None, border_width)
+            print("%-8s %-8s %10.3f %6s %8s" % (
+                "none", border_width, duration, "-", "-"))
+        for border_width in BORDER_WIDTHS:
+            cache.clear_counters()
+            duration = run(pdf_path, cache, border_width)
+            print("%-8s %-8s %10.3f %6d %8d" % (
+                "warm" if cache.hits else "cold", border_width, duration,
+                cache.hits, cache.misses))
+
+
+
+if __name__ == '__main__':
+    main()
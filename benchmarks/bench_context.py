@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark sharing one pdfminer extraction context across the pages of a
+long document, against creating a new one for every page.
+
+Besides a long synthetic document, which only uses a base-14 font, the
+pages of each PDF in `tests/cases`, whose fonts are embedded, are
+extracted `--repeat` times, as for a long document whose pages share
+their fonts. pdfminer reads little of an embedded font when it loads
+it, so the difference measured on these documents is small.
+"""
+
+import os
+import sys
+import time
+import logging
+import glob
+import argparse
+import tempfile
+import tracemalloc
+
+PATH = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(PATH, ".."))
+sys.path.insert(0, os.path.join(PATH, "..", "tests"))
+
+from pdfminer.pdfpage import PDFPage
+
+from pdf2csv.pdf2csv import create_extraction_context, scrape_page_data
+
+from synthetic import write_table_pdf
+
+
+
+def extract(pdf_path, shared, border_width, repeat):
+    context = create_extraction_context() if shared else None
+    with open(pdf_path, "rb") as fp:
+        pages = list(PDFPage.get_pages(fp))
+        for _ in range(repeat):
+            for page in pages:
+                scrape_page_data(
+                    page, border_width=border_width, context=context)
+
+
+
+def run(pdf_path, shared, border_width, repeat=1):
+    """
+    Return the time taken and the peak memory traced, each measured in
+    a separate run because tracing slows extraction down.
+    """
+
+    start = time.perf_counter()
+    extract(pdf_path, shared, border_width, repeat)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    extract(pdf_path, shared, border_width, repeat)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return duration, peak
+
+
+
+def main():
+    logging.getLogger("pdf2csv").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark a shared extraction context.")
+    parser.add_argument(
+        "--pages",
+        action="store", type=int, default=200,
+        help="Number of pages in the synthetic document.")
+    parser.add_argument(
+        "--repeat", "-r",
+        action="store", type=int, default=20,
+        help="Number of times to extract the pages of each test case.")
+    parser.add_argument(
+        "--border-width", "-b",
+        action="store", type=float, default=1.5,
+        help="Width of table borders in page units.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [
+            (pdf_path, args.repeat) for pdf_path in sorted(glob.glob(
+                os.path.join(PATH, "..", "tests", "cases", "*.pdf")))
+        ]
+        runs.append((write_table_pdf(
+            os.path.join(tmp, "long.pdf"), pages=args.pages, rows=8, cols=4),
+                     1))
+
+        print("%-20s %-10s %10s %14s" % (
+            "pdf", "context", "time (s)", "peak (MiB)"))
+        for (pdf_path, repeat) in runs:
+            for shared in (False, True):
+                (duration, peak) = run(
+                    pdf_path, shared, args.border_width, repeat)
+                print("%-20s %-10s %10.3f %14.2f" % (
+                    os.path.basename(pdf_path),
+                    "shared" if shared else "per-page",
+                    duration, peak / 2 ** 20))
+
+
+
+if __name__ == '__main__':
+    main()
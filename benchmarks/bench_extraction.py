@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the `chars` extraction mode, which reads characters without
+layout analysis, against the default `layout` mode.
+
+Both modes skip pdfminer's grouping of text boxes, so times are
+expected to be close. Output is compared as written to CSV, where
+`None` and empty cells are the same: the `chars` mode keeps spaces
+that layout analysis drops, giving empty strings in place of `None`.
+"""
+
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+import tempfile
+
+PATH = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(PATH, ".."))
+sys.path.insert(0, os.path.join(PATH, "..", "tests"))
+
+from pdf2csv import EXTRACTION_MODES, pdf_to_csv_tables
+
+from synthetic import write_table_pdf
+
+
+
+def best_time(pdf_path, extraction, border_width, repeat):
+    best = None
+    tables = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tables = list(pdf_to_csv_tables(
+            pdf_path, border_width=border_width, extraction=extraction))
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best, [
+        [[text or "" for text in row] for row in table] for table in tables]
+
+
+
+def main():
+    logging.getLogger("pdf2csv").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark character extraction modes.")
+    parser.add_argument(
+        "--repeat", "-r",
+        action="store", type=int, default=3,
+        help="Number of repetitions; the best time is reported.")
+    parser.add_argument(
+        "--pages",
+        action="store", type=int, default=20,
+        help="Number of pages in the synthetic document.")
+    parser.add_argument(
+        "--border-width", "-b",
+        action="store", type=float, default=1.5,
+        help="Width of table borders in page units.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_paths = sorted(glob.glob(os.path.join(PATH, "..", "tests", "cases", "*.pdf")))
+        pdf_paths.append(write_table_pdf(
+            os.path.join(tmp, "synthetic.pdf"),
+            pages=args.pages, rows=30, cols=8))
+
+        print("%-20s %12s %12s %8s %10s" % (
+            "pdf", "layout (s)", "chars (s)", "speedup", "same csv"))
+        for pdf_path in pdf_paths:
+            results = {}
+            for extraction in EXTRACTION_MODES:
+                results[extraction] = best_time(
+                    pdf_path, extraction, args.border_width, args.repeat)
+            print("%-20s %12.3f %12.3f %7.1fx %10s" % (
+                os.path.basename(pdf_path),
+                results["layout"][0], results["chars"][0],
+                results["layout"][0] / results["chars"][0],
+                results["layout"][1] == results["chars"][1]))
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark rectangle grouping against the original pairwise algorithm.
+
+Rectangles are laid out as the cells of several ruled tables, as pdfminer
+reports them for a page of a financial statement.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+PATH = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(PATH, ".."))
+sys.path.insert(0, os.path.join(PATH, "..", "tests"))
+
+from pdf2csv.geometry import group_bboxes
+
+from reference import reference_group_bboxes
+
+
+
+def table_bboxes(count, tables=4, seed=1):
+    """
+    Return `count` cell bounding boxes spread over `tables` grids, in a
+    shuffled order.
+    """
+
+    rng = random.Random(seed)
+    bboxes = []
+    per_table = max(1, count // tables)
+    side = max(1, int(per_table ** 0.5))
+    for t in range(tables):
+        x_offset = t * (side * 20 + 50)
+        for i in range(per_table):
+            x0 = x_offset + (i % side) * 20
+            y0 = (i // side) * 10
+            bboxes.append({
+                "x": (x0, x0 + 20),
+                "y": (y0, y0 + 10),
+            })
+    rng.shuffle(bboxes)
+    return bboxes[:count]
+
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return time.perf_counter() - start, result
+
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark rectangle grouping.")
+    parser.add_argument(
+        "--sizes",
+        action="store", default="100,1000,10000",
+        help="Comma-separated rectangle counts.")
+    parser.add_argument(
+        "--reference-max",
+        action="store", type=int, default=10000,
+        help="Largest count to run the reference algorithm on.")
+    parser.add_argument(
+        "--border-width", "-b",
+        action="store", type=float, default=1.5,
+        help="Width of table borders in page units.")
+    args = parser.parse_args()
+
+    print("%8s %12s %14s %9s" % ("rects", "engine (s)", "reference (s)", "speedup"))
+    for count in [int(v) for v in args.sizes.split(",")]:
+        bboxes = table_bboxes(count)
+        engine_time, engine_groups = timed(
+            group_bboxes, bboxes, args.border_width)
+        if count > args.reference_max:
+            print("%8d %12.4f %14s %9s" % (count, engine_time, "-", "-"))
+            continue
+        reference_time, reference_groups = timed(
+            reference_group_bboxes, bboxes, args.border_width)
+        assert engine_groups == reference_groups
+        print("%8d %12.4f %14.4f %8.0fx" % (
+            count, engine_time, reference_time, reference_time / engine_time))
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the memory held for one page's characters and rectangles.
+
+Compares the dictionaries originally built by `scrape_page_data` with
+the slotted records, with and without the optional character fields.
+Memory still allocated once the pdfminer layout is released is measured
+with `tracemalloc`, less what pdfminer retains itself.
+"""
+
+import os
+import sys
+import glob
+import gc
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+PATH = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(PATH, ".."))
+sys.path.insert(0, os.path.join(PATH, "..", "tests"))
+
+from pdfminer.pdfpage import PDFPage
+
+from pdf2csv.model import CHAR_OPTIONAL_FIELDS
+from pdf2csv.pdf2csv import create_extraction_context, \
+    layout_segment_groups, char_data
+
+from reference import reference_page_elements
+from synthetic import write_table_pdf
+
+
+
+def records(layout, char_fields):
+    page_chars = []
+    for element in layout:
+        if type(element).__name__ != "LTTextBoxHorizontal":
+            continue
+        for o in element._objs:
+            if type(o).__name__ != "LTTextLineHorizontal":
+                continue
+            if not o.get_text().strip():
+                continue
+            for c in o._objs:
+                if type(c).__name__ == "LTAnno":
+                    continue
+                page_chars.append(char_data(c, char_fields))
+    return {
+        "chars": page_chars,
+        "groups": layout_segment_groups(layout),
+    }
+
+
+
+def retained_size(context, page, f):
+    """
+    Interpret `page` and build its elements with `f`. Return the number
+    of bytes still allocated once the pdfminer layout is released, and
+    the elements.
+    """
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    context["interpreter"].process_page(page)
+    result = f(context["device"].get_result())
+    context["device"].result = None
+    context["device"].cur_item = None
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, result
+
+
+
+def main():
+    logging.getLogger("pdf2csv").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark memory held for page elements.")
+    parser.parse_args()
+
+    representations = (
+        ("none", lambda layout: {"chars": [], "groups": []}),
+        ("dicts", reference_page_elements),
+        ("records", lambda layout: records(layout, None)),
+        ("records+fields", lambda layout: records(layout, CHAR_OPTIONAL_FIELDS)),
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_paths = sorted(glob.glob(os.path.join(PATH, "..", "tests", "cases", "*.pdf")))
+        pdf_paths.append(write_table_pdf(
+            os.path.join(tmp, "synthetic.pdf"), rows=40, cols=8))
+
+        print("%-18s %8s %8s %12s %12s %16s" % (
+            "pdf", "chars", "rects", "dicts (KiB)", "records (KiB)",
+            "+fields (KiB)"))
+        for pdf_path in pdf_paths:
+            context = create_extraction_context()
+            sizes = []
+            result = {"chars": [], "groups": []}
+            with open(pdf_path, "rb") as fp:
+                page = next(PDFPage.get_pages(fp))
+                # Warm up caches so that only the page elements are counted.
+                context["interpreter"].process_page(page)
+                for (_name, f) in representations:
+                    (size, elements) = retained_size(context, page, f)
+                    sizes.append(size)
+                    if elements["chars"] or elements["groups"]:
+                        result = elements
+            # Subtract what pdfminer itself retains.
+            sizes = [size - sizes[0] for size in sizes[1:]]
+            print("%-18s %8d %8d %12.1f %12.1f %16.1f" % (
+                os.path.basename(pdf_path),
+                len(result["chars"]), len(result["groups"]),
+                sizes[0] / 1024, sizes[1] / 1024, sizes[2] / 1024))
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+"""
+Write a synthetic PDF of ruled tables for benchmarking.
+"""
+
+import os
+import sys
+import argparse
+
+PATH = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(PATH, "..", "tests"))
+
+from synthetic import write_table_pdf
+
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic PDF of ruled tables.")
+    parser.add_argument(
+        "--pages",
+        action="store", type=int, default=10,
+        help="Number of pages.")
+    parser.add_argument(
+        "--rows",
+        action="store", type=int, default=10,
+        help="Number of rows in each table.")
+    parser.add_argument(
+        "--cols",
+        action="store", type=int, default=5,
+        help="Number of columns in each table.")
+    parser.add_argument(
+        "--tables",
+        action="store", type=int, default=1,
+        help="Number of tables on each page.")
+    parser.add_argument(
+        "--prose-pages",
+        action="store", type=int, default=0,
+        help="Number of pages of text without tables after each table page.")
+    parser.add_argument(
+        "pdf",
+        metavar="PDF",
+        help="Path to PDF output file.")
+    args = parser.parse_args()
+
+    write_table_pdf(
+        args.pdf,
+        pages=args.pages, rows=args.rows, cols=args.cols,
+        tables=args.tables, prose_pages=args.prose_pages)
+
+
+
+if __name__ == '__main__':
+    main()
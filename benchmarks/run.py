@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+"""
+Run the benchmark suite on synthetic ruled-table PDFs and save the
+results as JSON.
+
+Each case is a generated document. For each case, the stages of
+extraction are timed separately: `scrape_page_data` on every page,
+`geo_to_tables` on ruling segment groups already extracted,
+`table_to_rows` on tables and characters already extracted, and
+`pdf_to_csv_stream` from end to end. Each is repeated and the best and median times are
+reported, and its peak memory is traced in a separate run.
+
+Pass the JSON of an earlier run with `--compare` to print the ratio of
+each time to the earlier one.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+
+PATH = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(PATH, ".."))
+sys.path.insert(0, os.path.join(PATH, "..", "tests"))
+
+from pdfminer.pdfpage import PDFPage
+
+from pdf2csv import __version__, pdf_to_csv_stream
+from pdf2csv.pdf2csv import create_extraction_context, \
+    extract_page_elements, scrape_page_data, geo_to_tables, table_to_rows
+from pdf2csv.geometry import index_chars, query_chars
+
+from synthetic import write_table_pdf
+
+
+
+# pdfminer's layout analysis grows faster than linearly with the number
+# of characters on a page, so the largest grid uses `chars` extraction.
+CASES = (
+    {"name": "grid-10x5", "pages": 20, "rows": 10, "cols": 5, "tables": 1},
+    {"name": "grid-40x10", "pages": 2, "rows": 40, "cols": 10, "tables": 1},
+    {"name": "grid-60x12", "pages": 1, "rows": 60, "cols": 12, "tables": 1},
+    {"name": "grid-120x20", "pages": 1, "rows": 120, "cols": 20, "tables": 1,
+     "extraction": "chars"},
+    {"name": "multi-4x15x6", "pages": 2, "rows": 15, "cols": 6, "tables": 4},
+    {"name": "lines-40x10", "pages": 2, "rows": 40, "cols": 10, "tables": 1,
+     "ruling": "line"},
+    {"name": "prose-mixed", "pages": 20, "rows": 10, "cols": 5, "tables": 1,
+     "prose_pages": 3},
+)
+
+BENCHMARKS = (
+    "scrape_page_data",
+    "geo_to_tables",
+    "table_to_rows",
+    "pdf_to_csv_stream",
+)
+
+BORDER_WIDTH = 1.5
+
+# Ratios above this are marked as regressions by `--compare`.
+REGRESSION_RATIO = 1.10
+
+
+
+def load_pages(fp):
+    return list(PDFPage.get_pages(fp))
+
+
+
+def prepare(pdf_path, extraction):
+    """
+    Extract the page elements, tables and character indices that the
+    stage benchmarks start from.
+    """
+
+    context = create_extraction_context()
+    pages = []
+    with open(pdf_path, "rb") as fp:
+        for page in load_pages(fp):
+            elements = extract_page_elements(
+                page, context=context, extraction=extraction)
+            tables = geo_to_tables(
+                elements["groups"], border_width=BORDER_WIDTH)
+            pages.append({
+                "groups": elements["groups"],
+                "char_index": index_chars(elements["chars"]),
+                "tables": tables,
+            })
+    return pages
+
+
+
+def bench_functions(pdf_path, extraction=None):
+    """
+    Return a dictionary of a function to run for each benchmark.
+    """
+
+    prepared = prepare(pdf_path, extraction)
+
+    def run_scrape_page_data():
+        context = create_extraction_context()
+        with open(pdf_path, "rb") as fp:
+            for page in load_pages(fp):
+                scrape_page_data(
+                    page, border_width=BORDER_WIDTH, context=context,
+                    extraction=extraction)
+
+    def run_geo_to_tables():
+        for page in prepared:
+            geo_to_tables(page["groups"], border_width=BORDER_WIDTH)
+
+    def run_table_to_rows():
+        for page in prepared:
+            for table in page["tables"]:
+                table_to_rows(
+                    table,
+                    query_chars(page["char_index"], table["bbox"], BORDER_WIDTH),
+                    border_width=BORDER_WIDTH)
+
+    def run_pdf_to_csv_stream():
+        pdf_to_csv_stream(
+            pdf_path, io.StringIO(),
+            border_width=BORDER_WIDTH, extraction=extraction)
+
+    return {
+        "scrape_page_data": run_scrape_page_data,
+        "geo_to_tables": run_geo_to_tables,
+        "table_to_rows": run_table_to_rows,
+        "pdf_to_csv_stream": run_pdf_to_csv_stream,
+    }
+
+
+
+def measure(f, repeat):
+    """
+    Return the times of `repeat` runs of `f` and its peak traced memory
+    in a further run, because tracing slows it down.
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return times, peak
+
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=PATH, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+
+def package_version(name):
+    try:
+        module = __import__(name)
+    except ImportError:
+        return None
+    return getattr(module, "__version__", None)
+
+
+
+def run_suite(cases, benchmarks, repeat, tmp):
+    results = []
+    for case in cases:
+        pdf_path = write_table_pdf(
+            os.path.join(tmp, case["name"] + ".pdf"),
+            pages=case["pages"], rows=case["rows"], cols=case["cols"],
+            tables=case["tables"], prose_pages=case.get("prose_pages", 0),
+            ruling=case.get("ruling", "rect"))
+        functions = bench_functions(pdf_path, case.get("extraction"))
+
+        for name in benchmarks:
+            (times, peak) = measure(functions[name], repeat)
+            result = {
+                "case": case["name"],
+                "benchmark": name,
+                "min": min(times),
+                "median": statistics.median(times),
+                "times": times,
+                "peak_bytes": peak,
+            }
+            results.append(result)
+            print("%-14s %-18s %10.4f %10.4f %10.2f" % (
+                case["name"], name, result["min"], result["median"],
+                peak / 2 ** 20))
+            sys.stdout.flush()
+
+    return results
+
+
+
+def compare(results, path):
+    with open(path, encoding="utf-8") as fp:
+        previous = {
+            (result["case"], result["benchmark"]): result
+            for result in json.load(fp)["results"]
+        }
+
+    print()
+    print("%-14s %-18s %10s %10s %8s" % (
+        "case", "benchmark", "min ratio", "peak ratio", ""))
+    regressions = 0
+    for result in results:
+        old = previous.get((result["case"], result["benchmark"]))
+        if old is None:
+            continue
+        time_ratio = result["min"] / old["min"]
+        peak_ratio = result["peak_bytes"] / max(1, old["peak_bytes"])
+        regression = time_ratio > REGRESSION_RATIO
+        regressions += regression
+        print("%-14s %-18s %10.3f %10.3f %8s" % (
+            result["case"], result["benchmark"], time_ratio, peak_ratio,
+            "SLOWER" if regression else ""))
+
+    return regressions
+
+
+
+def main():
+    logging.getLogger("pdf2csv").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(
+        description="Run the benchmark suite on synthetic PDFs.")
+    parser.add_argument(
+        "--repeat", "-r",
+        action="store", type=int, default=3,
+        help="Number of timed repetitions of each benchmark.")
+    parser.add_argument(
+        "--case", "-c",
+        action="append", choices=[case["name"] for case in CASES],
+        help="Run only this case. May be given more than once.")
+    parser.add_argument(
+        "--benchmark", "-k",
+        action="append", choices=BENCHMARKS,
+        help="Run only this benchmark. May be given more than once.")
+    parser.add_argument(
+        "--output", "-o",
+        action="store",
+        help="Path to JSON results file.")
+    parser.add_argument(
+        "--compare",
+        action="store",
+        help="Path to JSON results of an earlier run to compare against.")
+    args = parser.parse_args()
+
+    cases = [case for case in CASES if not args.case or case["name"] in args.case]
+    benchmarks = args.benchmark or BENCHMARKS
+
+    print("%-14s %-18s %10s %10s %10s" % (
+        "case", "benchmark", "min (s)", "median (s)", "peak (MiB)"))
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run_suite(cases, benchmarks, args.repeat, tmp)
+
+    data = {
+        "meta": {
+            "pdf2csv": __version__,
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "pdfminer": package_version("pdfminer"),
+            "numpy": package_version("numpy"),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "repeat": args.repeat,
+            "border_width": BORDER_WIDTH,
+            "cases": cases,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            json.dump(data, fp, indent=2)
+            fp.write("\n")
+
+    if args.compare:
+        if compare(results, args.compare):
+            sys.exit(1)
+
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,47 @@
 name = "pdf2csv"
 
+import importlib
+
 from .version import __version__
-from .pdf2csv import DEFAULT_BORDER_WIDTH, pdf_to_csv_tables, pdf_to_csv_stream
+from .defaults import DEFAULT_BORDER_WIDTH, EXTRACTION_MODES, DEFAULT_EXTRACTION
+from .model import Table
+from .writers import WRITERS, DEFAULT_FORMAT
+from .geometry import group_bboxes, merge_splits
+from .cache import DEFAULT_CACHE_SIZE, PageCache
+from .template import PageTemplate
+from .stats import Stats
+from .budget import BUDGET_ACTIONS, PageBudget
+
+# Names from modules that import pdfminer, which is slow, are imported on
+# first use, so that importing the package alone stays fast.
+LAZY_NAMES = {
+    "pdf_to_tables": ".pdf2csv",
+    "pdf_to_csv_tables": ".pdf2csv",
+    "pdf_to_stream": ".pdf2csv",
+    "pdf_to_csv_stream": ".pdf2csv",
+    "parse_page_range": ".pages",
+}
+
+LAZY_MODULES = (
+    "pdf2csv",
+    "pages",
+)
+
+
+
+def __getattr__(attr):
+    if attr in LAZY_MODULES:
+        return importlib.import_module("." + attr, __name__)
+    try:
+        module_name = LAZY_NAMES[attr]
+    except KeyError:
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, attr)) from None
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    globals()[attr] = value
+    return value
+
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_NAMES) | set(LAZY_MODULES))
@@ -0,0 +1,212 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Asyncio interface to pdf2csv.
+
+Pages are extracted one at a time in an executor, so the event loop is
+never blocked for longer than it takes to hand over a page. Cancelling
+the consuming task stops extraction after the page in progress.
+
+A thread pool keeps each document open between pages. A process pool
+avoids the global interpreter lock, but reopens the document for every
+page. Pass the same `asyncio.Semaphore` as `semaphore` to every call to
+limit the number of pages extracted at once across all documents.
+"""
+
+import logging
+import asyncio
+import concurrent.futures
+
+from .defaults import DEFAULT_BORDER_WIDTH
+from .stitch import TableStitcher
+from .pdf2csv import iter_page_tables, document_page_numbers, \
+    _page_slice_tables
+
+
+
+LOG = logging.getLogger('pdf2csv')
+
+
+
+def _iter_materialized(pages):
+    """
+    Compute the rows of every table of `pages` as it is produced, so
+    that this is done in the executor rather than the event loop.
+    """
+
+    for (p, tables, seconds) in pages:
+        for table in tables:
+            table.materialize()
+        yield (p, tables, seconds)
+
+
+
+async def _submit(executor, semaphore, f, *args):
+    """
+    Run `f(*args)` in `executor` once `semaphore` allows it, and return
+    its `concurrent.futures.Future`.
+
+    The semaphore is released when `f` returns, rather than when its
+    result is awaited, so that a call still running after its caller
+    was cancelled is still counted.
+    """
+
+    if semaphore is None:
+        return executor.submit(f, *args)
+
+    loop = asyncio.get_running_loop()
+
+    def release(_future):
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            pass  # The loop is closed.
+
+    await semaphore.acquire()
+    try:
+        future = executor.submit(f, *args)
+    except BaseException:
+        semaphore.release()
+        raise
+    future.add_done_callback(release)
+    return future
+
+
+
+async def _thread_pages(pdf_path, executor, semaphore, kwargs):
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    pages = _iter_materialized(iter_page_tables(pdf_path, **kwargs))
+    step = None
+    try:
+        while True:
+            step = await _submit(executor, semaphore, next, pages, None)
+            page = await asyncio.wrap_future(step)
+            if page is None:
+                break
+            yield page
+    finally:
+        if step is not None and not step.done():
+            # A page is still being extracted and the generator cannot
+            # be closed until it returns.
+            step.add_done_callback(lambda _future: pages.close())
+        else:
+            pages.close()
+        if own_executor:
+            executor.shutdown(wait=False)
+
+
+
+async def _process_pages(pdf_path, executor, semaphore, kwargs):
+    page_ranges = kwargs.pop("page_ranges")
+    page_numbers = await asyncio.wrap_future(await _submit(
+        executor, semaphore, document_page_numbers, pdf_path, page_ranges))
+
+    cache = kwargs.get("cache")
+    stats = kwargs.get("stats")
+
+    for p in page_numbers:
+        (pages, hits, misses, page_stats, page_template, page_budget) = \
+            await asyncio.wrap_future(await _submit(
+                executor, semaphore, _page_slice_tables, pdf_path, [p], kwargs))
+        if cache is not None:
+            cache.hits += hits
+            cache.misses += misses
+        if page_stats is not None:
+            stats.merge(page_stats)
+        if page_template is not None:
+            kwargs["template"].merge(page_template)
+        if page_budget is not None:
+            kwargs["budget"].merge(page_budget)
+        for page in pages:
+            yield page
+
+
+
+async def apdf_to_tables(
+        pdf_path,
+        executor=None,
+        semaphore=None,
+        page_first=None, page_last=None,
+        page_ranges=None,
+        stitch=False,
+        drop_headers=False,
+        **kwargs
+):
+    """
+    Asynchronously yield a `Table` for each table found in `pdf_path`,
+    in page order, with its rows already computed.
+
+    Pages are extracted in `executor`, a thread or process pool, or else
+    in a thread of its own. With an `asyncio.Semaphore` as `semaphore`,
+    each page waits for it before extraction starts. Other arguments
+    are as for `pdf_to_tables`, except `workers`.
+    """
+
+    stitcher = None
+    if stitch:
+        stitcher = TableStitcher(
+            kwargs.get("border_width") or DEFAULT_BORDER_WIDTH, drop_headers)
+
+    if page_ranges is None:
+        page_ranges = [(page_first, page_last)]
+    kwargs["page_ranges"] = page_ranges
+
+    LOG.info("%s: Searching for pages...", pdf_path)
+
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        pages = _process_pages(pdf_path, executor, semaphore, kwargs)
+    else:
+        pages = _thread_pages(pdf_path, executor, semaphore, kwargs)
+
+    try:
+        async for (p, tables, seconds) in pages:
+            LOG.info("Page %d: %d tables in %.3fs", p, len(tables), seconds)
+            for table in tables:
+                if stitcher is not None:
+                    table = stitcher.stitch(table)
+                yield table
+    finally:
+        await pages.aclose()
+
+
+
+async def apdf_to_csv_tables(pdf_path, **kwargs):
+    """
+    Asynchronously yield the rows of each table found in `pdf_path`, in
+    page order, as a list of lists. Arguments are as for
+    `apdf_to_tables`.
+
+    With `stitch`, the rows of a table and of its continuations on
+    later pages are yielded as a single list.
+    """
+
+    tables = apdf_to_tables(pdf_path, **kwargs)
+    rows = None
+    try:
+        async for table in tables:
+            if not kwargs.get("stitch"):
+                yield table.rows
+            elif table.continues is None:
+                if rows is not None:
+                    yield rows
+                rows = list(table.rows)
+            else:
+                rows += table.rows
+    finally:
+        await tables.aclose()
+    if rows is not None:
+        yield rows
@@ -0,0 +1,340 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Convert many PDF files in one process pool.
+
+Each input is written to its own file in an output directory, as CSV
+or another format of `WRITERS`.
+Files are converted whole by a single worker, so one interpreter and
+one set of imports serve many files.
+"""
+
+import os
+import glob
+import time
+import logging
+import tempfile
+import collections
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+from .pdf2csv import iter_page_tables
+from .defaults import DEFAULT_BORDER_WIDTH
+from .stitch import stitch_tables
+from .writers import WRITERS, DEFAULT_FORMAT, create_writer, write_tables
+from .stats import Stats
+
+
+
+LOG = logging.getLogger('pdf2csv')
+
+
+
+PDF_SUFFIX = ".pdf"
+
+BATCH_TASKS_PER_WORKER = 4
+
+
+
+def expand_inputs(paths):
+    """
+    Return a list of `(pdf_path, name)` pairs for `paths`, which may be
+    files, directories searched recursively for PDF files, or glob
+    patterns. `name` is the path of the output relative to the output
+    directory, without its suffix.
+
+    Raise `ValueError` if a path matches nothing or if two inputs would
+    be written to the same output.
+    """
+
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for (dirpath, dirnames, filenames) in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(PDF_SUFFIX):
+                        found.append(os.path.join(dirpath, filename))
+            inputs += [
+                (pdf_path, os.path.splitext(os.path.relpath(pdf_path, path))[0])
+                for pdf_path in found
+            ]
+        elif os.path.exists(path):
+            inputs.append((path, os.path.splitext(os.path.basename(path))[0]))
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path, recursive=True))
+            if not matches:
+                raise ValueError("No files match %s" % path)
+            inputs += expand_inputs(matches)
+        else:
+            raise ValueError("No such file or directory: %s" % path)
+
+    seen = set()
+    names = {}
+    unique = []
+    for (pdf_path, name) in inputs:
+        real_path = os.path.realpath(pdf_path)
+        if real_path in seen:
+            continue
+        seen.add(real_path)
+        if name in names:
+            raise ValueError("%s and %s would both be written to %s" % (
+                names[name], pdf_path, name))
+        names[name] = pdf_path
+        unique.append((pdf_path, name))
+
+    return unique
+
+
+
+def is_up_to_date(pdf_path, out_path):
+    try:
+        return os.path.getmtime(out_path) >= os.path.getmtime(pdf_path)
+    except OSError:
+        return False
+
+
+
+def convert_file(pdf_path, out_path, kwargs, output_format=DEFAULT_FORMAT):
+    """
+    Write the tables of `pdf_path` to `out_path` in `output_format`,
+    one of `WRITERS`, and return a summary
+    of the conversion. Errors are logged and reported in the summary
+    instead of being raised.
+
+    If `kwargs` has a `stats` collector, statistics are collected for
+    this file alone and added to the summary. Likewise, if it has a
+    `budget`, the pages of this file that went over it are listed as
+    `over_budget`. With `stitch` and `drop_headers`, tables continuing
+    across pages are stitched as for `pdf_to_tables`.
+    """
+
+    kwargs = dict(kwargs)
+    stitch = kwargs.pop("stitch", False)
+    drop_headers = kwargs.pop("drop_headers", False)
+
+    stats = None
+    if kwargs.get("stats") is not None:
+        stats = Stats()
+        kwargs = dict(kwargs, stats=stats)
+
+    budget = None
+    if kwargs.get("budget") is not None:
+        budget = kwargs["budget"].copy()
+        kwargs = dict(kwargs, budget=budget)
+
+    result = {
+        "input": pdf_path,
+        "output": out_path,
+        "status": "ok",
+        "pages": 0,
+        "tables": 0,
+        "seconds": None,
+    }
+
+    def tables():
+        for (_p, page_tables, _seconds) in iter_page_tables(pdf_path, **kwargs):
+            result["pages"] += 1
+            result["tables"] += len(page_tables)
+            yield from page_tables
+
+    if WRITERS[output_format].binary:
+        mode = {"mode": "wb"}
+    else:
+        mode = {"mode": "w", "encoding": "utf-8", "newline": ""}
+
+    start = time.perf_counter()
+    temp_path = None
+    try:
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(out_path) or ".",
+                suffix=".tmp", delete=False,
+                **mode
+        ) as out:
+            temp_path = out.name
+            table_iter = tables()
+            if stitch:
+                table_iter = stitch_tables(
+                    table_iter,
+                    kwargs.get("border_width") or DEFAULT_BORDER_WIDTH,
+                    drop_headers
+                )
+            write_tables(
+                table_iter, create_writer(output_format, out, stats=stats))
+        os.replace(temp_path, out_path)
+    except Exception as error:  # pylint: disable=broad-except
+        LOG.error("%s: %s", pdf_path, error)
+        result["status"] = "error"
+        result["error"] = "%s: %s" % (type(error).__name__, error)
+        if temp_path is not None and os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+    result["seconds"] = time.perf_counter() - start
+    if stats is not None:
+        result["stats"] = stats.as_dict()
+    if budget is not None:
+        result["over_budget"] = budget.report
+    return result
+
+
+
+def _convert_file_task(pdf_path, out_path, kwargs, output_format):
+    """
+    Run `convert_file` in a worker process. Return its summary and the
+    worker's copy of any `PageTemplate`, which would otherwise be lost.
+    """
+
+    template = kwargs.get("template")
+    if template is not None:
+        template.clear_counters()
+    return (convert_file(pdf_path, out_path, kwargs, output_format), template)
+
+
+
+def batch_convert(
+        paths, output_dir,
+        workers=None,
+        force=False,
+        output_format=DEFAULT_FORMAT,
+        **kwargs
+):
+    """
+    Convert the PDF files selected by `paths`, as for `expand_inputs`,
+    to files in `output_dir` in `output_format`, and yield a summary of each file as it
+    completes.
+
+    Files are converted in a pool of `workers` processes, or in this
+    process if `workers` is 1. Files whose output is newer than the
+    input are skipped unless `force` is set. Other keyword arguments are
+    passed to `convert_file`. If they include `stats`, each file's
+    summary has its own statistics. A `template` learned in a worker is
+    merged into `template`, as for `pdf_to_tables`.
+
+    If a worker dies, the files in progress are retried one at a time
+    in a new pool, and only a file that kills its worker alone is
+    reported as an error.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    tasks = []
+    for (pdf_path, name) in expand_inputs(paths):
+        out_path = os.path.join(
+            output_dir, name + WRITERS[output_format].suffix)
+        if not force and is_up_to_date(pdf_path, out_path):
+            LOG.debug("%s: Up to date", pdf_path)
+            yield {
+                "input": pdf_path,
+                "output": out_path,
+                "status": "skipped",
+            }
+            continue
+        tasks.append((pdf_path, out_path))
+
+    LOG.info("Converting %d files with %d workers", len(tasks), workers)
+
+    if workers <= 1:
+        for (pdf_path, out_path) in tasks:
+            yield convert_file(pdf_path, out_path, kwargs, output_format)
+        return
+
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    pending = {}
+    tasks = collections.deque(tasks)
+    # Files that were in progress when a worker died. Any of them may
+    # have killed it, so each is retried alone.
+    suspects = collections.deque()
+    try:
+        while tasks or pending or suspects:
+            alone = bool(suspects)
+            queue = suspects if alone else tasks
+            limit = 1 if alone else workers * BATCH_TASKS_PER_WORKER
+            broken = False
+            while queue and len(pending) < limit:
+                (pdf_path, out_path) = queue.popleft()
+                try:
+                    future = executor.submit(
+                        _convert_file_task, pdf_path, out_path, kwargs,
+                        output_format)
+                except BrokenProcessPool:
+                    queue.appendleft((pdf_path, out_path))
+                    broken = True
+                    break
+                pending[future] = (pdf_path, out_path)
+
+            if not broken:
+                (done, _not_done) = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                broken = any(
+                    isinstance(future.exception(), BrokenProcessPool)
+                    for future in done
+                )
+            if broken:
+                # Every file still in progress fails with the pool.
+                concurrent.futures.wait(pending)
+                done = list(pending)
+
+            for future in done:
+                (pdf_path, out_path) = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    (result, template) = future.result()
+                    if template is not None:
+                        kwargs["template"].merge(template)
+                    yield result
+                elif isinstance(error, BrokenProcessPool) and not alone:
+                    suspects.append((pdf_path, out_path))
+                else:
+                    # The worker itself failed, eg. it was killed.
+                    LOG.error("%s: %s", pdf_path, error)
+                    yield {
+                        "input": pdf_path,
+                        "output": out_path,
+                        "status": "error",
+                        "error": "%s: %s" % (type(error).__name__, error),
+                    }
+
+            if broken:
+                LOG.warning("A worker died. Retrying %d files in a new pool",
+                            len(suspects))
+                executor.shutdown()
+                executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers)
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+
+def summarize(results):
+    """
+    Return a summary of the results of `batch_convert`, with the count
+    of files by status, the number of pages over budget and the list of
+    results.
+    """
+
+    counts = collections.Counter(result["status"] for result in results)
+    return {
+        "files": len(results),
+        "ok": counts["ok"],
+        "skipped": counts["skipped"],
+        "error": counts["error"],
+        "over_budget": sum(
+            len(result.get("over_budget", ())) for result in results),
+        "results": sorted(results, key=lambda result: result["input"]),
+    }
@@ -0,0 +1,271 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Limits on the resources used to extract each page.
+
+A malformed or pathological page can hold vast numbers of characters or
+ruling segments, and take far longer than the rest of its document. A
+`PageBudget` is passed down through extraction as `budget`. While a
+page is interpreted, its characters and ruling segments are counted as
+they are drawn, and interpretation is stopped as soon as the page goes
+over budget. The page is checked again between the later stages of its
+extraction. A page over budget is skipped, or keeps only the tables
+completed before it went over, and extraction continues with the next
+page. Each such page is recorded in the budget's `report`.
+"""
+
+import os
+import time
+import logging
+import functools
+
+
+
+LOG = logging.getLogger('pdf2csv')
+
+
+
+BUDGET_ACTIONS = (
+    "skip",
+    "partial",
+)
+DEFAULT_BUDGET_ACTION = "skip"
+
+STATM_PATH = "/proc/self/statm"
+
+# Elements drawn on a page between checks of its time and memory while
+# it is interpreted.
+METER_INTERVAL = 100
+
+
+
+def process_memory():
+    """
+    Return the resident memory of this process in bytes, or `None` if
+    it cannot be read.
+
+    Only Linux reports the current resident memory, in `STATM_PATH`.
+    Elsewhere only the peak is available, which does not measure the
+    growth of memory while a page is extracted, so it is not used.
+    """
+
+    try:
+        with open(STATM_PATH) as fp:
+            return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+
+@functools.lru_cache(maxsize=None)
+def memory_supported():
+    """
+    Return `True` if the resident memory of this process can be read,
+    logging a warning once if not.
+    """
+
+    if process_memory() is None:
+        LOG.warning("Cannot read the current memory use of this process "
+                    "on this platform. Page memory limits are ignored.")
+        return False
+    return True
+
+
+
+class PageBudgetExceeded(Exception):
+    """
+    Raised when a page goes over one of the limits of its budget.
+    """
+
+    def __init__(self, resource_name, value, limit, stage):
+        super().__init__("%s %s over limit of %s in %s" % (
+            resource_name, _format(value), _format(limit), stage))
+        self.resource_name = resource_name
+        self.value = value
+        self.limit = limit
+        self.stage = stage
+
+
+
+def _format(value):
+    if isinstance(value, float):
+        return "%0.3f" % value
+    return str(value)
+
+
+
+class PageMeter:
+    """
+    The resources used so far by one page, measured from when the meter
+    is created, and checked against the limits of a `PageBudget`.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.start = time.perf_counter()
+        self.memory = None
+        if budget.memory is not None and memory_supported():
+            self.memory = process_memory()
+        self.chars = 0
+        self.segments = 0
+        self.drawn = 0
+
+    def draw(self, stage, chars=0, segments=0):
+        """
+        Count `chars` and ruling `segments` drawn on the page during
+        `stage`, and raise `PageBudgetExceeded` if the page has gone
+        over a limit of its budget. Time and memory are only checked
+        every `METER_INTERVAL` calls.
+        """
+
+        self.chars += chars
+        self.segments += segments
+        budget = self.budget
+
+        if budget.chars is not None and self.chars > budget.chars:
+            raise PageBudgetExceeded("chars", self.chars, budget.chars, stage)
+
+        if budget.segments is not None and self.segments > budget.segments:
+            raise PageBudgetExceeded(
+                "segments", self.segments, budget.segments, stage)
+
+        self.drawn += 1
+        if not self.drawn % METER_INTERVAL:
+            self.check(stage)
+
+    def check(self, stage, segments=None, chars=None):
+        """
+        Raise `PageBudgetExceeded` if the page has gone over a limit of
+        its budget by the end of `stage`. `segments` and `chars` are
+        counts of the page's elements, if known at this stage.
+        """
+
+        budget = self.budget
+
+        if budget.segments is not None and segments is not None and \
+                segments > budget.segments:
+            raise PageBudgetExceeded(
+                "segments", segments, budget.segments, stage)
+
+        if budget.chars is not None and chars is not None and \
+                chars > budget.chars:
+            raise PageBudgetExceeded("chars", chars, budget.chars, stage)
+
+        if budget.seconds is not None:
+            seconds = time.perf_counter() - self.start
+            if seconds > budget.seconds:
+                raise PageBudgetExceeded(
+                    "seconds", seconds, budget.seconds, stage)
+
+        if budget.memory is not None and self.memory is not None:
+            memory = process_memory() - self.memory
+            if memory > budget.memory:
+                raise PageBudgetExceeded(
+                    "memory", memory, budget.memory, stage)
+
+
+
+class PageBudget:
+    """
+    Limits on the resources used to extract each page: `seconds` of wall
+    clock time, numbers of ruling `segments` and `chars`, and `memory`,
+    the growth in bytes of the process's resident memory. Limits that
+    are `None` are not checked. The `memory` limit is only checked where
+    `process_memory` can read the current resident memory, and is
+    otherwise ignored with a warning.
+
+    While a page is interpreted, `segments` counts the lines, rectangles
+    and curves drawn, and `chars` every character drawn. Once the page
+    is read, or for a page read from a cache, they count the merged
+    ruling segments and the characters kept.
+
+    Pages over budget are handled by `action`, one of `BUDGET_ACTIONS`.
+    With `skip`, none of the page's tables are kept. With `partial`,
+    tables completed before the page went over budget are kept.
+
+    `report` lists a dictionary for each page over budget.
+    """
+
+    def __init__(
+            self,
+            seconds=None,
+            segments=None,
+            chars=None,
+            memory=None,
+            action=None,
+    ):
+        if action is None:
+            action = DEFAULT_BUDGET_ACTION
+        if action not in BUDGET_ACTIONS:
+            raise ValueError("Unknown budget action: %r" % action)
+
+        self.seconds = seconds
+        self.segments = segments
+        self.chars = chars
+        self.memory = memory
+        self.action = action
+        self.report = []
+
+    def copy(self):
+        """
+        Return a budget with the same limits and an empty report.
+        """
+
+        return type(self)(
+            seconds=self.seconds,
+            segments=self.segments,
+            chars=self.chars,
+            memory=self.memory,
+            action=self.action,
+        )
+
+    def start_page(self):
+        return PageMeter(self)
+
+    def exceeded(self, pdf_path, p, error, tables_kept):
+        """
+        Record and log that page `p` of `pdf_path` went over budget, as
+        described by the `PageBudgetExceeded` `error`, keeping
+        `tables_kept` tables. Return the record.
+        """
+
+        entry = {
+            "input": pdf_path,
+            "page": p,
+            "resource": error.resource_name,
+            "value": error.value,
+            "limit": error.limit,
+            "stage": error.stage,
+            "action": self.action,
+            "tables_kept": tables_kept,
+        }
+        self.report.append(entry)
+
+        LOG.warning(
+            "Page %d: %s. %s", p, error,
+            "Skipping page." if self.action == "skip" else
+            "Keeping %d tables." % tables_kept,
+            extra={"budget": entry})
+
+        return entry
+
+    def merge(self, other):
+        """
+        Add the report of `other`, eg. collected in a worker process, to
+        this one.
+        """
+
+        self.report = sorted(
+            self.report + other.report,
+            key=lambda entry: (str(entry["input"]), entry["page"]))
@@ -0,0 +1,214 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+On-disk cache of extracted page elements.
+
+Interpreting a page with pdfminer is by far the slowest step of
+extraction, and its result does not depend on table parameters such as
+the border width. Each page's characters and ruling segments are
+pickled to a file named by a hash of the PDF's content, the page number,
+the extraction options and the pdf2csv version.
+"""
+
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+import collections
+
+from .version import __version__
+
+
+
+LOG = logging.getLogger('pdf2csv')
+
+
+
+# Increment when the format of cached page elements, or how they are
+# extracted, changes.
+CACHE_VERSION = 3
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+CACHE_SUFFIX = ".pickle"
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+
+def hash_file(path):
+    """
+    Return the hex SHA-256 digest of the content of the file at `path`.
+    """
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+
+class PageCache:
+    """
+    A directory of cached page elements, holding at most `max_size`
+    bytes. When full, the least recently used entries are removed first.
+
+    `hits` and `misses` count lookups made through this instance.
+    """
+
+    def __init__(self, path, max_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(path, exist_ok=True)
+
+        # Entry sizes by path, least recently used first, and their
+        # total. The directory is only scanned here, so that storing an
+        # entry does not cost a scan of the whole cache. Entries written
+        # by other processes sharing the directory are counted as they
+        # are read.
+        self._entry_sizes = collections.OrderedDict(
+            (entry_path, size)
+            for (_mtime, size, entry_path) in sorted(self._entries())
+        )
+        self._size = sum(self._entry_sizes.values())
+
+    def key(self, file_hash, p, extraction=None, char_fields=None):
+        """
+        Return the cache key of page `p` of the PDF whose content hash
+        is `file_hash`, extracted with `extraction` and `char_fields`.
+        """
+
+        return "\t".join((
+            "pdf2csv %s" % __version__,
+            "cache %d" % CACHE_VERSION,
+            file_hash,
+            str(p),
+            str(extraction),
+            ",".join(sorted(char_fields or ())),
+        ))
+
+    def _entry_path(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest() + CACHE_SUFFIX
+        return os.path.join(self.path, name)
+
+    def get(self, key):
+        """
+        Return the value stored under `key`, or `None` if there is none.
+        """
+
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as fp:
+                value = pickle.load(fp)
+                size = os.fstat(fp.fileno()).st_size
+        except FileNotFoundError:
+            self._forget(path)
+            self.misses += 1
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError) as error:
+            LOG.warning("Ignoring unreadable cache entry %s: %s", path, error)
+            self.misses += 1
+            return None
+
+        try:
+            # Mark as recently used.
+            os.utime(path)
+        except OSError:
+            pass
+        self._record(path, size)
+
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Store `value` under `key`, then evict old entries if the cache
+        has grown beyond `max_size`.
+        """
+
+        path = self._entry_path(key)
+        (fd, temp_path) = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump(value, fp, protocol=pickle.HIGHEST_PROTOCOL)
+                size = fp.tell()
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+        self._record(path, size)
+
+        if self._size > self.max_size:
+            self.evict()
+
+    def _record(self, path, size):
+        """
+        Count the entry at `path` as holding `size` bytes and as the
+        most recently used.
+        """
+
+        self._forget(path)
+        self._entry_sizes[path] = size
+        self._size += size
+
+    def _forget(self, path):
+        self._size -= self._entry_sizes.pop(path, 0)
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if not entry.name.endswith(CACHE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self):
+        """
+        Return the total size in bytes of the entries in the cache.
+        """
+
+        return sum(size for _mtime, size, _path in self._entries())
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache holds no
+        more than `max_size` bytes.
+        """
+
+        while self._size > self.max_size and self._entry_sizes:
+            (path, size) = self._entry_sizes.popitem(last=False)
+            self._size -= size
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            LOG.debug("Evicted cache entry %s", path)
+
+    def clear_counters(self):
+        self.hits = 0
+        self.misses = 0
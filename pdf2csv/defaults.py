@@ -0,0 +1,31 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Default extraction options.
+
+These are kept apart from `pdf2csv.pdf2csv` so that they can be read,
+eg. to build a command line parser, without importing pdfminer.
+"""
+
+
+
+DEFAULT_BORDER_WIDTH = 1
+
+EXTRACTION_MODES = (
+    "layout",
+    "chars",
+)
+DEFAULT_EXTRACTION = "layout"
+
+DEFAULT_LINE_BREAK = "\n"
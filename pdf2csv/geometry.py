@@ -0,0 +1,406 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Geometry engines for pdf2csv.
+
+Bounding boxes are dictionaries with `x` and `y` keys, each holding a
+`(min, max)` pair in page units.
+"""
+
+import math
+import bisect
+import operator
+import collections
+
+from .util import load_optional
+
+
+
+GRID_MAX_CELLS = 64
+
+# Ratio of the cell sizes of successive grid levels.
+GRID_LEVEL_SCALE = 16
+
+# Below this many values the cost of building NumPy arrays outweighs
+# the vectorized search.
+NUMPY_MIN_VALUES = 64
+
+CHAR_X0 = operator.attrgetter("x0")
+CHAR_Y0 = operator.attrgetter("y0")
+CHAR_Y1 = operator.attrgetter("y1")
+
+
+
+def __getattr__(name):
+    if name == "numpy":
+        return load_optional(globals(), "numpy")
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+
+def segment_touch(segment1, segment2, overlap):
+    """
+    Return `True` if two `(min, max)` segments overlap or lie within
+    `overlap` of each other.
+    """
+
+    return (
+        segment1[0] - overlap <= segment2[0] <= segment1[1] + overlap or
+        segment1[0] - overlap <= segment2[1] <= segment1[1] + overlap or
+        segment2[0] - overlap <= segment1[0] <= segment2[1] + overlap or
+        segment2[0] - overlap <= segment1[1] <= segment2[1] + overlap
+    )
+
+
+
+def bbox_touch(bbox1, bbox2, overlap):
+    return (
+        segment_touch(bbox1["x"], bbox2["x"], overlap) and
+        segment_touch(bbox1["y"], bbox2["y"], overlap)
+    )
+
+
+
+def _grid_cells(hull, overlap, size):
+    """
+    Return the range of grid cells `(gx0, gx1, gy0, gy1)` of size `size`
+    covered by `hull` expanded by `overlap`.
+    """
+
+    (x0, x1, y0, y1) = hull
+    return (
+        math.floor((x0 - overlap) / size),
+        math.floor((x1 + overlap) / size),
+        math.floor((y0 - overlap) / size),
+        math.floor((y1 + overlap) / size),
+    )
+
+
+
+def _grid_candidates(hulls, keys, overlap):
+    """
+    Yield pairs of keys whose hulls, expanded by `overlap`, share a cell
+    of a uniform grid.
+
+    Every pair of hulls that touch within `overlap` is yielded at least
+    once. The cell size follows the median hull size so that a grid of
+    table cells places only a handful of hulls in each grid cell.
+
+    Hulls spanning more than `GRID_MAX_CELLS` cells, such as page-wide
+    rulings, are placed in coarser grids instead, each with cells
+    `GRID_LEVEL_SCALE` times larger than the last, at the first level
+    where they span few enough. They are paired with the hulls of their
+    own or finer levels that share a cell of their level.
+    """
+
+    # The caller may merge hulls while pairs are yielded.
+    hulls = {k: hulls[k] for k in keys}
+
+    sizes = sorted(
+        max(hulls[k][1] - hulls[k][0], hulls[k][3] - hulls[k][2])
+        for k in keys
+    )
+    size = sizes[len(sizes) // 2] + 2 * overlap
+    if not size > 0 or math.isinf(size):
+        size = 1
+
+    grid = collections.defaultdict(list)
+    levels = collections.defaultdict(list)
+    key_levels = {}
+    for k in keys:
+        level = 0
+        level_size = size
+        while True:
+            (gx0, gx1, gy0, gy1) = _grid_cells(hulls[k], overlap, level_size)
+            if (gx1 - gx0 + 1) * (gy1 - gy0 + 1) <= GRID_MAX_CELLS:
+                break
+            level += 1
+            level_size *= GRID_LEVEL_SCALE
+        key_levels[k] = level
+        if level:
+            levels[level].append(k)
+            continue
+        for gx in range(gx0, gx1 + 1):
+            for gy in range(gy0, gy1 + 1):
+                grid[(gx, gy)].append(k)
+
+    for cell in grid.values():
+        for c1, k1 in enumerate(cell[:-1]):
+            for k2 in cell[c1 + 1:]:
+                yield (k1, k2)
+
+    for level in sorted(levels):
+        level_size = size * GRID_LEVEL_SCALE ** level
+        grid = collections.defaultdict(list)
+        for k in keys:
+            if key_levels[k] > level:
+                continue
+            (gx0, gx1, gy0, gy1) = _grid_cells(hulls[k], overlap, level_size)
+            for gx in range(gx0, gx1 + 1):
+                for gy in range(gy0, gy1 + 1):
+                    grid[(gx, gy)].append(k)
+
+        for k1 in levels[level]:
+            paired = set()
+            (gx0, gx1, gy0, gy1) = _grid_cells(hulls[k1], overlap, level_size)
+            for gx in range(gx0, gx1 + 1):
+                for gy in range(gy0, gy1 + 1):
+                    for k2 in grid[(gx, gy)]:
+                        if k2 in paired or k2 == k1 or (
+                                key_levels[k2] == level and k2 < k1):
+                            continue
+                        paired.add(k2)
+                        yield (k1, k2)
+
+
+
+def group_bboxes(bboxes, overlap, stats=None):
+    """
+    Group bounding boxes that touch within `overlap`, either directly or
+    through the combined bounding box of a group they already belong to.
+
+    Return a list of groups, each a sorted list of indices into `bboxes`,
+    ordered by their first index.
+
+    Groups are merged with a union-find structure. Candidate pairs come
+    from a uniform grid over the group hulls, which is rebuilt until a
+    round completes without any merge. Rounds are counted as
+    `grouping_rounds` in `stats`.
+    """
+
+    parent = list(range(len(bboxes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    hulls = {}
+    for i, bbox in enumerate(bboxes):
+        hulls[i] = (
+            min(bbox["x"]), max(bbox["x"]),
+            min(bbox["y"]), max(bbox["y"]),
+        )
+
+    roots = list(hulls)
+    while len(roots) > 1:
+        if stats is not None:
+            stats.count("grouping_rounds")
+        merged = False
+        for (k1, k2) in _grid_candidates(hulls, roots, overlap):
+            r1 = find(k1)
+            r2 = find(k2)
+            if r1 == r2:
+                continue
+            h1 = hulls[r1]
+            h2 = hulls[r2]
+            if not (
+                    segment_touch(h1[0:2], h2[0:2], overlap) and
+                    segment_touch(h1[2:4], h2[2:4], overlap)
+            ):
+                continue
+            (r1, r2) = sorted((r1, r2))
+            parent[r2] = r1
+            hulls[r1] = (
+                min(h1[0], h2[0]), max(h1[1], h2[1]),
+                min(h1[2], h2[2]), max(h1[3], h2[3]),
+            )
+            del hulls[r2]
+            merged = True
+
+        roots = sorted(hulls)
+        if not merged:
+            break
+
+    groups = collections.defaultdict(list)
+    for i in range(len(bboxes)):
+        groups[find(i)].append(i)
+
+    return [groups[root] for root in sorted(groups)]
+
+
+
+def merge_collinear(segments, tolerance):
+    """
+    Merge collinear segments that overlap or meet. Each segment is an
+    `(axis, position, low, high)` tuple, lying at `position` across
+    `axis` and spanning `low` to `high` along it.
+
+    Segments with the same `axis` and `position` are merged if they lie
+    within `tolerance` of each other along it. Positions are compared
+    exactly, so the distinct positions of the segments are unchanged.
+    Return the merged segments in the order of the first segment each
+    contains.
+    """
+
+    # Each run is `[first index, axis, position, low, high]`.
+    runs = []
+    for i in sorted(range(len(segments)), key=segments.__getitem__):
+        (axis, position, low, high) = segments[i]
+        run = runs[-1] if runs else None
+        if (
+                run is not None and
+                run[1] == axis and run[2] == position and
+                low <= run[4] + tolerance
+        ):
+            if high > run[4]:
+                run[4] = high
+            if i < run[0]:
+                run[0] = i
+            continue
+        runs.append([i, axis, position, low, high])
+
+    runs.sort()
+    return [tuple(run[1:]) for run in runs]
+
+
+
+def merge_splits(splits, border_width):
+    """
+    Return the sorted, distinct values of `splits`, with each run of
+    values lying within `border_width` of its neighbour merged into one.
+
+    Values are merged in a single pass from the lowest: a value within
+    `border_width` of the current split replaces it with the average of
+    the two, so a merged split may drift towards later values.
+    """
+
+    out = []
+    for split in sorted(set(splits)):
+        if out and split - out[-1] <= border_width:
+            out[-1] = (out[-1] + split) / 2
+        else:
+            out.append(split)
+    return out
+
+
+
+def split_indices(splits, values):
+    """
+    Return, for each of `values`, the index of the interval between
+    sorted `splits` it falls in, from `0` below the first split to
+    `len(splits)` at or above the last.
+
+    A value equal to a split belongs to the interval above it. Uses
+    `numpy.searchsorted` for large batches when NumPy is installed.
+    """
+
+    numpy = None
+    if len(values) >= NUMPY_MIN_VALUES:
+        numpy = load_optional(globals(), "numpy")
+    if numpy is not None:
+        return numpy.searchsorted(
+            numpy.asarray(splits, dtype=float),
+            numpy.asarray(values, dtype=float),
+            side="right"
+        ).tolist()
+
+    return [bisect.bisect_right(splits, value) for value in values]
+
+
+
+def index_chars(chars):
+    """
+    Build a spatial index of `Char` records, sorted by the vertical
+    midpoint used to assign characters to table cells.
+    """
+
+    keys = [(char.y0 + char.y1) // 2 for char in chars]
+    order = sorted(range(len(chars)), key=keys.__getitem__)
+    return {
+        "chars": chars,
+        "order": order,
+        "keys": [keys[i] for i in order],
+    }
+
+
+
+def query_chars(index, bbox, margin):
+    """
+    Return the indexed characters whose midpoints lie within `bbox`
+    expanded by `margin`, in their original order.
+    """
+
+    x0 = min(bbox["x"]) - margin
+    x1 = max(bbox["x"]) + margin
+    y0 = min(bbox["y"]) - margin
+    y1 = max(bbox["y"]) + margin
+
+    chars = index["chars"]
+    lo = bisect.bisect_left(index["keys"], y0)
+    hi = bisect.bisect_right(index["keys"], y1)
+    hits = sorted(
+        i for i in index["order"][lo:hi]
+        if x0 <= (chars[i].x0 + chars[i].x1) // 2 <= x1
+    )
+    return [chars[i] for i in hits]
+
+
+
+def reading_lines(chars):
+    """
+    Group `Char` records into lines in reading order, from top to
+    bottom, each sorted from left to right.
+
+    A character joins the current line when its vertical midpoint lies
+    within the line's vertical extent.
+    """
+
+    lines = []
+    y0 = y1 = None
+    # Sorting in reverse keeps the original order of equal keys.
+    for char in sorted(chars, key=CHAR_Y1, reverse=True):
+        mid = (char.y0 + char.y1) / 2
+        if lines and y0 <= mid <= y1:
+            lines[-1].append(char)
+            if char.y0 < y0:
+                y0 = char.y0
+            continue
+        lines.append([char])
+        (y0, y1) = (char.y0, char.y1)
+
+    return [sorted(line, key=CHAR_X0) for line in lines]
+
+
+
+def cell_text(chars, line_break="\n"):
+    """
+    Return the text of `Char` records in reading order, an empty string
+    if they are all whitespace, or `None` if there are none.
+
+    Lines are read as for `reading_lines`, and blank lines are dropped.
+    Lines that overlap vertically, such as a superscript and the text it
+    follows, are merged. The others are stripped and separated by
+    `line_break`.
+    """
+
+    lines = []
+    bottom = None
+    for line in reading_lines(chars):
+        if not "".join([char.text for char in line]).strip():
+            continue
+        top = max(map(CHAR_Y1, line))
+        line_bottom = min(map(CHAR_Y0, line))
+        if lines and top > bottom:
+            lines[-1] = sorted(lines[-1] + line, key=CHAR_X0)
+            bottom = min(bottom, line_bottom)
+        else:
+            lines.append(line)
+            bottom = line_bottom
+
+    if not lines:
+        return "" if chars else None
+    return line_break.join(
+        "".join([char.text for char in line]).strip() for line in lines)
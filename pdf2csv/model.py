@@ -0,0 +1,257 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compact records for page elements.
+
+Pages hold many thousands of characters and lines, so these use
+`__slots__` instead of dictionaries. They also support read-only
+dictionary-style access, eg. `char["x0"]`, for code written against the
+dictionaries used previously.
+
+`Table` holds the result of extracting one table.
+"""
+
+import collections.abc
+
+
+
+CHAR_OPTIONAL_FIELDS = (
+    "fontname",
+    "matrix",
+)
+
+
+
+class Record:
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        # Keys omitted from `keys()` are missing, as they would be from
+        # the equivalent dictionary.
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.__slots__
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.keys()}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(
+            getattr(self, key) == getattr(other, key)
+            for key in self.__slots__
+        )
+
+    def __repr__(self):
+        return "%s(%s)" % (
+            type(self).__name__,
+            ", ".join("%s=%r" % (key, getattr(self, key)) for key in self.keys())
+        )
+
+    def __getstate__(self):
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+    def __setstate__(self, state):
+        for key, value in zip(self.__slots__, state):
+            setattr(self, key, value)
+
+
+
+class Char(Record):
+    """
+    A character on a page, with its bounding box in page units.
+
+    `fontname` and `matrix` are `None` unless they were requested when
+    the page was extracted, and are otherwise omitted from `keys()` and
+    raise `KeyError` when read as items.
+    """
+
+    __slots__ = ("x0", "x1", "y0", "y1", "text", "size", "fontname", "matrix")
+
+    def __init__(
+            self, x0, x1, y0, y1, text, size=None,
+            fontname=None, matrix=None
+    ):
+        self.x0 = x0
+        self.x1 = x1
+        self.y0 = y0
+        self.y1 = y1
+        self.text = text
+        self.size = size
+        self.fontname = fontname
+        self.matrix = matrix
+
+    def keys(self):
+        return tuple(
+            key for key in self.__slots__
+            if key not in CHAR_OPTIONAL_FIELDS or getattr(self, key) is not None
+        )
+
+
+
+class Line(Record):
+    """
+    A horizontal or vertical table line. One of `x` and `y` is the
+    `(min, max)` extent of the line, and the other its position.
+    """
+
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    @property
+    def horizontal(self):
+        return isinstance(self.x, collections.abc.Iterable)
+
+
+
+class BBox(Record):
+    """
+    A bounding box, with `x` and `y` each a `(min, max)` pair.
+    """
+
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+
+def as_char(char):
+    """
+    Return `char` as a `Char`, converting it from a dictionary if needed.
+    """
+
+    if isinstance(char, Char):
+        return char
+    return Char(**char)
+
+
+
+class Table(collections.abc.Sequence):
+    """
+    A table found on a page, numbered `page` from 1, with its `index`
+    among the tables of the page from 0, its bounding box `bbox` and
+    the positions of its column and row borders, `x_splits` and
+    `y_splits`.
+
+    The cell text in `rows` and the number of characters in each cell
+    in `char_counts` are only computed when first read, by calling
+    `cells`, which returns both. The table is also a read-only sequence
+    of its rows, equal to a list of the same rows.
+
+    A table that continues one on an earlier page has the `(page,
+    index)` of the first table it continues as `continues`, which is
+    otherwise `None`.
+    """
+
+    __slots__ = (
+        "page", "index", "bbox", "x_splits", "y_splits", "continues",
+        "_cells", "_rows", "_char_counts",
+    )
+
+    def __init__(
+            self, page, index, bbox, x_splits, y_splits, cells,
+            continues=None
+    ):
+        self.page = page
+        self.index = index
+        self.bbox = bbox
+        self.x_splits = x_splits
+        self.y_splits = y_splits
+        self.continues = continues
+        self._cells = cells
+        self._rows = None
+        self._char_counts = None
+
+    def materialize(self):
+        """
+        Compute the rows and character counts now, if not done already.
+        """
+
+        if self._cells is not None:
+            result = self._cells()
+            self._rows = result["rows"]
+            self._char_counts = result["char_counts"]
+            # Release the characters held by `cells`.
+            self._cells = None
+
+    @property
+    def rows(self):
+        self.materialize()
+        return self._rows
+
+    @property
+    def char_counts(self):
+        self.materialize()
+        return self._char_counts
+
+    @property
+    def materialized(self):
+        return self._cells is None
+
+    def __getitem__(self, key):
+        return self.rows[key]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __eq__(self, other):
+        if isinstance(other, Table):
+            return (
+                (self.page, self.index, self.rows) ==
+                (other.page, other.index, other.rows)
+            )
+        if isinstance(other, (list, tuple)):
+            return self.rows == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Table(page=%r, index=%r, bbox=%r, x_splits=%r, y_splits=%r)" % (
+            self.page, self.index, self.bbox, self.x_splits, self.y_splits)
+
+    def __getstate__(self):
+        self.materialize()
+        return (
+            self.page, self.index, self.bbox, self.x_splits, self.y_splits,
+            self.continues, self._rows, self._char_counts,
+        )
+
+    def __setstate__(self, state):
+        (
+            self.page, self.index, self.bbox, self.x_splits, self.y_splits,
+            self.continues, self._rows, self._char_counts,
+        ) = state
+        self._cells = None
@@ -0,0 +1,187 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Page selection for pdf2csv.
+
+Page ranges are lists of `(first, last)` pairs of page numbers counted
+from 1, where either value may be `None` to leave that end open.
+"""
+
+import logging
+
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import PDFObjRef, resolve1, dict_value, list_value
+from pdfminer.psparser import LIT
+
+
+
+LOG = logging.getLogger('pdf2csv')
+
+
+
+LITERAL_PAGE = LIT("Page")
+LITERAL_PAGES = LIT("Pages")
+
+
+
+def parse_page_range(text):
+    """
+    Parse a string representation of page ranges, eg. `1,5,9-12,40-`,
+    and return a list of `(first, last)` pairs, either or both of which
+    may be `None`. An empty string selects all pages.
+    """
+
+    if not text or not text.strip():
+        return [(None, None)]
+
+    ranges = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+
+        if "-" not in part:
+            page = int(part)
+            ranges.append((page, page))
+            continue
+
+        (first, last) = part.split("-")
+        first = int(first) if first.strip() else None
+        last = int(last) if last.strip() else None
+
+        ranges.append((first, last))
+
+    return ranges
+
+
+
+def resolve_page_ranges(page_ranges, page_count):
+    """
+    Return the sorted, distinct page numbers selected by `page_ranges`
+    in a document of `page_count` pages.
+    """
+
+    if page_ranges is None:
+        page_ranges = [(None, None)]
+
+    page_numbers = set()
+    for (first, last) in page_ranges:
+        first = 1 if first is None else max(1, first)
+        last = page_count if last is None else min(page_count, last)
+        page_numbers.update(range(first, last + 1))
+
+    return sorted(page_numbers)
+
+
+
+def count_pages(document):
+    """
+    Return the number of pages in the pdfminer `document`.
+    """
+
+    try:
+        return int(resolve1(document.catalog["Pages"])["Count"])
+    except (KeyError, TypeError, ValueError):
+        return sum(1 for _page in PDFPage.create_pages(document))
+
+
+
+def _iter_page_tree(document, page_numbers):
+    """
+    Walk the page tree of `document`, descending only into the nodes
+    whose `Count` covers one of the sorted `page_numbers`.
+
+    Raise `ValueError` if the tree is malformed.
+    """
+
+    wanted = iter(page_numbers)
+    target = [next(wanted, None)]
+    visited = set()
+
+    def walk(ref, parent_attrs, offset):
+        if not isinstance(ref, PDFObjRef):
+            raise ValueError("Page tree node is not an indirect object.")
+        if ref.objid in visited:
+            raise ValueError("Page tree contains a cycle.")
+        visited.add(ref.objid)
+
+        attrs = dict_value(ref.resolve()).copy()
+        for k, v in parent_attrs.items():
+            if k in PDFPage.INHERITABLE_ATTRS and k not in attrs:
+                attrs[k] = v
+
+        node_type = attrs.get("Type", attrs.get("type"))
+        if node_type is LITERAL_PAGE:
+            if offset + 1 != target[0]:
+                raise ValueError("Page tree count does not match its pages.")
+            # The page label argument requires pdfminer.six 20220319.
+            yield (offset + 1, PDFPage(document, ref.objid, attrs, None))
+            target[0] = next(wanted, None)
+            return
+
+        if node_type is not LITERAL_PAGES:
+            raise ValueError("Unknown page tree node type: %r" % node_type)
+
+        for kid in list_value(attrs["Kids"]):
+            if target[0] is None:
+                return
+            kid_attrs = dict_value(resolve1(kid))
+            kid_type = kid_attrs.get("Type", kid_attrs.get("type"))
+            count = 1
+            if kid_type is LITERAL_PAGES:
+                count = int(resolve1(kid_attrs["Count"]))
+            if target[0] <= offset + count:
+                yield from walk(kid, attrs, offset)
+            offset += count
+
+    if target[0] is not None:
+        yield from walk(document.catalog["Pages"], document.catalog, 0)
+
+    if target[0] is not None:
+        raise ValueError("Page %d not found in page tree." % target[0])
+
+
+
+def iter_pages(document, page_numbers):
+    """
+    Yield `(p, page)` for each of the sorted `page_numbers` in the
+    pdfminer `document`, counted from 1.
+
+    Pages are looked up directly in the page tree, skipping every
+    subtree that holds none of the requested pages, so selecting a few
+    pages of a long document does not create all of the others. Falls
+    back to enumerating every page if the page tree is malformed.
+    """
+
+    page_numbers = sorted(page_numbers)
+    if not page_numbers:
+        return
+
+    found = 0
+    try:
+        for (p, page) in _iter_page_tree(document, page_numbers):
+            found += 1
+            yield (p, page)
+        return
+    except (KeyError, TypeError, ValueError) as error:
+        LOG.warning("Cannot seek pages in page tree (%s). "
+                    "Enumerating all pages.", error)
+
+    pending = set(page_numbers[found:])
+    for p, page in enumerate(PDFPage.create_pages(document), 1):
+        if p in pending:
+            yield (p, page)
+            pending.discard(p)
+            if not pending:
+                break
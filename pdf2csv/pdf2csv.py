@@ -18,24 +18,41 @@ Extract tabular data from PDF files by detecting table border lines.
 """
 
 import re
-import csv
-import sys
+import math
+import mmap
+import time
+import bisect
 import logging
 import argparse
+import functools
+import contextlib
 import collections
+import concurrent.futures
 
 from pdfminer.pdfparser import PDFParser
-from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfdocument import PDFDocument
 from pdfminer.pdfpage import PDFTextExtractionNotAllowed
 from pdfminer.pdfinterp import PDFResourceManager
 from pdfminer.pdfinterp import PDFPageInterpreter
 from pdfminer.pdfdevice import PDFDevice
 from pdfminer.layout import LAParams, \
     LTTextBoxHorizontal, LTTextBoxVertical, LTTextLine, LTChar, LTAnno, \
-    LTRect, LTLine
+    LTRect, LTLine, LTCurve
 from pdfminer.converter import PDFPageAggregator
 
 from .util import dump_svg
+from .defaults import DEFAULT_BORDER_WIDTH, EXTRACTION_MODES, \
+    DEFAULT_EXTRACTION, DEFAULT_LINE_BREAK
+from .cache import hash_file
+from .stats import Stats, stage_timer
+from .stitch import stitch_tables
+from .template import segment_signature
+from .budget import PageBudgetExceeded
+from .writers import DEFAULT_FORMAT, create_writer, write_tables
+from .model import CHAR_OPTIONAL_FIELDS, Char, Line, BBox, Table, as_char
+from .pages import count_pages, iter_pages, resolve_page_ranges
+from .geometry import group_bboxes, merge_splits, split_indices, \
+    index_chars, query_chars, cell_text, merge_collinear
 
 
 
@@ -43,10 +60,10 @@ LOG = logging.getLogger('pdf2csv')
 
 
 
-DEFAULT_BORDER_WIDTH = 1
+# Segments whose ends differ by no more than this across their axis are
+# horizontal or vertical, and collinear segments this close are merged.
+SEGMENT_TOLERANCE = 0.01
 
-MAX_SPLIT_ITERATIONS = 1e5
-MAX_GROUP_ITERATIONS = 1e7
 SVG_CONTENT_OPTIONS = (
     "char",
     "geo",
@@ -54,80 +71,46 @@ SVG_CONTENT_OPTIONS = (
     "split",
 )
 
-DEBUG_GROUPING = False
-DEBUG_SPLITS = False
-
+PARALLEL_SLICES_PER_WORKER = 4
 
+DEBUG_GROUPING = False
 
-def geo_to_tables(group_list, border_width=None, debug_svg=None):
-    def line_to_bbox(line):
-        if isinstance(line["x"], collections.abc.Iterable):
-            return {
-                "x": list(line["x"]),
-                "y": [line["y"], line["y"]],
-            }
-        return {
-            "x": [line["x"], line["x"]],
-            "y": list(line["y"]),
-        }
 
-    def segment_touch(segment1, segment2, overlap=None):
-        if overlap is None:
-            overlap = DEFAULT_BORDER_WIDTH
-        return (
-            segment1[0] - overlap <= segment2[0] <= segment1[1] + overlap or
-            segment1[0] - overlap <= segment2[1] <= segment1[1] + overlap or
-            segment2[0] - overlap <= segment1[0] <= segment2[1] + overlap or
-            segment2[0] - overlap <= segment1[1] <= segment2[1] + overlap
-        )
 
-    def bbox_touch(bbox1, bbox2, overlap=None):
-        return (
-            segment_touch(bbox1["x"], bbox2["x"], overlap) and
-            segment_touch(bbox1["y"], bbox2["y"], overlap)
-        )
+def geo_to_tables(group_list, border_width=None, debug_svg=None, stats=None):
+    if border_width is None:
+        border_width = DEFAULT_BORDER_WIDTH
 
-    def bbox_combine(bbox1, bbox2):
-        def segment_combine(segment1, segment2):
-            points = list(segment1) + list(segment2)
-            return [min(points), max(points)]
+    LOG.debug("Combining groups...")
+    group_indices = group_bboxes(
+        [group["bbox"] for group in group_list], border_width, stats=stats)
 
-        return {
-            "x": segment_combine(bbox1["x"], bbox2["x"]),
-            "y": segment_combine(bbox1["y"], bbox2["y"]),
-        }
+    if DEBUG_GROUPING:
+        LOG.debug("%d groups combined into %d groups",
+                  len(group_list), len(group_indices))
 
-    i = 0
-    LOG.debug("Combining groups...")
-    while True:
-        i += 1
-        if i > MAX_GROUP_ITERATIONS:
-            LOG.error("Maximum grouping iterations (%d) reached.", MAX_GROUP_ITERATIONS)
-            sys.exit(1)
-
-        if DEBUG_GROUPING:
-            LOG.debug("%d groups", len(group_list))
-
-        if len(group_list) < 2:
-            break
-
-        for g1, group1 in enumerate(group_list[:-1]):
-            for g2, group2 in enumerate(group_list[g1 + 1:], g1 + 1):
-                touch = bbox_touch(
-                    group1["bbox"], group2["bbox"], overlap=border_width)
-                if touch:
-                    group1["lines"] += group2["lines"]
-                    group1["bbox"] = bbox_combine(group1["bbox"], group2["bbox"])
-                    group_list.pop(g2)
-                    if DEBUG_GROUPING:
-                        LOG.debug("Move group %s into group %d. %d lines",
-                                  g2, g1, len(group1["lines"]))
-                    break # Matches found: break for g2
-            else:
-                continue
-            break # Matches found: break for g1
-        else:
-            break # No matches found: break while True
+    combined_list = []
+    for indices in group_indices:
+        if len(indices) == 1:
+            combined_list.append(group_list[indices[0]])
+            continue
+        lines = []
+        for i in indices:
+            lines += group_list[i]["lines"]
+        combined_list.append({
+            "bbox": BBox(
+                x=[
+                    min(min(group_list[i]["bbox"]["x"]) for i in indices),
+                    max(max(group_list[i]["bbox"]["x"]) for i in indices),
+                ],
+                y=[
+                    min(min(group_list[i]["bbox"]["y"]) for i in indices),
+                    max(max(group_list[i]["bbox"]["y"]) for i in indices),
+                ],
+            ),
+            "lines": lines,
+        })
+    group_list = combined_list
 
     tables = []
 
@@ -174,51 +157,253 @@ def geo_to_tables(group_list, border_width=None, debug_svg=None):
 
 
 
-def scrape_page_data(
-        page,
-        border_width=None,
-        breadcrumbs=None,
-        debug_svg=None
-):
-    resource_manager = PDFResourceManager()
-    la_params = LAParams()
-    device = PDFPageAggregator(resource_manager, laparams=la_params)
+class MeteredAggregator(PDFPageAggregator):
+    """
+    Page aggregator that counts the characters and ruling elements drawn
+    on a page against `meter`, a `PageMeter` set while the page is
+    interpreted, so that a page over budget is stopped part way through.
+    """
+
+    meter = None
+
+    _painting = False
+
+    def begin_page(self, page, ctm):
+        # A page stopped over budget may have been inside a figure.
+        self._stack = []
+        PDFPageAggregator.begin_page(self, page, ctm)
+
+    def paint_path(self, gstate, stroke, fill, evenodd, path):
+        # Paths of several parts are painted by recursive calls, and
+        # counted once by the outermost.
+        if self.meter is None or self._painting:
+            PDFPageAggregator.paint_path(
+                self, gstate, stroke, fill, evenodd, path)
+            return
+
+        count = len(self.cur_item)
+        self._painting = True
+        try:
+            PDFPageAggregator.paint_path(
+                self, gstate, stroke, fill, evenodd, path)
+        finally:
+            self._painting = False
+        self.meter.draw("interpretation", segments=len(self.cur_item) - count)
+
+    def render_char(self, *args):
+        advance = PDFPageAggregator.render_char(self, *args)
+        if self.meter is not None:
+            self.meter.draw("interpretation", chars=1)
+        return advance
+
+    def end_page(self, page):
+        # Check before layout analysis, which may take as long again.
+        if self.meter is not None:
+            self.meter.check("interpretation")
+        PDFPageAggregator.end_page(self, page)
+
+
+
+class RulingAggregator(MeteredAggregator):
+    """
+    Page aggregator that ignores text and skips layout analysis, used to
+    find a page's rulings quickly.
+    """
+
+    def __init__(self, resource_manager):
+        MeteredAggregator.__init__(self, resource_manager, laparams=None)
+
+    def render_string(self, textstate, seq, ncs, graphicstate):
+        pass
+
+
+
+def create_extraction_context():
+    """
+    Create the pdfminer resource manager, layout devices and interpreters
+    used to extract pages.
+
+    A context is meant to be shared by all pages of a document so that
+    fonts and other resources are parsed only once.
+    """
+
+    resource_manager = PDFResourceManager(caching=True)
+    # Text boxes are only read for their characters, so their reading
+    # order, whose hierarchical grouping is quadratic in the number of
+    # boxes, is not computed.
+    la_params = LAParams(boxes_flow=None)
+    device = MeteredAggregator(resource_manager, laparams=la_params)
     interpreter = PDFPageInterpreter(resource_manager, device)
+    char_device = MeteredAggregator(resource_manager, laparams=None)
+    char_interpreter = PDFPageInterpreter(resource_manager, char_device)
+    ruling_device = RulingAggregator(resource_manager)
+    ruling_interpreter = PDFPageInterpreter(resource_manager, ruling_device)
 
-    interpreter.process_page(page)
-    layout = device.get_result()
+    return {
+        "resource_manager": resource_manager,
+        "device": device,
+        "interpreter": interpreter,
+        "char_device": char_device,
+        "char_interpreter": char_interpreter,
+        "ruling_device": ruling_device,
+        "ruling_interpreter": ruling_interpreter,
+    }
+
+
+
+def _axis_segment(point0, point1):
+    """
+    Return the `(axis, position, low, high)` segment between two points,
+    with `axis` 0 if it is horizontal and 1 if vertical, or `None` if it
+    is neither.
+    """
+
+    ((x0, y0), (x1, y1)) = (point0, point1)
+    if abs(y1 - y0) <= SEGMENT_TOLERANCE:
+        return (0, y0, min(x0, x1), max(x0, x1))
+    if abs(x1 - x0) <= SEGMENT_TOLERANCE:
+        return (1, x0, min(y0, y1), max(y0, y1))
+    return None
+
+
+
+def element_segments(element):
+    """
+    Return the horizontal and vertical segments drawn by a pdfminer
+    `LTRect`, `LTLine` or `LTCurve`, as `(axis, position, low, high)`
+    tuples. Diagonal lines and Bézier curves are ignored.
+    """
+
+    if isinstance(element, LTRect):
+        x = (element.x0, element.x1)
+        y = (element.y0, element.y1)
+        return [
+            (0, element.y0) + x,
+            (0, element.y1) + x,
+            (1, element.x0) + y,
+            (1, element.x1) + y,
+        ]
+
+    points = []
+    path = getattr(element, "original_path", None)
+    if path:
+        start = None
+        for operation in path:
+            (command, args) = (operation[0], operation[1:])
+            if command == "m":
+                start = args[-1]
+                points += [None, start]
+            elif command == "h":
+                points.append(start)
+            elif command == "l":
+                points.append(args[-1])
+            else:
+                # Break the path at curves.
+                points += [None, args[-1]]
+    else:
+        points = list(element.pts)
+
+    segments = []
+    for (point0, point1) in zip(points, points[1:]):
+        if point0 is None or point1 is None:
+            continue
+        segment = _axis_segment(point0, point1)
+        if segment is not None:
+            segments.append(segment)
+    return segments
+
+
+
+def layout_segment_groups(layout):
+    """
+    Return a group, with a bounding box and a single border line, for
+    each horizontal or vertical segment drawn by the rectangles, lines
+    and curves at the top level of a pdfminer `layout`.
+
+    Collinear segments that overlap or meet are merged first, so that a
+    ruling drawn as many short strokes, or shared by adjacent cells,
+    becomes a single group.
+    """
+
+    segments = []
+    for element in layout:
+        if isinstance(element, (LTRect, LTLine, LTCurve)):
+            segments += element_segments(element)
 
-    page_chars = []
     page_groups = []
+    for (axis, position, low, high) in merge_collinear(
+            segments, SEGMENT_TOLERANCE):
+        if axis == 0:
+            bbox = BBox((low, high), (position, position))
+            line = Line((low, high), position)
+        else:
+            bbox = BBox((position, position), (low, high))
+            line = Line(position, (low, high))
+        page_groups.append({
+            "bbox": bbox,
+            "lines": [line],
+        })
+    return page_groups
+
+
+
+def char_data(char, char_fields=None):
+    """
+    Return a `Char` record for a pdfminer `LTChar`, including those of
+    `CHAR_OPTIONAL_FIELDS` listed in `char_fields`.
+    """
+
+    char_fields = char_fields or ()
+    return Char(
+        char.x0, char.x1, char.y0, char.y1,
+        char.get_text(),
+        char.size,
+        char.fontname if "fontname" in char_fields else None,
+        char.matrix if "matrix" in char_fields else None,
+    )
+
+
+
+def page_has_tables(page, border_width=None, context=None, meter=None):
+    """
+    Return `True` if the rulings on `page` form at least one table.
+
+    Only the drawing operators matter, so the page is interpreted
+    without text or layout analysis. With a `PageMeter` as `meter`,
+    `PageBudgetExceeded` is raised as soon as the page goes over budget.
+    """
+
+    if context is None:
+        context = create_extraction_context()
+
+    device = context["ruling_device"]
+    device.meter = meter
+    try:
+        context["ruling_interpreter"].process_page(page)
+    finally:
+        device.meter = None
+    page_groups = layout_segment_groups(device.get_result())
+    device.result = None
+    if not page_groups:
+        return False
+    return bool(geo_to_tables(page_groups, border_width=border_width))
+
+
+
+def layout_elements(layout, char_fields=None):
+    """
+    Collect the characters and ruling segment groups of a pdfminer
+    `layout`.
+    """
+
+    page_chars = []
+    page_groups = layout_segment_groups(layout)
 
     for element in layout:
-        if isinstance(element, LTRect):
-            page_groups.append({
-                "bbox": {
-                    "x": (element.x0, element.x1),
-                    "y": (element.y0, element.y1),
-                },
-                "lines": [
-                    {
-                        "x": (element.x0, element.x1),
-                        "y": element.y0,
-                    },
-                    {
-                        "x": (element.x0, element.x1),
-                        "y": element.y1,
-                    },
-                    {
-                        "x": element.x0,
-                        "y": (element.y0, element.y1),
-                    },
-                    {
-                        "x": element.x1,
-                        "y": (element.y0, element.y1),
-                    }
-                ]
-            })
-        elif isinstance(element, LTLine):
-            LOG.warning("Line extraction not implemented yet")
+        if isinstance(element, (LTRect, LTLine, LTCurve)):
+            pass  # Collected by `layout_segment_groups`.
+        elif isinstance(element, LTChar):
+            page_chars.append(char_data(element, char_fields))
         elif isinstance(element, LTTextBoxVertical):
             LOG.warning("Ignoring vertical text box")
         elif isinstance(element, LTTextBoxHorizontal):
@@ -230,90 +415,200 @@ def scrape_page_data(
                 for c in o._objs:
                     if isinstance(c, LTAnno):
                         continue
-                    page_chars.append({
-                        "x0": c.x0,
-                        "x1": c.x1,
-                        "y0": c.y0,
-                        "y1": c.y1,
-                        "text": c.get_text(),
-                        "fontname": c.fontname,
-                        "size": c.size,
-                        "matrix": c.matrix
-                    })
+                    page_chars.append(char_data(c, char_fields))
         else:
             LOG.warning("unknown element: %s", str(element))
 
-    tables = geo_to_tables(
-        page_groups,
-        border_width=border_width,
-        debug_svg=debug_svg
-    )
-
     return {
         "chars": page_chars,
-        "tables": tables,
+        "groups": page_groups,
     }
 
 
 
-def table_to_rows(
-        table_data, chars,
-        breadcrumbs=None,
+def extract_page_elements(
+        page,
+        context=None,
+        extraction=None,
+        char_fields=None,
+        meter=None,
+        stats=None,
+):
+    """
+    Interpret a pdfminer `page` and return its characters and ruling
+    segment groups, which do not depend on any table parameters.
+
+    With the default `extraction` mode, `layout`, characters are taken
+    from pdfminer's text lines. The `chars` mode reads them directly
+    from the page without layout analysis, in content stream order,
+    including spaces that layout analysis drops as blank lines.
+
+    Characters are `Char` records. Their `fontname` and `matrix` are
+    only kept if listed in `char_fields`.
+
+    With a `PageMeter` as `meter`, the characters and ruling elements
+    drawn are counted as the page is interpreted, and
+    `PageBudgetExceeded` is raised as soon as it goes over budget.
+
+    Raise `ValueError` if `extraction` is not one of `EXTRACTION_MODES`
+    or `char_fields` names a field not in `CHAR_OPTIONAL_FIELDS`.
+    """
+
+    if extraction is None:
+        extraction = DEFAULT_EXTRACTION
+    if extraction not in EXTRACTION_MODES:
+        raise ValueError("Unknown extraction mode: %r" % extraction)
+    unknown_fields = set(char_fields or ()) - set(CHAR_OPTIONAL_FIELDS)
+    if unknown_fields:
+        raise ValueError("Unknown character fields: %s" % ", ".join(
+            sorted(unknown_fields)))
+
+    if context is None:
+        context = create_extraction_context()
+
+    if extraction == "chars":
+        interpreter = context["char_interpreter"]
+        device = context["char_device"]
+    else:
+        interpreter = context["interpreter"]
+        device = context["device"]
+
+    device.meter = meter
+    try:
+        with stage_timer(stats, "interpret"):
+            interpreter.process_page(page)
+            layout = device.get_result()
+    finally:
+        device.meter = None
+
+    # Otherwise the device would keep the layout until the next page.
+    device.result = None
+
+    with stage_timer(stats, "chars"):
+        return layout_elements(layout, char_fields)
+
+
+
+def scrape_page_data(
+        page,
         border_width=None,
-        remove_outer=True, remove_empty=False,
+        breadcrumbs=None,
         debug_svg=None,
+        context=None,
+        prepass=False,
+        extraction=None,
+        char_fields=None,
+        cache=None,
+        cache_key=None,
+        template=None,
+        meter=None,
+        stats=None,
 ):
+    """
+    Extract the characters and tables of a pdfminer `page`.
+
+    Page elements are read with `extract_page_elements`, or from `cache`
+    under `cache_key` if given. With `prepass`, pages whose rulings
+    form no table are skipped before their text is read.
+
+    With a `PageTemplate` as `template`, the signature of the page's
+    rulings is returned as `signature`. If it matches the template,
+    the template's tables, which already hold their `splits`, are
+    returned instead of grouping the rulings.
+
+    With a `PageMeter` as `meter`, `PageBudgetExceeded` is raised if the
+    page goes over its budget while it is interpreted, once its elements
+    are read, or once they are grouped.
+    """
+
+    elements = None
+    if cache is not None:
+        with stage_timer(stats, "cache"):
+            elements = cache.get(cache_key)
+
+    if elements is None:
+        if prepass:
+            with stage_timer(stats, "prepass"):
+                has_tables = page_has_tables(
+                    page, border_width, context, meter=meter)
+        if prepass and not has_tables:
+            LOG.debug("No tables found in pre-pass. Skipping layout analysis.")
+            return {
+                "chars": [],
+                "char_index": index_chars([]),
+                "tables": [],
+                "signature": None,
+            }
 
-    if border_width is None:
-        border_width = DEFAULT_BORDER_WIDTH
+        elements = extract_page_elements(
+            page,
+            context=context,
+            extraction=extraction,
+            char_fields=char_fields,
+            meter=meter,
+            stats=stats
+        )
+        if cache is not None:
+            with stage_timer(stats, "cache"):
+                cache.put(cache_key, elements)
+
+    if meter is not None:
+        meter.check(
+            "extraction",
+            segments=len(elements["groups"]),
+            chars=len(elements["chars"])
+        )
 
-    def sort_index(splits, p):
-        for i, pn in enumerate(splits):
-            if p < pn:
-                return i
-        return len(splits)
-
-    def char_index(splits, char, p0, p1):
-        i0 = sort_index(splits, p0)
-        i1 = sort_index(splits, p1)
-
-        if char["text"].strip() and i0 != i1:
-            LOG.debug("Character %s crosses line", repr(char["text"]))
-
-        return sort_index(splits, (p0 + p1) // 2)
-
-    def filter_splits(splits):
-        i = 0
-        out = sorted(list(set(splits)))
-        LOG.debug("Combining splits...")
-        while True:
-            if i > MAX_SPLIT_ITERATIONS:
-                LOG.error("Maximum split iterations (%d) reached.", MAX_SPLIT_ITERATIONS)
-                sys.exit(1)
-
-            if len(out) < 2:
-                break
-
-            for s1, split1 in enumerate(out[:-1]):
-                for s2, split2 in enumerate(out[s1 + 1:], s1 + 1):
-                    touch = split2 - split1 <= border_width
-                    if touch:
-                        out[s1] = (split1 + split2) / 2
-                        out.pop(s2)
-                        if DEBUG_SPLITS:
-                            LOG.debug("Move split %s (%.3f) into split %d (%.3f). %.3f",
-                                      s2, split2, s1, split1, out[s1])
-                        break # Matches found: break for s2
-                else:
-                    continue
-                break # Matches found: break for s1
-            else:
-                break # No matches found: break while True
+    signature = None
+    tables = None
+    if template is not None:
+        with stage_timer(stats, "template"):
+            signature = segment_signature(elements["groups"])
+            tables = template.match(signature, border_width)
+        if tables is not None and stats is not None:
+            stats.count("template_pages")
+
+    if tables is None:
+        with stage_timer(stats, "grouping"):
+            tables = geo_to_tables(
+                elements["groups"],
+                border_width=border_width,
+                debug_svg=debug_svg,
+                stats=stats
+            )
+        if meter is not None:
+            meter.check("grouping")
 
-        return out
+    if stats is not None:
+        stats.count("segments", len(elements["groups"]))
+        stats.count("chars", len(elements["chars"]))
+        stats.count("tables", len(tables))
+
+    return {
+        "chars": elements["chars"],
+        "char_index": index_chars(elements["chars"]),
+        "tables": tables,
+        "signature": signature,
+    }
 
-    x_splits = filter_splits([line["x"] for line in table_data["y_lines"]])
-    y_splits = filter_splits([line["y"] for line in table_data["x_lines"]])
+
+
+def table_splits(table_data, border_width=None, debug_svg=None, stats=None):
+    """
+    Return the `(x_splits, y_splits)` of a table, the sorted positions
+    of its column and row borders, with borders lying within
+    `border_width` of each other merged.
+    """
+
+    if border_width is None:
+        border_width = DEFAULT_BORDER_WIDTH
+
+    LOG.debug("Combining splits...")
+    with stage_timer(stats, "splits"):
+        x_splits = merge_splits(
+            [line["x"] for line in table_data["y_lines"]], border_width)
+        y_splits = merge_splits(
+            [line["y"] for line in table_data["x_lines"]], border_width)
 
     if debug_svg:
         for x in x_splits:
@@ -340,10 +635,61 @@ def table_to_rows(
     LOG.debug("X splits:", repr(x_splits))
     LOG.debug("Y splits:", repr(y_splits))
 
+    return (x_splits, y_splits)
+
+
+
+def table_to_cells(
+        table_data, chars,
+        breadcrumbs=None,
+        border_width=None,
+        remove_outer=True, remove_empty=False,
+        line_break=None,
+        debug_svg=None,
+        stats=None,
+        splits=None,
+):
+    """
+    Assign `chars` to the cells of a table. Return a dictionary of its
+    `rows` of cell text, from top to bottom, and the number of
+    characters in each of those cells as `char_counts`. Characters may
+    be `Char` records or dictionaries with the same keys.
+
+    Each cell's text is assembled by `cell_text`, in reading order, with
+    its lines separated by `line_break`. `splits` are the table's
+    `(x_splits, y_splits)` if already known.
+    """
+
+    if border_width is None:
+        border_width = DEFAULT_BORDER_WIDTH
+    if line_break is None:
+        line_break = DEFAULT_LINE_BREAK
+
+    def char_indices(splits, chars, bounds):
+        if LOG.isEnabledFor(logging.DEBUG):
+            for char, (p0, p1) in zip(chars, bounds):
+                i0 = bisect.bisect_right(splits, p0)
+                i1 = bisect.bisect_right(splits, p1)
+                if char.text.strip() and i0 != i1:
+                    LOG.debug("Character %s crosses line", repr(char.text))
+
+        return split_indices(splits, [(p0 + p1) // 2 for (p0, p1) in bounds])
+
+    chars = [as_char(char) for char in chars]
+
+    if splits is None:
+        splits = table_splits(
+            table_data, border_width, debug_svg=debug_svg, stats=stats)
+    (x_splits, y_splits) = splits
+
     rows = []
+    char_counts = []
 
     if len(x_splits) < 2 or len(y_splits) < 2:
-        return rows
+        return {
+            "rows": rows,
+            "char_counts": char_counts,
+        }
 
     x_len = len(x_splits) + 1
     y_len = len(y_splits) + 1
@@ -354,14 +700,18 @@ def table_to_rows(
     for t in range(x_len * y_len):
         table.append([])
 
-    for char in chars:
-        x = char_index(x_splits, char, char["x0"], char["x1"])
-        y = char_index(y_splits, char, char["y0"], char["y1"])
-        t = y * x_len + x
-        table[t].append(char)
-        if char["text"].strip():
-            x_data[x] = True
-            y_data[y] = True
+    with stage_timer(stats, "binning"):
+        x_indices = char_indices(
+            x_splits, chars, [(char.x0, char.x1) for char in chars])
+        y_indices = char_indices(
+            y_splits, chars, [(char.y0, char.y1) for char in chars])
+
+        for char, x, y in zip(chars, x_indices, y_indices):
+            t = y * x_len + x
+            table[t].append(char)
+            if char.text.strip():
+                x_data[x] = True
+                y_data[y] = True
 
     if remove_outer:
         x_data[0] = False
@@ -369,108 +719,526 @@ def table_to_rows(
         y_data[0] = False
         y_data[-1] = False
 
-    for y in range(y_len):
-        if not y_data[y]:
-            continue
+    kept_cells = [
+        [table[y * x_len + x] for x in range(x_len) if x_data[x]]
+        for y in range(y_len) if y_data[y]
+    ]
 
-        row = []
-        for x in range(x_len):
-            if not x_data[x]:
-                continue
+    with stage_timer(stats, "text"):
+        for row_cells in kept_cells:
+            rows.append([cell_text(cell, line_break) for cell in row_cells])
+            char_counts.append([len(cell) for cell in row_cells])
 
-            t = y * x_len + x
-            cell = table[t]
-            text = None
-            if cell:
-                text = ""
+    if debug_svg:
+        for row_cells in kept_cells:
+            for cell in row_cells:
                 for char in cell:
-                    text += char["text"]
+                    debug_svg["items"].append({
+                        "tag": "rect",
+                        "layer": "char",
+                        "style": "fill: #444488; fill-opacity: 0.25;",
+                        "x": char.x0,
+                        "y": char.y0,
+                        "width": char.x1 - char.x0,
+                        "height": char.y1 - char.y0,
+                    })
 
-                    if debug_svg:
-                        debug_svg["items"].append({
-                            "tag": "rect",
-                            "layer": "char",
-                            "style": "fill: #444488; fill-opacity: 0.25;",
-                            "x": char["x0"],
-                            "y": char["y0"],
-                            "width": char["x1"] - char["x0"],
-                            "height": char["y1"] - char["y0"],
-                        })
+    if stats is not None:
+        stats.count("cells", sum(len(row) for row in rows))
 
-            if text:
-                text = text.strip()
-            row.append(text)
-        rows.append(row)
+    return {
+        "rows": rows[::-1],
+        "char_counts": char_counts[::-1],
+    }
 
-    return rows[::-1]
 
 
+def table_to_rows(table_data, chars, **kwargs):
+    """
+    Assign `chars` to the cells of a table and return its rows of cell
+    text, from top to bottom. Arguments are as for `table_to_cells`.
+    """
 
-def pdf_to_csv_tables(
-        pdf_path,
-        page_first=None, page_last=None,
+    return table_to_cells(table_data, chars, **kwargs)["rows"]
+
+
+
+def page_to_tables(
+        page, p,
         border_width=None,
         debug_dump_svg_path=None,
+        breadcrumbs=None,
+        context=None,
+        prepass=False,
+        extraction=None,
+        line_break=None,
+        cache=None,
+        cache_key=None,
+        template=None,
+        budget=None,
+        stats=None,
 ):
-    LOG.info("%s: Searching for pages...", pdf_path)
+    """
+    Extract the tables of a single page, numbered `p` from 1, and return
+    them as a list of `Table`. Their rows are only computed when read,
+    unless `debug_dump_svg_path`, `stats` or `budget` is given.
 
-    breadcrumbs = (pdf_path, )
+    With a `PageTemplate` as `template`, pages whose rulings match it
+    take their table grids from it. A template that has not yet been
+    learned learns them from the first page with tables.
 
-    with open(pdf_path, "rb") as fp:
-        for p, page in enumerate(PDFPage.get_pages(fp), 1):
-            if page_first is not None and p < page_first:
-                continue
-            if page_last is not None and p > page_last:
-                break
-
-            LOG.info("Page %d", p)
-            debug_svg = None
-            if debug_dump_svg_path:
-                page_geometry = dict(zip(
-                    ("x", "y", "width", "height"),
-                    page.mediabox
-                ))
-                LOG.debug("Page geometry: %s", page_geometry)
-
-                svg_path = debug_dump_svg_path
-                if re.compile(r"%-?\d*d").search(svg_path):
-                    svg_path = svg_path % p
-                LOG.debug("Debug SVG path: %s", svg_path)
-
-                debug_svg = {
-                    "path": svg_path,
-                    "items": [],
-                }
-                debug_svg.update(page_geometry)
-
-            page_breadcrumbs = breadcrumbs + ("page %s" % p,)
-            page_data = scrape_page_data(
-                page,
-                border_width=border_width,
-                breadcrumbs=page_breadcrumbs,
-                debug_svg=debug_svg
-            )
+    With a `PageBudget` as `budget`, the page is checked against its
+    limits while it is interpreted, between stages and after each table. A page over budget is
+    recorded in the budget's report, and returns no tables, or with the
+    `partial` action those completed before it went over.
+    """
+
+    if border_width is None:
+        border_width = DEFAULT_BORDER_WIDTH
+
+    debug_svg = None
+    if debug_dump_svg_path:
+        page_geometry = dict(zip(
+            ("x", "y", "width", "height"),
+            page.mediabox
+        ))
+        LOG.debug("Page geometry: %s", page_geometry)
+
+        svg_path = debug_dump_svg_path
+        if re.compile(r"%-?\d*d").search(svg_path):
+            svg_path = svg_path % p
+        LOG.debug("Debug SVG path: %s", svg_path)
+
+        debug_svg = {
+            "path": svg_path,
+            "items": [],
+        }
+        debug_svg.update(page_geometry)
+
+    meter = None
+    if budget is not None:
+        meter = budget.start_page()
+
+    page_breadcrumbs = (breadcrumbs or ()) + ("page %s" % p,)
+    tables = []
+    try:
+        page_data = scrape_page_data(
+            page,
+            border_width=border_width,
+            breadcrumbs=page_breadcrumbs,
+            debug_svg=debug_svg,
+            context=context,
+            prepass=prepass,
+            extraction=extraction,
+            cache=cache,
+            cache_key=cache_key,
+            template=template,
+            meter=meter,
+            stats=stats
+        )
 
-            for table in page_data["tables"]:
-                table_rows = table_to_rows(
-                    table, page_data["chars"],
+        for t, table in enumerate(page_data["tables"]):
+            # Characters outside the table only fill its outer rows
+            # and columns, which are removed.
+            table_chars = query_chars(
+                page_data["char_index"], table["bbox"], border_width)
+            splits = table.get("splits")
+            if splits is None:
+                splits = table_splits(
+                    table, border_width, debug_svg=debug_svg, stats=stats)
+            result = Table(
+                p, t, table["bbox"], splits[0], splits[1],
+                functools.partial(
+                    table_to_cells,
+                    table, table_chars,
                     border_width=border_width,
                     breadcrumbs=page_breadcrumbs,
-                    debug_svg=debug_svg
+                    line_break=line_break,
+                    debug_svg=debug_svg,
+                    stats=stats,
+                    splits=splits
                 )
-                yield table_rows
+            )
+            if debug_svg or stats is not None or meter is not None:
+                # Collect the page's cells before its SVG and stats are
+                # done, or while its budget is checked.
+                result.materialize()
+            tables.append(result)
+            if meter is not None:
+                meter.check("table %d" % t)
+    except PageBudgetExceeded as error:
+        if budget.action == "skip":
+            tables = []
+        budget.exceeded(
+            breadcrumbs[0] if breadcrumbs else None, p, error, len(tables))
+        return tables
+
+    if (
+            template is not None and not template.learned and
+            page_data["signature"] is not None and tables
+    ):
+        LOG.debug("Learning template from page %d", p)
+        template.learn(page_data["signature"], [
+            {
+                "bbox": table.bbox,
+                "splits": (table.x_splits, table.y_splits),
+            }
+            for table in tables
+        ])
+
+    if debug_svg:
+        with stage_timer(stats, "svg"):
+            dump_svg(**debug_svg)
+
+    return tables
 
-            if debug_svg:
-                dump_svg(**debug_svg)
+
+
+def open_document(fp):
+    return PDFDocument(PDFParser(fp))
+
+
+
+@contextlib.contextmanager
+def open_input(pdf_path, memory_map=False):
+    """
+    Open `pdf_path` for reading, as a read-only memory map of the file
+    if `memory_map` is true.
+    """
+
+    with open(pdf_path, "rb") as fp:
+        if not memory_map:
+            yield fp
+            return
+
+        try:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            yield fp
+            return
+
+        with data:
+            yield data
+
+
+
+def release_document_objects(document, fp):
+    """
+    Drop the objects parsed so far by the pdfminer `document`, which
+    otherwise keeps every object it has read, including the content
+    streams and images of pages already extracted. If `fp` is a memory
+    map, also release the pages of the file read so far from memory.
+    """
+
+    document._cached_objs.clear()
+    document._parsed_objs.clear()
+
+    if isinstance(fp, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED"):
+        fp.madvise(mmap.MADV_DONTNEED)
+
+
+
+def document_page_numbers(pdf_path, page_ranges=None):
+    """
+    Return the sorted page numbers of `pdf_path` selected by
+    `page_ranges`.
+    """
+
+    with open(pdf_path, "rb") as fp:
+        return resolve_page_ranges(page_ranges, count_pages(open_document(fp)))
+
+
+
+def iter_page_tables(
+        pdf_path,
+        page_ranges=None,
+        cache=None,
+        stats=None,
+        memory_map=False,
+        **kwargs
+):
+    """
+    Yield `(p, tables, seconds)` for each page of `pdf_path` selected by
+    `page_ranges`, where `tables` is the list returned by
+    `page_to_tables` and `seconds` the time taken to extract it.
+
+    With a `PageCache` as `cache`, page elements are read from and
+    stored in it. With a `Stats` collector as `stats`, the time spent in
+    each stage and counts of elements are recorded for each page.
+
+    With `memory_map`, the file is memory-mapped, and the objects parsed
+    for each page are released once it is extracted, so that memory use
+    is bounded by the largest page rather than growing with the
+    document. A page's tables are released once the next is requested.
+    """
+
+    breadcrumbs = (pdf_path, )
+    context = create_extraction_context()
+
+    file_hash = None
+    if cache is not None:
+        file_hash = hash_file(pdf_path)
+
+    with open_input(pdf_path, memory_map) as fp:
+        document = open_document(fp)
+        page_numbers = resolve_page_ranges(page_ranges, count_pages(document))
+
+        for p, page in iter_pages(document, page_numbers):
+            LOG.debug("Page %d", p)
+            if stats is not None:
+                stats.start_page(p)
+            start = time.perf_counter()
+            cache_key = None
+            if cache is not None:
+                cache_key = cache.key(
+                    file_hash, p,
+                    kwargs.get("extraction") or DEFAULT_EXTRACTION
+                )
+            tables = page_to_tables(
+                page, p,
+                breadcrumbs=breadcrumbs,
+                context=context,
+                cache=cache,
+                cache_key=cache_key,
+                stats=stats,
+                **kwargs
+            )
+            del page
+            if memory_map:
+                release_document_objects(document, fp)
+            seconds = time.perf_counter() - start
+            if stats is not None:
+                stats.end_page(seconds)
+            yield (p, tables, seconds)
+            del tables
+
+
+
+def _page_slice_tables(pdf_path, page_numbers, kwargs):
+    """
+    Return the pages of `iter_page_tables` for `page_numbers`, the
+    worker's cache hits and misses, its `Stats`, its `PageTemplate` and
+    its `PageBudget`, which would otherwise be lost.
+    """
+
+    cache = kwargs.get("cache")
+    if cache is not None:
+        cache.clear_counters()
+    if kwargs.get("template") is not None:
+        kwargs["template"].clear_counters()
+    if kwargs.get("stats") is not None:
+        kwargs = dict(kwargs, stats=Stats())
+    if kwargs.get("budget") is not None:
+        kwargs = dict(kwargs, budget=kwargs["budget"].copy())
+
+    pages = list(iter_page_tables(
+        pdf_path,
+        page_ranges=[(p, p) for p in page_numbers],
+        **kwargs
+    ))
+
+    hits = misses = 0
+    if cache is not None:
+        (hits, misses) = (cache.hits, cache.misses)
+    return (pages, hits, misses, kwargs.get("stats"), kwargs.get("template"),
+            kwargs.get("budget"))
+
+
+
+def iter_page_tables_parallel(
+        pdf_path, workers,
+        page_ranges=None,
+        **kwargs
+):
+    """
+    Yield the same values as `iter_page_tables`, in page order, but
+    extract the pages in a pool of `workers` processes.
+
+    Pages are divided into contiguous slices. Each worker opens the PDF
+    itself and extracts one slice at a time. A `PageTemplate` not yet
+    learned is learned separately for each slice, and the first learned
+    is kept. Only a few slices per
+    worker are queued ahead of the consumer.
+    """
+
+    page_numbers = document_page_numbers(pdf_path, page_ranges)
+    if not page_numbers:
+        return
+
+    slice_size = max(1, math.ceil(
+        len(page_numbers) / (workers * PARALLEL_SLICES_PER_WORKER)))
+    slices = [
+        page_numbers[i:i + slice_size]
+        for i in range(0, len(page_numbers), slice_size)
+    ]
+
+    LOG.info("Extracting %d pages in %d slices with %d workers",
+             len(page_numbers), len(slices), workers)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        slices = iter(slices)
+        try:
+            while True:
+                while len(pending) < workers * PARALLEL_SLICES_PER_WORKER:
+                    try:
+                        slice_page_numbers = next(slices)
+                    except StopIteration:
+                        break
+                    pending.append(executor.submit(
+                        _page_slice_tables,
+                        pdf_path, slice_page_numbers, kwargs
+                    ))
+                if not pending:
+                    break
+                (pages, hits, misses, stats, template, budget) = \
+                    pending.popleft().result()
+                if kwargs.get("cache") is not None:
+                    kwargs["cache"].hits += hits
+                    kwargs["cache"].misses += misses
+                if stats is not None:
+                    kwargs["stats"].merge(stats)
+                if template is not None:
+                    kwargs["template"].merge(template)
+                if budget is not None:
+                    kwargs["budget"].merge(budget)
+                yield from pages
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+
+def pdf_to_tables(
+        pdf_path,
+        page_first=None, page_last=None,
+        border_width=None,
+        debug_dump_svg_path=None,
+        workers=None,
+        page_ranges=None,
+        prepass=False,
+        extraction=None,
+        line_break=None,
+        cache=None,
+        stats=None,
+        memory_map=False,
+        template=None,
+        budget=None,
+        stitch=False,
+        drop_headers=False,
+):
+    """
+    Yield a `Table` for each table found in `pdf_path`, in page order.
+
+    Pages are selected by `page_ranges`, a list of `(first, last)` pairs
+    as returned by `parse_page_range`, or else by `page_first` and
+    `page_last`. With `workers` greater than 1, pages are extracted in a
+    pool of that many processes. With `prepass`, each page's drawing
+    operators are interpreted first, and layout analysis is skipped for
+    pages whose rulings do not form a table. `extraction` selects
+    how characters are read, from `EXTRACTION_MODES`. `line_break`
+    separates the lines of multi-line cells, by default a newline.
+    `cache` is an optional `PageCache` of extracted page elements, so
+    that only the table parameters are applied to pages seen before.
+    `stats` is an optional `Stats` collector of timings and counts.
+    With `memory_map`, the file is memory-mapped and each page's objects
+    are released once it is extracted, as described for
+    `iter_page_tables`. `template` is an optional `PageTemplate` whose
+    table grids are reused on pages with the same rulings, as described
+    for `page_to_tables`. `budget` is an optional `PageBudget` limiting
+    the resources used by each page, whose report lists the pages that
+    went over it.
+
+    With `stitch`, tables continuing a table on the previous page are
+    marked as described for `stitch_tables`, optionally dropping their
+    repeated header rows with `drop_headers`.
+    """
+
+    if border_width is None:
+        border_width = DEFAULT_BORDER_WIDTH
+
+    if page_ranges is None:
+        page_ranges = [(page_first, page_last)]
+
+    LOG.info("%s: Searching for pages...", pdf_path)
+
+    kwargs = {
+        "page_ranges": page_ranges,
+        "border_width": border_width,
+        "debug_dump_svg_path": debug_dump_svg_path,
+        "prepass": prepass,
+        "extraction": extraction,
+        "line_break": line_break,
+        "cache": cache,
+        "stats": stats,
+        "memory_map": memory_map,
+        "template": template,
+        "budget": budget,
+    }
+
+    if workers is not None and workers > 1:
+        pages = iter_page_tables_parallel(pdf_path, workers, **kwargs)
+    else:
+        pages = iter_page_tables(pdf_path, **kwargs)
+
+    tables = _iter_tables(pages)
+    if stitch:
+        tables = stitch_tables(tables, border_width, drop_headers)
+    yield from tables
+
+
+
+def _iter_tables(pages):
+    for (p, tables, seconds) in pages:
+        LOG.info("Page %d: %d tables in %.3fs", p, len(tables), seconds)
+        yield from tables
+        del tables
+
+
+
+def pdf_to_csv_tables(pdf_path, **kwargs):
+    """
+    Yield the rows of each table found in `pdf_path`, in page order, as
+    a list of lists. Arguments are as for `pdf_to_tables`.
+
+    With `stitch`, the rows of a table and of its continuations on
+    later pages are yielded as a single list.
+    """
+
+    tables = pdf_to_tables(pdf_path, **kwargs)
+    if not kwargs.get("stitch"):
+        for table in tables:
+            yield table.rows
+        return
+
+    rows = None
+    for table in tables:
+        if table.continues is None:
+            if rows is not None:
+                yield rows
+            rows = list(table.rows)
+        else:
+            rows += table.rows
+    if rows is not None:
+        yield rows
+
+
+
+def pdf_to_stream(pdf_path, out, output_format=DEFAULT_FORMAT, **kwargs):
+    """
+    Write the tables found in `pdf_path` to `out` in `output_format`,
+    one of `WRITERS`, as they are extracted. `out` must be a binary
+    stream for binary formats, or else a text stream. Other arguments
+    are as for `pdf_to_tables`.
+    """
+
+    write_tables(
+        pdf_to_tables(pdf_path, **kwargs),
+        create_writer(output_format, out, stats=kwargs.get("stats"))
+    )
 
 
 
 def pdf_to_csv_stream(pdf_path, out, **kwargs):
-    written = False
-    for table_rows in pdf_to_csv_tables(pdf_path, **kwargs):
-        if table_rows:
-            if written:
-                out.write("\n")
-            writer = csv.writer(out)
-            writer.writerows(table_rows)
-            written = True
+    pdf_to_stream(pdf_path, out, "csv", **kwargs)
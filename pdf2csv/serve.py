@@ -0,0 +1,610 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A long-lived conversion service.
+
+An HTTP server, listening on a Unix socket or a local TCP port, passes
+each conversion to a pool of worker processes started ahead of time
+with pdfminer already imported. Output is streamed back as it is
+written.
+
+    POST /convert?pages=1-3&border_width=1.5&format=csv
+
+converts the PDF sent as the request body, or the file named by a
+`path` parameter. `GET /health` returns the state of the pool as JSON.
+
+Since `path` lets clients read the server's files, it is only accepted
+on a Unix socket or a loopback address, unless the server is given a
+root directory, within which all paths must then lie.
+
+Requests wait for an idle worker in a bounded queue. A worker that
+exceeds the timeout, or whose client disconnects, is killed and
+replaced, and workers are recycled after a number of documents to
+contain the memory pdfminer keeps between them.
+"""
+
+import os
+import json
+import time
+import queue
+import socket
+import logging
+import ipaddress
+import tempfile
+import threading
+import socketserver
+import http.server
+import multiprocessing
+import urllib.parse
+
+from .pdf2csv import pdf_to_stream
+from .writers import WRITERS, DEFAULT_FORMAT
+from .pages import parse_page_range
+from .defaults import EXTRACTION_MODES
+
+
+
+LOG = logging.getLogger('pdf2csv')
+
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8355
+
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT = 300
+DEFAULT_MAX_DOCUMENTS = 100
+DEFAULT_MAX_QUEUE = 16
+
+# Workers send output in chunks of this many bytes, which are passed on
+# to clients as they arrive.
+CHUNK_SIZE = 64 * 1024
+
+BODY_BLOCK_SIZE = 1024 * 1024
+
+# Seconds to wait on a client's connection, for the next part of its
+# request or for it to accept more of the response, before giving up.
+SOCKET_TIMEOUT = 60
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+
+class ConversionError(Exception):
+    pass
+
+
+
+class ConversionTimeout(Exception):
+    pass
+
+
+
+class PipeOutput:
+    """
+    A writable stream sending what is written through the connection
+    `conn` in chunks of `CHUNK_SIZE` bytes. Text is encoded as UTF-8.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.chunks = []
+        self.size = 0
+        self.position = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        self.position += len(data)
+        if self.size >= CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        if not self.chunks:
+            return
+        self.conn.send(("data", b"".join(self.chunks)))
+        self.chunks = []
+        self.size = 0
+
+    def close(self):
+        """
+        Send what remains to be written. The connection is left open.
+        """
+
+        self.flush()
+        self.closed = True
+
+    closed = False
+
+
+
+def worker_main(conn):
+    """
+    Convert each request received through `conn`, until it is closed or
+    `None` is received, sending back `("data", bytes)` messages followed
+    by `("done", None)` or `("error", message)`.
+    """
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+
+        (pdf_path, output_format, kwargs) = request
+        out = PipeOutput(conn)
+        try:
+            pdf_to_stream(pdf_path, out, output_format, **kwargs)
+            out.flush()
+        except Exception as error:  # pylint: disable=broad-except
+            # Logged by the server, which may be the only one to log.
+            out.flush()
+            conn.send(("error", "%s: %s" % (type(error).__name__, error)))
+            continue
+        conn.send(("done", None))
+
+
+
+def create_context():
+    """
+    Return the multiprocessing context in which to start workers. With
+    `forkserver`, each worker is forked from a server that has already
+    imported pdfminer, so that replacing a worker is quick.
+    """
+
+    try:
+        context = multiprocessing.get_context("forkserver")
+    except ValueError:
+        return multiprocessing.get_context("spawn")
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+
+class Worker:
+    """
+    A worker process and the parent's end of its connection.
+    """
+
+    def __init__(self, context):
+        (self.conn, child_conn) = context.Pipe()
+        self.process = context.Process(
+            target=worker_main, args=(child_conn, ), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.documents = 0
+
+    def stop(self, timeout=None):
+        """
+        Ask the worker to exit, and kill it if it has not after `timeout`
+        seconds, or at once if `timeout` is `None`.
+        """
+
+        if timeout is not None:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+
+class WorkerPool:
+    """
+    A pool of `workers` processes, each converting one document at a
+    time and replaced after `max_documents`.
+
+    Up to `max_queue` requests wait for an idle worker, after which
+    `ServiceBusy` is raised. `documents` counts conversions,
+    `recycled` workers replaced after `max_documents` and `killed`
+    workers replaced after a timeout, disconnection or crash.
+    """
+
+    def __init__(
+            self,
+            workers=DEFAULT_WORKERS,
+            max_documents=DEFAULT_MAX_DOCUMENTS,
+            max_queue=DEFAULT_MAX_QUEUE,
+            context=None,
+    ):
+        if context is None:
+            context = create_context()
+        self.context = context
+        self.workers = workers
+        self.max_documents = max_documents
+        self.admission = threading.BoundedSemaphore(workers + max_queue)
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.documents = 0
+        self.recycled = 0
+        self.killed = 0
+
+        for _w in range(workers):
+            self.idle.put(Worker(context))
+
+    def state(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "idle": self.idle.qsize(),
+                "documents": self.documents,
+                "recycled": self.recycled,
+                "killed": self.killed,
+            }
+
+    def _release(self, worker, healthy):
+        with self.lock:
+            self.documents += 1
+            worker.documents += 1
+            recycle = (
+                self.max_documents is not None and
+                worker.documents >= self.max_documents
+            )
+            if not healthy:
+                self.killed += 1
+            elif recycle:
+                self.recycled += 1
+
+        if not healthy:
+            worker.stop()
+        elif recycle:
+            LOG.debug("Recycling worker %d after %d documents",
+                      worker.process.pid, worker.documents)
+            worker.stop(timeout=1)
+        else:
+            self.idle.put(worker)
+            return
+        self.idle.put(Worker(self.context))
+
+    def convert(self, pdf_path, output_format=DEFAULT_FORMAT, kwargs=None,
+                timeout=None):
+        """
+        Convert `pdf_path` to `output_format` in a worker, with `kwargs`
+        as for `pdf_to_stream`, and yield the output in chunks of bytes.
+
+        Raise `ServiceBusy` if too many requests are waiting,
+        `ConversionError` if the conversion fails, or
+        `ConversionTimeout` if it does not finish within `timeout`
+        seconds, including time spent waiting for a worker. The worker
+        is killed if the conversion times out or the generator is
+        closed before it finishes.
+        """
+
+        if not self.admission.acquire(blocking=False):
+            raise ServiceBusy("Too many requests are waiting")
+
+        try:
+            deadline = None
+            if timeout is not None:
+                deadline = time.monotonic() + timeout
+            try:
+                worker = self.idle.get(timeout=timeout)
+            except queue.Empty:
+                raise ConversionTimeout("No worker became idle in time")
+
+            healthy = False
+            try:
+                worker.conn.send((pdf_path, output_format, kwargs or {}))
+                while True:
+                    remaining = None
+                    if deadline is not None:
+                        remaining = max(0, deadline - time.monotonic())
+                    if not worker.conn.poll(remaining):
+                        raise ConversionTimeout(
+                            "Conversion did not finish in %s seconds" % timeout)
+                    try:
+                        (kind, value) = worker.conn.recv()
+                    except EOFError:
+                        raise ConversionError("Worker exited")
+                    if kind == "data":
+                        yield value
+                    elif kind == "done":
+                        healthy = True
+                        return
+                    else:
+                        healthy = True
+                        raise ConversionError(value)
+            finally:
+                self._release(worker, healthy)
+        finally:
+            self.admission.release()
+
+    def close(self):
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop(timeout=1)
+
+
+
+
+def resolve_path(pdf_path, path_root=None):
+    """
+    Return the real path of `pdf_path`, named by a request, resolved
+    relative to `path_root` if given. Raise `PermissionError` if it is
+    not within `path_root`.
+    """
+
+    if path_root is None:
+        return os.path.realpath(pdf_path)
+    path_root = os.path.realpath(path_root)
+    real_path = os.path.realpath(os.path.join(path_root, pdf_path))
+    if os.path.commonpath([real_path, path_root]) != path_root:
+        raise PermissionError("Path is outside the root: %s" % pdf_path)
+    return real_path
+
+
+
+def parse_options(query):
+    """
+    Return the output format and the keyword arguments for
+    `pdf_to_stream` given by the parameters of a request's `query`
+    string. Raise `ValueError` if any are invalid.
+    """
+
+    params = {
+        key: values[-1]
+        for (key, values) in urllib.parse.parse_qs(query).items()
+    }
+
+    output_format = params.pop("format", DEFAULT_FORMAT)
+    if output_format not in WRITERS:
+        raise ValueError("Unknown output format: %r" % output_format)
+
+    kwargs = {}
+    if "pages" in params:
+        kwargs["page_ranges"] = parse_page_range(params.pop("pages"))
+    if "border_width" in params:
+        kwargs["border_width"] = float(params.pop("border_width"))
+    if "extraction" in params:
+        kwargs["extraction"] = params.pop("extraction")
+        if kwargs["extraction"] not in EXTRACTION_MODES:
+            raise ValueError(
+                "Unknown extraction mode: %r" % kwargs["extraction"])
+    if "line_break" in params:
+        kwargs["line_break"] = params.pop("line_break")
+    if "stitch" in params:
+        kwargs["stitch"] = params.pop("stitch") not in ("", "0", "false")
+
+    params.pop("path", None)
+    if params:
+        raise ValueError("Unknown parameters: %s" % ", ".join(sorted(params)))
+
+    return (output_format, kwargs)
+
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Handle requests to the service of `server.pool`, waiting at most
+    `server.timeout_seconds` for each conversion, and `timeout` seconds
+    for the client between reads and writes of its connection. `path`
+    parameters are resolved within `server.path_root` if set, and
+    otherwise only accepted if `server.local`.
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = SOCKET_TIMEOUT
+
+    def address_string(self):
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        LOG.debug("%s %s", self.address_string(), format % args)
+
+    def send_json(self, status, data):
+        body = (json.dumps(data) + "\n").encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def do_GET(self):
+        if urllib.parse.urlsplit(self.path).path != "/health":
+            self.send_json(404, {"error": "Not found"})
+            return
+        self.send_json(200, self.server.pool.state())
+
+    def read_body(self, out):
+        length = int(self.headers.get("Content-Length") or 0)
+        while length > 0:
+            block = self.rfile.read(min(length, BODY_BLOCK_SIZE))
+            if not block:
+                raise ValueError("Request body ended early")
+            out.write(block)
+            length -= len(block)
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != "/convert":
+            # The request body is left unread.
+            self.close_connection = True
+            self.send_json(404, {"error": "Not found"})
+            return
+
+        temp_path = None
+        try:
+            try:
+                (output_format, kwargs) = parse_options(url.query)
+            except ValueError as error:
+                self.close_connection = True
+                self.send_json(400, {"error": str(error)})
+                return
+
+            pdf_path = urllib.parse.parse_qs(url.query).get("path", [None])[-1]
+            if pdf_path is None:
+                with tempfile.NamedTemporaryFile(
+                        suffix=".pdf", delete=False) as temp:
+                    temp_path = temp.name
+                    try:
+                        self.read_body(temp)
+                    except ValueError as error:
+                        self.close_connection = True
+                        self.send_json(400, {"error": str(error)})
+                        return
+                    except socket.timeout:
+                        self.close_connection = True
+                        self.send_json(408, {"error": "Request body timed out"})
+                        return
+                pdf_path = temp_path
+            else:
+                # Any request body is left unread.
+                if self.server.path_root is None and not self.server.local:
+                    self.close_connection = True
+                    self.send_json(403, {
+                        "error": "The path parameter is only accepted on a "
+                                 "local address, or with a path root"})
+                    return
+                try:
+                    pdf_path = resolve_path(pdf_path, self.server.path_root)
+                except PermissionError as error:
+                    self.close_connection = True
+                    self.send_json(403, {"error": str(error)})
+                    return
+                if not os.path.isfile(pdf_path):
+                    self.close_connection = True
+                    self.send_json(
+                        404, {"error": "No such file: %s" % pdf_path})
+                    return
+
+            self.convert(pdf_path, output_format, kwargs)
+        finally:
+            if temp_path is not None:
+                os.unlink(temp_path)
+
+    def convert(self, pdf_path, output_format, kwargs):
+        chunks = self.server.pool.convert(
+            pdf_path, output_format, kwargs,
+            timeout=self.server.timeout_seconds)
+        started = False
+        try:
+            for chunk in chunks:
+                if not started:
+                    self.send_response(200)
+                    self.send_header(
+                        "Content-Type", CONTENT_TYPES[output_format])
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    started = True
+                self.send_chunk(chunk)
+        except (BrokenPipeError, ConnectionResetError, socket.timeout):
+            LOG.warning("%s: Client disconnected", pdf_path)
+            self.close_connection = True
+            return
+        except (ServiceBusy, ConversionError, ConversionTimeout) as error:
+            LOG.error("%s: %s", pdf_path, error)
+            if started:
+                # Leave the response unterminated so that the client
+                # sees that it is incomplete.
+                self.close_connection = True
+                return
+            status = {
+                ServiceBusy: 503,
+                ConversionError: 422,
+                ConversionTimeout: 504,
+            }[type(error)]
+            self.send_json(status, {"error": str(error)})
+            return
+        finally:
+            chunks.close()
+
+        if not started:
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPES[output_format])
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+        self.send_chunk(b"")
+
+
+
+class ThreadingUnixHTTPServer(
+        socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+
+def create_server(
+        pool,
+        socket_path=None,
+        host=DEFAULT_HOST,
+        port=DEFAULT_PORT,
+        timeout=DEFAULT_TIMEOUT,
+        path_root=None,
+):
+    """
+    Return an HTTP server for the conversion service of the
+    `WorkerPool` `pool`, listening on the Unix socket at `socket_path`,
+    or else on `host` and `port`. Conversions not finished after
+    `timeout` seconds are abandoned. Call `serve_forever` to serve.
+
+    Files named by `path` parameters must lie within the directory
+    `path_root` if given. Otherwise they are only accepted on a Unix
+    socket or a loopback address.
+    """
+
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                # Left behind by a service that has stopped.
+                os.unlink(socket_path)
+            else:
+                raise OSError("Socket is in use: %s" % socket_path)
+            finally:
+                probe.close()
+        server = ThreadingUnixHTTPServer(socket_path, RequestHandler)
+        server.local = True
+    else:
+        server = http.server.ThreadingHTTPServer((host, port), RequestHandler)
+        server.local = ipaddress.ip_address(
+            server.server_address[0]).is_loopback
+
+    server.path_root = path_root
+    server.pool = pool
+    server.timeout_seconds = timeout
+    return server
@@ -0,0 +1,168 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Timing and counters for the stages of extraction.
+
+A `Stats` collector is passed down through extraction as `stats`.
+Functions that accept it do nothing extra when it is `None`.
+"""
+
+import time
+import contextlib
+import collections
+
+
+
+STAGES = (
+    "prepass",
+    "cache",
+    "interpret",
+    "chars",
+    "template",
+    "grouping",
+    "splits",
+    "binning",
+    "text",
+    "svg",
+    "write",
+)
+
+COUNTS = (
+    "segments",
+    "chars",
+    "tables",
+    "cells",
+    "grouping_rounds",
+    "template_pages",
+)
+
+
+
+class Stats:
+    """
+    Collect the time spent in each stage of extraction, and counts of
+    the elements found, in total and for each page.
+    """
+
+    def __init__(self):
+        self.stages = collections.defaultdict(lambda: [0.0, 0])
+        self.counts = collections.Counter()
+        self.pages = []
+        self._page = None
+
+    def start_page(self, p):
+        self._page = {
+            "page": p,
+            "seconds": None,
+            "counts": collections.Counter(),
+            "stages": collections.defaultdict(float),
+        }
+
+    def end_page(self, seconds):
+        self._page["seconds"] = seconds
+        self.pages.append(self._page)
+        self._page = None
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.stages[stage][0] += seconds
+            self.stages[stage][1] += 1
+            if self._page is not None:
+                self._page["stages"][stage] += seconds
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+        if self._page is not None:
+            self._page["counts"][name] += n
+
+    def merge(self, other):
+        """
+        Add the stages, counts and pages of `other`, eg. collected in a
+        worker process, to these.
+        """
+
+        for (stage, (seconds, calls)) in other.stages.items():
+            self.stages[stage][0] += seconds
+            self.stages[stage][1] += calls
+        self.counts.update(other.counts)
+        self.pages = sorted(
+            self.pages + other.pages, key=lambda page: page["page"])
+
+    def as_dict(self):
+        """
+        Return the statistics as a dictionary that can be serialized to
+        JSON. Stages and counts are listed in the order of `STAGES` and
+        `COUNTS`.
+        """
+
+        def ordered(keys, known):
+            return sorted(keys, key=lambda key: (
+                known.index(key) if key in known else len(known), key))
+
+        return {
+            "stages": {
+                stage: {
+                    "seconds": self.stages[stage][0],
+                    "calls": self.stages[stage][1],
+                }
+                for stage in ordered(self.stages, STAGES)
+            },
+            "counts": {
+                name: self.counts[name]
+                for name in ordered(self.counts, COUNTS)
+            },
+            "pages": [
+                {
+                    "page": page["page"],
+                    "seconds": page["seconds"],
+                    "counts": {
+                        name: page["counts"][name]
+                        for name in ordered(page["counts"], COUNTS)
+                    },
+                    "stages": {
+                        stage: page["stages"][stage]
+                        for stage in ordered(page["stages"], STAGES)
+                    },
+                }
+                for page in self.pages
+            ],
+        }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["stages"] = dict(self.stages)
+        return state
+
+    def __setstate__(self, state):
+        stages = collections.defaultdict(lambda: [0.0, 0])
+        stages.update(state.pop("stages"))
+        self.__dict__.update(state)
+        self.stages = stages
+
+
+
+def stage_timer(stats, stage):
+    """
+    Return a context manager timing `stage` in `stats`, or doing
+    nothing if `stats` is `None`.
+    """
+
+    if stats is None:
+        return contextlib.nullcontext()
+    return stats.timer(stage)
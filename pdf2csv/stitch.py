@@ -0,0 +1,133 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Stitching of tables that continue across pages.
+
+A long table printed over several pages is extracted as one table per
+page. A table is taken to continue the last table of the previous page
+when it is the first on its page and its column borders match. Tables
+are stitched as they stream past, holding only the column borders of
+the previous table and the header of the table being continued.
+"""
+
+import logging
+import functools
+
+from .model import Table
+
+
+
+LOG = logging.getLogger('pdf2csv')
+
+
+
+# Most leading rows of a stitched table that may be repeated as a header
+# at the top of each of its continuations.
+MAX_HEADER_ROWS = 5
+
+
+
+def splits_match(splits1, splits2, border_width):
+    """
+    Return `True` if two sorted lists of splits have the same length and
+    each pair of splits lies within `border_width` of each other.
+    """
+
+    return len(splits1) == len(splits2) and all(
+        abs(split1 - split2) <= border_width
+        for split1, split2 in zip(splits1, splits2)
+    )
+
+
+
+def repeated_header_rows(header, rows):
+    """
+    Return the number of leading `rows` equal to the leading rows of
+    `header`.
+    """
+
+    n = 0
+    while n < len(header) and n < len(rows) and rows[n] == header[n]:
+        n += 1
+    return n
+
+
+
+class TableStitcher:
+    """
+    Mark tables that continue a table on the previous page, given one
+    at a time in page order, as described for `stitch_tables`.
+    """
+
+    def __init__(self, border_width, drop_headers=False):
+        self.border_width = border_width
+        self.drop_headers = drop_headers
+        self.previous = None
+        self.origin = None
+        self.header = None
+
+    def stitch(self, table):
+        """
+        Return `table`, with `continues` set if it continues the table
+        before it, and without its repeated header rows if dropped.
+        """
+
+        if (
+                self.previous is not None and
+                table.index == 0 and
+                table.page == self.previous[0] + 1 and
+                splits_match(
+                    table.x_splits, self.previous[1], self.border_width)
+        ):
+            LOG.debug("Table 0 on page %d continues table %d on page %d",
+                      table.page, self.origin[1], self.origin[0])
+            n = 0
+            if self.drop_headers:
+                n = repeated_header_rows(self.header, table.rows)
+            if n:
+                LOG.debug("Dropping %d repeated header rows", n)
+                table = Table(
+                    table.page, table.index, table.bbox,
+                    table.x_splits, table.y_splits,
+                    functools.partial(
+                        dict,
+                        rows=table.rows[n:],
+                        char_counts=table.char_counts[n:]
+                    )
+                )
+            table.continues = self.origin
+        else:
+            self.origin = (table.page, table.index)
+            if self.drop_headers:
+                self.header = table.rows[:MAX_HEADER_ROWS]
+
+        self.previous = (table.page, table.x_splits)
+        return table
+
+
+
+def stitch_tables(tables, border_width, drop_headers=False):
+    """
+    Yield each `Table` of `tables`, in page order, setting `continues` on
+    those that continue a table on the previous page.
+
+    A table continues the previous table if it is the first on the page
+    after it and their column borders lie within `border_width` of each
+    other. With `drop_headers`, leading rows of a continuation that
+    repeat the leading rows of the table it continues are removed.
+    """
+
+    stitcher = TableStitcher(border_width, drop_headers)
+    for table in tables:
+        yield stitcher.stitch(table)
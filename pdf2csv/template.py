@@ -0,0 +1,186 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Table grids reused across pages with the same rulings.
+
+Documents such as statements repeat one ruled layout on every page.
+A template holds the signature of a page's ruling segments and the
+bounding box and splits of each of its tables. A later page whose
+segments match the signature takes its tables from the template,
+skipping grouping and the search for splits.
+"""
+
+import json
+import logging
+
+from .model import BBox
+
+
+
+LOG = logging.getLogger('pdf2csv')
+
+
+
+# Increment when the format of saved templates changes.
+TEMPLATE_VERSION = 1
+
+
+
+def segment_signature(groups):
+    """
+    Return the signature of a page's ruling segment `groups`, a sorted
+    list of their bounding boxes as `(x0, x1, y0, y1)` tuples.
+    """
+
+    return sorted(
+        (
+            min(group["bbox"]["x"]), max(group["bbox"]["x"]),
+            min(group["bbox"]["y"]), max(group["bbox"]["y"]),
+        )
+        for group in groups
+    )
+
+
+
+def signatures_match(signature1, signature2, tolerance):
+    """
+    Return `True` if two signatures have the same number of segments
+    and the coordinates of each pair lie within `tolerance`.
+    """
+
+    if len(signature1) != len(signature2):
+        return False
+    for (bbox1, bbox2) in zip(signature1, signature2):
+        for (value1, value2) in zip(bbox1, bbox2):
+            if abs(value1 - value2) > tolerance:
+                return False
+    return True
+
+
+
+class PageTemplate:
+    """
+    The table grids of one page, reused on later pages whose ruling
+    segments have the same `signature`. Each of `tables` is a dictionary
+    of `bbox` and `(x_splits, y_splits)` as `splits`.
+
+    A template without a signature learns it, and its tables, from the
+    first page on which tables are found. `hits` and `misses` count
+    pages matched through this instance.
+    """
+
+    def __init__(self, signature=None, tables=None):
+        self.signature = signature
+        self.tables = tables
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def learned(self):
+        return self.signature is not None
+
+    def match(self, signature, tolerance):
+        """
+        Return the template's tables if `signature` matches its own
+        within `tolerance`, or else `None`.
+        """
+
+        if not self.learned:
+            return None
+        if not signatures_match(signature, self.signature, tolerance):
+            LOG.debug("Rulings do not match the template")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.tables
+
+    def learn(self, signature, tables):
+        """
+        Store the `signature` of a page and its `tables`, each with a
+        `bbox` and `splits`.
+        """
+
+        self.signature = [tuple(bbox) for bbox in signature]
+        self.tables = [
+            {
+                "bbox": BBox(
+                    tuple(table["bbox"]["x"]), tuple(table["bbox"]["y"])),
+                "splits": (list(table["splits"][0]), list(table["splits"][1])),
+            }
+            for table in tables
+        ]
+
+    def as_dict(self):
+        return {
+            "version": TEMPLATE_VERSION,
+            "signature": [list(bbox) for bbox in self.signature],
+            "tables": [
+                {
+                    "bbox": {
+                        "x": list(table["bbox"]["x"]),
+                        "y": list(table["bbox"]["y"]),
+                    },
+                    "x_splits": table["splits"][0],
+                    "y_splits": table["splits"][1],
+                }
+                for table in self.tables
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Return the template described by `data`, as returned by
+        `as_dict`. Raise `ValueError` if it is of another version.
+        """
+
+        if data.get("version") != TEMPLATE_VERSION:
+            raise ValueError(
+                "Unsupported template version: %r" % data.get("version"))
+
+        template = cls()
+        template.learn(data["signature"], [
+            {
+                "bbox": table["bbox"],
+                "splits": (table["x_splits"], table["y_splits"]),
+            }
+            for table in data["tables"]
+        ])
+        return template
+
+    def merge(self, other):
+        """
+        Add the counters of `other`, eg. used in a worker process, to
+        these, and adopt its tables if this template is not learned.
+        """
+
+        self.hits += other.hits
+        self.misses += other.misses
+        if not self.learned and other.learned:
+            self.learn(other.signature, other.tables)
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(self.as_dict(), fp, indent=2)
+            fp.write("\n")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as fp:
+            return cls.from_dict(json.load(fp))
+
+    def clear_counters(self):
+        self.hits = 0
+        self.misses = 0
+
@@ -18,6 +18,7 @@ Utility functions for pdf2svg.
 import shutil
 import logging
 import tempfile
+import importlib
 
 
 
@@ -31,7 +32,47 @@ DEFAULT_SVG_UNIT = "mm"
 
 
 
+def load_optional(namespace, name, *submodules):
+    """
+    Return the optional module `name`, with its `submodules` imported,
+    or `None` if it is not installed.
+
+    Optional modules such as NumPy and pyarrow are slow to import and
+    only needed by some code paths, so they are imported on first use
+    rather than with the modules that use them. The result is bound to
+    `name` in `namespace`, the calling module's `globals()`, so later
+    calls return it without importing again.
+    """
+
+    try:
+        return namespace[name]
+    except KeyError:
+        pass
+
+    try:
+        module = importlib.import_module(name)
+        for submodule in submodules:
+            importlib.import_module("%s.%s" % (name, submodule))
+    except ImportError:
+        module = None
+    namespace[name] = module
+    return module
+
+
+
 def color_log(log):
+    """
+    Wrap the level methods of `log` to color messages by level, and to
+    accept several values to be joined by spaces, like `print`.
+
+    Messages below the logger's level return before being formatted.
+    Calling this again on the same logger has no effect.
+    """
+
+    if getattr(log, "color_log", False):
+        return
+    log.color_log = True
+
     color_red = '\033[91m'
     color_green = '\033[92m'
     color_yellow = '\033[93m'
@@ -39,10 +80,10 @@ def color_log(log):
     color_end = '\033[0m'
 
     level_colors = (
-        ("error", color_red),
-        ("warning", color_yellow),
-        ("info", color_green),
-        ("debug", color_blue),
+        ("error", logging.ERROR, color_red),
+        ("warning", logging.WARNING, color_yellow),
+        ("info", logging.INFO, color_green),
+        ("debug", logging.DEBUG, color_blue),
     )
 
     safe = None
@@ -75,14 +116,17 @@ def color_log(log):
         args = message_args(args)[1]
         return args
 
-    def build_lambda(safe, color):
-        return lambda *args, **kwargs: getattr(log, safe)(
-            _message(args, color), *_args(args), **kwargs)
+    def build_method(safe, level_number, color):
+        def f(*args, **kwargs):
+            if not log.isEnabledFor(level_number):
+                return
+            getattr(log, safe)(_message(args, color), *_args(args), **kwargs)
+        return f
 
-    for (level, color) in level_colors:
+    for (level, level_number, color) in level_colors:
         safe = "%s_" % level
         setattr(log, safe, getattr(log, level))
-        setattr(log, level, build_lambda(safe, color))
+        setattr(log, level, build_method(safe, level_number, color))
 
 
 
@@ -0,0 +1,223 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Output writers for extracted tables.
+
+Writers receive tables one at a time, as they are extracted, and write
+them out immediately or in small batches, so memory does not grow with
+the number of tables. Tables' rows are passed with `p`, their page
+number counted from 1, and `t`, their index on the page counted from 0.
+
+Rows passed with `continued` continue the previous table, and are given
+its `p` and `t`, so that a table stitched across pages is written as
+one.
+
+The Arrow and Parquet writers require `pyarrow`.
+"""
+
+import csv
+import json
+
+from .util import load_optional
+from .stats import stage_timer
+
+
+
+# Rows buffered by the Arrow and Parquet writers before each write.
+ARROW_BATCH_ROWS = 10000
+
+
+
+class CsvWriter:
+    """
+    Write tables as CSV to a text stream, separated by blank lines.
+    Empty tables are skipped, and continued tables are not separated.
+    """
+
+    binary = False
+    suffix = ".csv"
+
+    def __init__(self, out, stats=None):
+        self.out = out
+        self.stats = stats
+        self.writer = csv.writer(out)
+        self.written = False
+
+    def write_table(self, rows, p=None, t=None, continued=False):
+        if not rows:
+            return
+        with stage_timer(self.stats, "write"):
+            if self.written and not continued:
+                self.out.write("\n")
+            self.writer.writerows(rows)
+        self.written = True
+
+    def close(self):
+        pass
+
+
+
+class JsonLinesWriter:
+    """
+    Write each table row as a JSON object on its own line, with the
+    page number `page`, the table index `table` and row index `row`,
+    each as for `write_table`, and the list of cell values as `cells`.
+    The rows of continued tables are numbered on from the previous.
+    """
+
+    binary = False
+    suffix = ".jsonl"
+
+    def __init__(self, out, stats=None):
+        self.out = out
+        self.stats = stats
+        self.next_row = 0
+
+    def write_table(self, rows, p=None, t=None, continued=False):
+        first = self.next_row if continued else 0
+        self.next_row = first + len(rows)
+        with stage_timer(self.stats, "write"):
+            for r, row in enumerate(rows, first):
+                self.out.write(json.dumps({
+                    "page": p,
+                    "table": t,
+                    "row": r,
+                    "cells": row,
+                }, ensure_ascii=False))
+                self.out.write("\n")
+
+    def close(self):
+        pass
+
+
+
+def __getattr__(name):
+    if name == "pyarrow":
+        return load_optional(globals(), "pyarrow", "ipc", "parquet")
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+
+class ArrowWriter:
+    """
+    Write table rows to a binary stream in the Arrow IPC stream format,
+    with the same columns as `JsonLinesWriter`.
+    """
+
+    binary = True
+    suffix = ".arrow"
+
+    def __init__(self, out, stats=None):
+        pyarrow = load_optional(globals(), "pyarrow", "ipc", "parquet")
+        if pyarrow is None:
+            raise ImportError(
+                "Writing %s requires `pyarrow`." % type(self).__name__)
+        self.pyarrow = pyarrow
+        self.out = out
+        self.stats = stats
+        self.schema = pyarrow.schema([
+            ("page", pyarrow.int32()),
+            ("table", pyarrow.int32()),
+            ("row", pyarrow.int32()),
+            ("cells", pyarrow.list_(pyarrow.string())),
+        ])
+        self.columns = {name: [] for name in self.schema.names}
+        self.next_row = 0
+        self.writer = self.open_writer()
+
+    def open_writer(self):
+        return self.pyarrow.ipc.new_stream(self.out, self.schema)
+
+    def flush(self):
+        if not self.columns["row"]:
+            return
+        with stage_timer(self.stats, "write"):
+            self.writer.write_batch(self.pyarrow.record_batch(
+                [self.columns[name] for name in self.schema.names],
+                schema=self.schema))
+        for values in self.columns.values():
+            values.clear()
+
+    def write_table(self, rows, p=None, t=None, continued=False):
+        first = self.next_row if continued else 0
+        self.next_row = first + len(rows)
+        for r, row in enumerate(rows, first):
+            self.columns["page"].append(p)
+            self.columns["table"].append(t)
+            self.columns["row"].append(r)
+            self.columns["cells"].append(row)
+            if len(self.columns["row"]) >= ARROW_BATCH_ROWS:
+                self.flush()
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+
+class ParquetWriter(ArrowWriter):
+    """
+    Write table rows to a binary stream as a Parquet file, with one row
+    group per batch and the same columns as `JsonLinesWriter`.
+    """
+
+    suffix = ".parquet"
+
+    def open_writer(self):
+        return self.pyarrow.parquet.ParquetWriter(self.out, self.schema)
+
+
+
+WRITERS = {
+    "csv": CsvWriter,
+    "jsonl": JsonLinesWriter,
+    "arrow": ArrowWriter,
+    "parquet": ParquetWriter,
+}
+
+DEFAULT_FORMAT = "csv"
+
+
+
+def create_writer(output_format, out, stats=None):
+    """
+    Return a writer for `output_format`, one of `WRITERS`, writing to
+    `out`, which must be a binary stream if the writer's `binary`
+    attribute is set, or else a text stream.
+    """
+
+    try:
+        writer_class = WRITERS[output_format]
+    except KeyError:
+        raise ValueError("Unknown output format: %r" % output_format)
+    return writer_class(out, stats=stats)
+
+
+
+def write_tables(tables, writer):
+    """
+    Pass each `Table` of `tables` to `writer`, then close it. Tables
+    that continue another are passed as continued, with the page and
+    index of the table they continue.
+    """
+
+    for table in tables:
+        if table.continues is None:
+            writer.write_table(table.rows, table.page, table.index)
+        else:
+            (p, t) = table.continues
+            writer.write_table(table.rows, p, t, continued=True)
+        # Release the rows before the next table is extracted.
+        del table
+    writer.close()
@@ -23,7 +23,11 @@ setuptools.setup(
         "License :: OSI Approved :: GNU General Public License v3 (GPLv3)",
         "Operating System :: OS Independent",
     ],
-    install_requires=['chardet', 'pdfminer.six'],
+    install_requires=['chardet', 'pdfminer.six>=20220319'],
+    extras_require={
+        'numpy': ['numpy'],
+        'arrow': ['pyarrow'],
+    },
     python_requires='>=3',
     scripts=["scripts/pdf2csv"],
     setup_requires=["pytest-runner"],
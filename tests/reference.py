@@ -0,0 +1,170 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Reference implementations of the original pdf2csv algorithms.
+
+These are kept only to check that the faster engines produce the same
+results, and as a baseline for the benchmarks.
+"""
+
+
+
+def reference_group_bboxes(bboxes, overlap):
+    """
+    Group bounding boxes with the original pairwise scan that restarts
+    after every merge. Return the same structure as
+    `pdf2csv.geometry.group_bboxes`.
+    """
+
+    def segment_touch(segment1, segment2):
+        return (
+            segment1[0] - overlap <= segment2[0] <= segment1[1] + overlap or
+            segment1[0] - overlap <= segment2[1] <= segment1[1] + overlap or
+            segment2[0] - overlap <= segment1[0] <= segment2[1] + overlap or
+            segment2[0] - overlap <= segment1[1] <= segment2[1] + overlap
+        )
+
+    def bbox_touch(bbox1, bbox2):
+        return (
+            segment_touch(bbox1["x"], bbox2["x"]) and
+            segment_touch(bbox1["y"], bbox2["y"])
+        )
+
+    def bbox_combine(bbox1, bbox2):
+        def segment_combine(segment1, segment2):
+            points = list(segment1) + list(segment2)
+            return [min(points), max(points)]
+
+        return {
+            "x": segment_combine(bbox1["x"], bbox2["x"]),
+            "y": segment_combine(bbox1["y"], bbox2["y"]),
+        }
+
+    group_list = [
+        {"bbox": bbox, "indices": [i]}
+        for i, bbox in enumerate(bboxes)
+    ]
+
+    while True:
+        if len(group_list) < 2:
+            break
+
+        for g1, group1 in enumerate(group_list[:-1]):
+            for g2, group2 in enumerate(group_list[g1 + 1:], g1 + 1):
+                if bbox_touch(group1["bbox"], group2["bbox"]):
+                    group1["indices"] += group2["indices"]
+                    group1["bbox"] = bbox_combine(group1["bbox"], group2["bbox"])
+                    group_list.pop(g2)
+                    break
+            else:
+                continue
+            break
+        else:
+            break
+
+    return [sorted(group["indices"]) for group in group_list]
+
+
+
+def reference_merge_splits(splits, border_width):
+    """
+    Merge splits with the original pairwise scan that restarts after
+    every merge. Return the same structure as
+    `pdf2csv.geometry.merge_splits`.
+    """
+
+    out = sorted(list(set(splits)))
+    while True:
+        if len(out) < 2:
+            break
+
+        for s1, split1 in enumerate(out[:-1]):
+            for s2, split2 in enumerate(out[s1 + 1:], s1 + 1):
+                if split2 - split1 <= border_width:
+                    out[s1] = (split1 + split2) / 2
+                    out.pop(s2)
+                    break
+            else:
+                continue
+            break
+        else:
+            break
+
+    return out
+
+
+
+def reference_split_indices(splits, values):
+    """
+    Find the interval index of each value with the original linear scan.
+    Return the same structure as `pdf2csv.geometry.split_indices`.
+    """
+
+    def sort_index(p):
+        for i, pn in enumerate(splits):
+            if p < pn:
+                return i
+        return len(splits)
+
+    return [sort_index(value) for value in values]
+
+
+
+def reference_page_elements(layout):
+    """
+    Return the characters and rectangle groups of a pdfminer `layout` as
+    the dictionaries originally used by `scrape_page_data`.
+    """
+
+    page_chars = []
+    page_groups = []
+
+    for element in layout:
+        if type(element).__name__ == "LTRect":
+            page_groups.append({
+                "bbox": {
+                    "x": (element.x0, element.x1),
+                    "y": (element.y0, element.y1),
+                },
+                "lines": [
+                    {"x": (element.x0, element.x1), "y": element.y0},
+                    {"x": (element.x0, element.x1), "y": element.y1},
+                    {"x": element.x0, "y": (element.y0, element.y1)},
+                    {"x": element.x1, "y": (element.y0, element.y1)},
+                ]
+            })
+        elif type(element).__name__ == "LTTextBoxHorizontal":
+            for o in element._objs:
+                if type(o).__name__ != "LTTextLineHorizontal":
+                    continue
+                if not o.get_text().strip():
+                    continue
+                for c in o._objs:
+                    if type(c).__name__ == "LTAnno":
+                        continue
+                    page_chars.append({
+                        "x0": c.x0,
+                        "x1": c.x1,
+                        "y0": c.y0,
+                        "y1": c.y1,
+                        "text": c.get_text(),
+                        "fontname": c.fontname,
+                        "size": c.size,
+                        "matrix": c.matrix
+                    })
+
+    return {
+        "chars": page_chars,
+        "groups": page_groups,
+    }
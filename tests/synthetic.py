@@ -0,0 +1,208 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Write synthetic PDF files containing ruled tables.
+
+Every cell holds a short label, so each table is found by pdf2csv and
+each cell's text is known. Borders are drawn in one of `RULINGS`:
+
+-   `rect`: each cell as a stroked rectangle;
+-   `line`: each edge of each cell as a separate stroked line;
+-   `path`: each row and column border as a single path through every
+    cell corner along it.
+"""
+
+
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 36
+
+IMAGE_WIDTH = 256
+
+RULINGS = (
+    "rect",
+    "line",
+    "path",
+)
+
+
+
+def cell_text(page, table, row, col):
+    return "p%dt%dr%dc%d" % (page, table, row, col)
+
+
+
+def table_page_content(
+        page, rows, cols, tables, prose_lines=0, ruling="rect"):
+    """
+    Return the content stream of a page holding `tables` tables of
+    `rows` by `cols` cells, stacked vertically, and `prose_lines` lines
+    of unruled text above them. Borders are drawn as `ruling`.
+    """
+
+    ops = []
+    width = PAGE_WIDTH - 2 * MARGIN
+    y_top = PAGE_HEIGHT - MARGIN
+
+    for line in range(prose_lines):
+        ops.append("BT /F1 9 Tf %d %d Td (Prose line %d of page %d.) Tj ET" % (
+            MARGIN, y_top - 9, line + 1, page))
+        y_top -= 12
+
+    if not tables:
+        return "\n".join(ops)
+
+    gap = 12
+    height = (y_top - MARGIN - gap * (tables - 1)) / tables
+    cell_width = width / cols
+    cell_height = height / rows
+    font_size = max(1, min(8, cell_height * 0.6, cell_width / 8))
+
+    for table in range(tables):
+        top = y_top - table * (height + gap)
+        xs = [MARGIN + col * cell_width for col in range(cols + 1)]
+        ys = [top - row * cell_height for row in range(rows + 1)]
+        if ruling == "path":
+            for y in ys:
+                ops.append(" ".join(
+                    ["%.3f %.3f m" % (xs[0], y)] +
+                    ["%.3f %.3f l" % (x, y) for x in xs[1:]] +
+                    ["S"]))
+            for x in xs:
+                ops.append(" ".join(
+                    ["%.3f %.3f m" % (x, ys[0])] +
+                    ["%.3f %.3f l" % (x, y) for y in ys[1:]] +
+                    ["S"]))
+        for row in range(rows):
+            y = top - (row + 1) * cell_height
+            for col in range(cols):
+                x = MARGIN + col * cell_width
+                if ruling == "rect":
+                    ops.append("%.3f %.3f %.3f %.3f re S" % (
+                        x, y, cell_width, cell_height))
+                elif ruling == "line":
+                    (x1, y1) = (x + cell_width, y + cell_height)
+                    for edge in (
+                            (x, y, x1, y), (x1, y, x1, y1),
+                            (x1, y1, x, y1), (x, y1, x, y),
+                    ):
+                        ops.append("%.3f %.3f m %.3f %.3f l S" % edge)
+                ops.append("BT /F1 %.3f Tf %.3f %.3f Td (%s) Tj ET" % (
+                    font_size, x + 1, y + cell_height * 0.3,
+                    cell_text(page, table, row, col)))
+
+    return "\n".join(ops)
+
+
+
+def write_table_pdf(
+        path, pages=1, rows=10, cols=5, tables=1,
+        prose_pages=0, prose_lines=40,
+        fanout=None, ruling="rect", image_size=0,
+):
+    """
+    Write a PDF to `path` with `pages` pages, each holding `tables`
+    ruled tables of `rows` by `cols` cells. Every page whose index is a
+    multiple of `prose_pages + 1` holds tables; the others hold only
+    `prose_lines` lines of text.
+
+    With `fanout`, pages are arranged in a balanced page tree whose
+    nodes have at most `fanout` kids, instead of a single flat node.
+    Table borders are drawn as `ruling`, one of `RULINGS`.
+
+    With `image_size`, every page is covered by its own uncompressed
+    greyscale image of about that many bytes, as in a scanned document.
+    """
+
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        "/Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    for page in range(1, pages + 1):
+        if (page - 1) % (prose_pages + 1):
+            content = table_page_content(page, rows, cols, 0, prose_lines)
+        else:
+            content = table_page_content(
+                page, rows, cols, tables, ruling=ruling)
+        xobjects = ""
+        if image_size:
+            width = IMAGE_WIDTH
+            height = max(1, image_size // width)
+            image = bytes([page % 256]) * (width * height)
+            image_id = add(
+                b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+                b"/ColorSpace /DeviceGray /BitsPerComponent 8 /Length %d >>"
+                b"\nstream\n" % (width, height, len(image)) +
+                image + b"\nendstream")
+            xobjects = " /XObject << /Im1 %d 0 R >>" % image_id
+            content = "q %d 0 0 %d %d %d cm /Im1 Do Q\n" % (
+                PAGE_WIDTH - 2 * MARGIN, PAGE_HEIGHT - 2 * MARGIN,
+                MARGIN, MARGIN) + content
+        content = content.encode("latin-1")
+        content_id = add(
+            b"<< /Length %d >>\nstream\n" % len(content) +
+            content + b"\nendstream")
+        page_ids.append(add(
+            "<< /Type /Page /Parent %d 0 R /Contents %d 0 R "
+            "/Resources << /Font << /F1 %d 0 R >>%s >> >>" % (
+                pages_id, content_id, font_id, xobjects)))
+
+    # Each kid is `(object id, page count)`.
+    kids = [(page_id, 1) for page_id in page_ids]
+    while fanout and len(kids) > fanout:
+        nodes = []
+        for i in range(0, len(kids), fanout):
+            node_kids = kids[i:i + fanout]
+            node_id = add(None)
+            nodes.append((node_id, sum(count for _kid, count in node_kids)))
+            objects[node_id - 1] = (
+                "<< /Type /Pages /Parent %d 0 R /Kids [%s] /Count %d >>" % (
+                    pages_id,
+                    " ".join("%d 0 R" % kid for kid, _count in node_kids),
+                    nodes[-1][1]))
+        kids = nodes
+
+    objects[catalog_id - 1] = "<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    objects[pages_id - 1] = (
+        "<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 %d %d] >>" % (
+            " ".join("%d 0 R" % kid for kid, _count in kids),
+            len(page_ids), PAGE_WIDTH, PAGE_HEIGHT))
+
+    with open(path, "wb") as fp:
+        fp.write(b"%PDF-1.4\n")
+        offsets = []
+        for i, body in enumerate(objects, 1):
+            if isinstance(body, str):
+                body = body.encode("latin-1")
+            offsets.append(fp.tell())
+            fp.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+        xref = fp.tell()
+        fp.write(b"xref\n0 %d\n" % (len(objects) + 1))
+        fp.write(b"0000000000 65535 f \n")
+        for offset in offsets:
+            fp.write(b"%010d 00000 n \n" % offset)
+        fp.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(objects) + 1, catalog_id, xref))
+
+    return path
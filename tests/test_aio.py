@@ -0,0 +1,177 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import asyncio
+import tempfile
+import threading
+import unittest
+import concurrent.futures
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdf2csv import pdf_to_csv_tables
+from pdf2csv.aio import apdf_to_tables, apdf_to_csv_tables
+
+from synthetic import write_table_pdf
+
+
+
+class CountingExecutor(concurrent.futures.ThreadPoolExecutor):
+    """
+    A thread pool that records how many calls it has started and the
+    most that ran at once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.started = 0
+        self.running = 0
+        self.max_running = 0
+
+    def submit(self, f, *args, **kwargs):
+        def counted():
+            with self.lock:
+                self.started += 1
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+        return super().submit(counted)
+
+
+
+async def collect(pdf_path, **kwargs):
+    return [rows async for rows in apdf_to_csv_tables(pdf_path, **kwargs)]
+
+
+
+class TestAio(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.pdf_paths = [
+            write_table_pdf(
+                os.path.join(cls.tmp.name, "table-%d.pdf" % i),
+                pages=6, rows=3, cols=2 + i)
+            for i in range(3)
+        ]
+        cls.known = [
+            list(pdf_to_csv_tables(pdf_path)) for pdf_path in cls.pdf_paths]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_default_executor(self):
+        self.assertEqual(
+            asyncio.run(collect(self.pdf_paths[0])), self.known[0])
+
+    def test_page_range(self):
+        async def run():
+            return [
+                (table.page, table.index)
+                async for table in apdf_to_tables(
+                    self.pdf_paths[0], page_ranges=[(2, 3), (6, None)])
+            ]
+
+        self.assertEqual(asyncio.run(run()), [(2, 0), (3, 0), (6, 0)])
+
+    def test_stitch(self):
+        known = list(pdf_to_csv_tables(self.pdf_paths[0], stitch=True))
+        self.assertEqual(len(known), 1)
+        self.assertEqual(
+            asyncio.run(collect(self.pdf_paths[0], stitch=True)), known)
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(
+                asyncio.run(collect(
+                    self.pdf_paths[0], executor=executor, stitch=True,
+                    drop_headers=True)),
+                list(pdf_to_csv_tables(
+                    self.pdf_paths[0], stitch=True, drop_headers=True)))
+
+    def test_process_executor(self):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(
+                asyncio.run(collect(self.pdf_paths[1], executor=executor)),
+                self.known[1])
+
+    def test_shared_semaphore(self):
+        executor = CountingExecutor(max_workers=4)
+
+        async def run():
+            semaphore = asyncio.Semaphore(2)
+            results = await asyncio.gather(*[
+                collect(pdf_path, executor=executor, semaphore=semaphore)
+                for pdf_path in self.pdf_paths
+            ])
+            return (results, semaphore.locked())
+
+        try:
+            (results, locked) = asyncio.run(run())
+        finally:
+            executor.shutdown()
+
+        self.assertEqual(results, self.known)
+        self.assertFalse(locked)
+        self.assertLessEqual(executor.max_running, 2)
+
+    def test_cancel(self):
+        executor = CountingExecutor(max_workers=1)
+
+        async def run():
+            first = asyncio.Event()
+
+            async def consume():
+                async for _rows in apdf_to_csv_tables(
+                        self.pdf_paths[0], executor=executor):
+                    first.set()
+
+            task = asyncio.create_task(consume())
+            await first.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        try:
+            asyncio.run(run())
+        finally:
+            executor.shutdown()
+
+        # Cancelled after the first page, with one more page at most
+        # already in progress.
+        self.assertLessEqual(executor.started, 2)
+
+    def test_break(self):
+        executor = CountingExecutor(max_workers=1)
+
+        async def run():
+            async for _rows in apdf_to_csv_tables(
+                    self.pdf_paths[0], executor=executor):
+                break
+
+        try:
+            asyncio.run(run())
+        finally:
+            executor.shutdown()
+
+        self.assertEqual(executor.started, 1)
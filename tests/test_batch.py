@@ -0,0 +1,165 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import sys
+import json
+import tempfile
+import unittest
+from subprocess import run, PIPE
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdf2csv import pdf_to_csv_stream, PageTemplate
+from pdf2csv.batch import expand_inputs, batch_convert, summarize
+
+from synthetic import write_table_pdf
+
+
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT_PATH = os.path.join(REPO_PATH, "scripts", "pdf2csv")
+
+# Run the script with workers that exit abruptly on any input named
+# `crash.pdf`. Workers are forked so that they inherit the patch.
+CRASH_SCRIPT = """
+import os, sys, runpy, multiprocessing
+import pdf2csv.batch
+
+multiprocessing.set_start_method("fork")
+iter_page_tables = pdf2csv.batch.iter_page_tables
+
+def crash_iter_page_tables(pdf_path, **kwargs):
+    if os.path.basename(pdf_path) == "crash.pdf":
+        os._exit(1)
+    return iter_page_tables(pdf_path, **kwargs)
+
+pdf2csv.batch.iter_page_tables = crash_iter_page_tables
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+class TestBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmp.name, "in")
+        self.output_dir = os.path.join(self.tmp.name, "out")
+        os.makedirs(os.path.join(self.input_dir, "sub"))
+
+        self.pdf_paths = [
+            write_table_pdf(os.path.join(self.input_dir, "a.pdf"),
+                            pages=2, rows=3, cols=2),
+            write_table_pdf(os.path.join(self.input_dir, "sub", "b.pdf"),
+                            pages=1, rows=4, cols=3, tables=2),
+        ]
+        self.bad_path = os.path.join(self.input_dir, "bad.pdf")
+        with open(self.bad_path, "w") as fp:
+            fp.write("Not a PDF")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_expand_inputs(self):
+        self.assertEqual(expand_inputs([self.input_dir]), [
+            (self.pdf_paths[0], "a"),
+            (self.bad_path, "bad"),
+            (os.path.join(self.input_dir, "sub", "b.pdf"),
+             os.path.join("sub", "b")),
+        ])
+        self.assertEqual(
+            expand_inputs([os.path.join(self.input_dir, "**", "b.pdf"),
+                           self.pdf_paths[1]]),
+            [(self.pdf_paths[1], "b")])
+
+        with self.assertRaises(ValueError):
+            expand_inputs([os.path.join(self.input_dir, "*.txt")])
+        with self.assertRaises(ValueError):
+            expand_inputs([os.path.join(self.input_dir, "missing.pdf")])
+
+    def check_batch(self, workers):
+        results = list(batch_convert(
+            [self.input_dir], self.output_dir, workers=workers))
+        summary = summarize(results)
+
+        self.assertEqual(
+            (summary["files"], summary["ok"], summary["error"]), (3, 2, 1))
+        by_input = {result["input"]: result for result in summary["results"]}
+        self.assertEqual(by_input[self.pdf_paths[0]]["pages"], 2)
+        self.assertEqual(by_input[self.pdf_paths[0]]["tables"], 2)
+        self.assertEqual(by_input[self.pdf_paths[1]]["tables"], 2)
+        self.assertIn("error", by_input[self.bad_path])
+
+        for pdf_path in self.pdf_paths:
+            out = io.StringIO()
+            pdf_to_csv_stream(pdf_path, out)
+            with open(by_input[pdf_path]["output"], newline="") as fp:
+                self.assertEqual(fp.read(), out.getvalue(), pdf_path)
+
+        # Outputs newer than their inputs are skipped.
+        summary = summarize(list(batch_convert(
+            [self.input_dir], self.output_dir, workers=workers)))
+        self.assertEqual(
+            (summary["ok"], summary["skipped"], summary["error"]), (0, 2, 1))
+
+        summary = summarize(list(batch_convert(
+            [self.input_dir], self.output_dir, workers=workers, force=True)))
+        self.assertEqual(
+            (summary["ok"], summary["skipped"], summary["error"]), (2, 0, 1))
+
+    def test_batch_serial(self):
+        self.check_batch(workers=1)
+
+    def test_batch_workers(self):
+        self.check_batch(workers=2)
+
+    def test_batch_workers_template(self):
+        template = PageTemplate()
+        results = list(batch_convert(
+            self.pdf_paths, self.output_dir, workers=2, template=template))
+        self.assertEqual([result["status"] for result in results], ["ok"] * 2)
+        self.assertTrue(template.learned)
+        self.assertEqual(template.hits + template.misses, 1)
+
+    def test_worker_crash(self):
+        os.makedirs(os.path.join(self.input_dir, "many"))
+        pdf_paths = [
+            write_table_pdf(os.path.join(self.input_dir, "many", "%d.pdf" % i),
+                            pages=1, rows=2, cols=2)
+            for i in range(8)
+        ]
+        crash_path = os.path.join(self.input_dir, "many", "crash.pdf")
+        write_table_pdf(crash_path, pages=1, rows=2, cols=2)
+
+        env = dict(os.environ, PYTHONPATH=REPO_PATH)
+        process = run(
+            [sys.executable, "-c", CRASH_SCRIPT, SCRIPT_PATH, "-q",
+             "-j", "2", "-d", self.output_dir,
+             os.path.join(self.input_dir, "many")],
+            stdout=PIPE, stderr=PIPE, env=env, universal_newlines=True)
+        self.assertEqual(process.returncode, 1, process.stderr)
+
+        with open(os.path.join(self.output_dir, "summary.json")) as fp:
+            summary = json.load(fp)
+        self.assertEqual((summary["ok"], summary["error"]), (8, 1))
+        by_input = {result["input"]: result for result in summary["results"]}
+        self.assertEqual(by_input[crash_path]["status"], "error")
+        for pdf_path in pdf_paths:
+            self.assertEqual(by_input[pdf_path]["status"], "ok", pdf_path)
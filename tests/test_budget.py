@@ -0,0 +1,166 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import types
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdfminer.layout import LTPage
+
+from pdf2csv import pdf_to_tables, pdf_to_csv_tables, PageBudget
+from pdf2csv.budget import PageMeter, memory_supported
+from pdf2csv.batch import convert_file, summarize
+
+from synthetic import cell_text, write_table_pdf
+
+
+
+def pages(tables):
+    return [(table.page, table.index) for table in tables]
+
+
+
+class TestPageBudget(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.tmp = tempfile.TemporaryDirectory()
+        # Tables on pages 1 and 3, and a page of prose between them.
+        cls.pdf_path = write_table_pdf(
+            os.path.join(cls.tmp.name, "mixed.pdf"),
+            pages=3, rows=4, cols=3, prose_pages=1, prose_lines=40)
+        cls.stacked_path = write_table_pdf(
+            os.path.join(cls.tmp.name, "stacked.pdf"),
+            pages=2, rows=2, cols=2, tables=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_action(self):
+        with self.assertRaises(ValueError):
+            PageBudget(action="abort")
+
+    def test_chars(self):
+        budget = PageBudget(chars=500)
+        self.assertEqual(
+            list(pdf_to_csv_tables(self.pdf_path, budget=budget)),
+            list(pdf_to_csv_tables(self.pdf_path)))
+
+        self.assertEqual(len(budget.report), 1)
+        entry = budget.report[0]
+        self.assertEqual(entry["input"], self.pdf_path)
+        self.assertEqual(entry["page"], 2)
+        self.assertEqual(entry["resource"], "chars")
+        self.assertEqual(entry["value"], 501)
+        self.assertEqual(entry["stage"], "interpretation")
+        self.assertEqual(entry["tables_kept"], 0)
+
+    def test_stop_interpretation(self):
+        # Pages over budget are stopped before layout analysis.
+        budget = PageBudget(chars=10)
+        with mock.patch.object(
+                LTPage, "analyze", autospec=True,
+                side_effect=LTPage.analyze) as analyze:
+            self.assertEqual(
+                list(pdf_to_tables(self.pdf_path, budget=budget)), [])
+        analyze.assert_not_called()
+        self.assertEqual(
+            [(entry["stage"], entry["value"]) for entry in budget.report],
+            [("interpretation", 11)] * 3)
+
+        # The prepass is stopped likewise.
+        budget = PageBudget(segments=3)
+        self.assertEqual(
+            list(pdf_to_tables(self.pdf_path, budget=budget, prepass=True)),
+            [])
+        self.assertEqual(
+            [(entry["page"], entry["stage"]) for entry in budget.report],
+            [(1, "interpretation"), (3, "interpretation")])
+
+    def test_segments(self):
+        budget = PageBudget(segments=3)
+        self.assertEqual(
+            list(pdf_to_csv_tables(self.pdf_path, budget=budget)), [])
+        self.assertEqual(
+            [(entry["page"], entry["resource"]) for entry in budget.report],
+            [(1, "segments"), (3, "segments")])
+
+    def test_partial(self):
+        # The clock stands still, except for 5s at the check after the
+        # second table of the first page.
+        now = [0]
+        fake_time = types.SimpleNamespace(perf_counter=lambda: now[0])
+        check = PageMeter.check
+
+        def slow_check(meter, stage, **kwargs):
+            if stage == "table 1" and not now[0]:
+                now[0] += 5
+            return check(meter, stage, **kwargs)
+
+        budget = PageBudget(seconds=1, action="partial")
+        with mock.patch("pdf2csv.budget.time", fake_time), \
+                mock.patch.object(PageMeter, "check", slow_check):
+            tables = list(pdf_to_tables(self.stacked_path, budget=budget))
+
+        self.assertEqual(
+            pages(tables), [(1, 0), (1, 1), (2, 0), (2, 1), (2, 2)])
+        self.assertEqual(tables[1].rows[0][0], cell_text(1, 1, 0, 0))
+        self.assertEqual(len(budget.report), 1)
+        self.assertEqual(budget.report[0]["stage"], "table 1")
+        self.assertEqual(budget.report[0]["tables_kept"], 2)
+
+    def test_skip_seconds(self):
+        budget = PageBudget(seconds=0)
+        self.assertEqual(
+            list(pdf_to_tables(self.stacked_path, budget=budget)), [])
+        self.assertEqual(
+            [entry["resource"] for entry in budget.report], ["seconds"] * 2)
+
+    def test_memory_unsupported(self):
+        budget = PageBudget(memory=1)
+        memory_supported.cache_clear()
+        try:
+            with mock.patch("pdf2csv.budget.process_memory", return_value=None), \
+                    self.assertLogs("pdf2csv", "WARNING"):
+                self.assertEqual(
+                    list(pdf_to_csv_tables(self.pdf_path, budget=budget)),
+                    list(pdf_to_csv_tables(self.pdf_path)))
+        finally:
+            memory_supported.cache_clear()
+        self.assertEqual(budget.report, [])
+
+    def test_parallel(self):
+        budget = PageBudget(chars=500)
+        self.assertEqual(
+            list(pdf_to_csv_tables(self.pdf_path, workers=2, budget=budget)),
+            list(pdf_to_csv_tables(self.pdf_path)))
+        self.assertEqual([entry["page"] for entry in budget.report], [2])
+
+    def test_batch(self):
+        budget = PageBudget(chars=500)
+        result = convert_file(
+            self.pdf_path, os.path.join(self.tmp.name, "mixed.csv"),
+            {"budget": budget})
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual(
+            [entry["page"] for entry in result["over_budget"]], [2])
+        self.assertEqual(summarize([result])["over_budget"], 1)
+        # Each file is reported in its own result.
+        self.assertEqual(budget.report, [])
@@ -0,0 +1,150 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdf2csv import pdf_to_csv_tables, PageCache
+
+from synthetic import write_table_pdf
+
+
+
+TEST_PATH = os.path.abspath(os.path.dirname(__file__))
+CASES_PATH = os.path.join(TEST_PATH, "cases")
+
+
+
+class TestPageCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_put(self):
+        cache = PageCache(self.tmp.name)
+        key = cache.key("0" * 64, 1, "layout")
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, {"chars": [], "groups": []})
+        self.assertEqual(cache.get(key), {"chars": [], "groups": []})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        self.assertIsNone(cache.get(cache.key("0" * 64, 2, "layout")))
+        self.assertIsNone(cache.get(cache.key("0" * 64, 1, "chars")))
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_evict_least_recently_used(self):
+        value = "x" * 1000
+        cache = PageCache(self.tmp.name, max_size=3500)
+        keys = [cache.key("0" * 64, p) for p in range(4)]
+
+        for key in keys[:3]:
+            cache.put(key, value)
+        # Entries must differ in modification time for eviction order.
+        past = time.time() - 100
+        for i, key in enumerate(keys[:3]):
+            os.utime(cache._entry_path(key), (past + i, past + i))
+
+        # Reading the oldest entry makes it the most recently used.
+        self.assertEqual(cache.get(keys[0]), value)
+        cache.put(keys[3], value)
+
+        self.assertLessEqual(cache.size(), 3500)
+        self.assertIsNone(cache.get(keys[1]))
+        for key in (keys[0], keys[2], keys[3]):
+            self.assertEqual(cache.get(key), value)
+
+    def test_put_without_scanning(self):
+        value = "x" * 1000
+        cache = PageCache(self.tmp.name, max_size=3500)
+
+        with mock.patch.object(cache, "_entries") as entries:
+            for p in range(20):
+                cache.put(cache.key("0" * 64, p), value)
+        entries.assert_not_called()
+        self.assertLessEqual(cache.size(), 3500)
+        self.assertEqual(cache._size, cache.size())
+
+    def test_reopen_counts_entries(self):
+        value = "x" * 1000
+        cache = PageCache(self.tmp.name, max_size=3500)
+        keys = [cache.key("0" * 64, p) for p in range(4)]
+        for key in keys[:3]:
+            cache.put(key, value)
+
+        cache = PageCache(self.tmp.name, max_size=3500)
+        cache.put(keys[3], value)
+        self.assertLessEqual(cache.size(), 3500)
+
+
+
+class TestCachedExtraction(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_case_border_widths(self):
+        pdf_path = os.path.join(CASES_PATH, "eu-20th-204.pdf")
+        cache = PageCache(os.path.join(self.tmp.name, "cache"))
+
+        for border_width in (1, 1.5, 2):
+            cold = list(pdf_to_csv_tables(pdf_path, border_width=border_width))
+            warm = list(pdf_to_csv_tables(
+                pdf_path, border_width=border_width, cache=cache))
+            self.assertEqual(warm, cold, border_width)
+
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_content_changes(self):
+        pdf_path = os.path.join(self.tmp.name, "table.pdf")
+        cache = PageCache(os.path.join(self.tmp.name, "cache"))
+
+        write_table_pdf(pdf_path, pages=2, rows=3, cols=2)
+        first = list(pdf_to_csv_tables(pdf_path, cache=cache))
+        self.assertEqual(list(pdf_to_csv_tables(pdf_path, cache=cache)), first)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+        write_table_pdf(pdf_path, pages=2, rows=4, cols=2)
+        second = list(pdf_to_csv_tables(pdf_path, cache=cache))
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        self.assertEqual(len(second[0]), 4)
+
+    def test_workers(self):
+        pdf_path = write_table_pdf(
+            os.path.join(self.tmp.name, "table.pdf"), pages=6, rows=3, cols=2)
+        cache = PageCache(os.path.join(self.tmp.name, "cache"))
+
+        cold = list(pdf_to_csv_tables(pdf_path, workers=2, cache=cache))
+        warm = list(pdf_to_csv_tables(pdf_path, workers=2, cache=cache))
+        self.assertEqual(warm, cold)
+        self.assertEqual((cache.hits, cache.misses), (6, 6))
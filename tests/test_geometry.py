@@ -0,0 +1,354 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdf2csv import geometry
+from pdf2csv.model import Char
+from pdf2csv.geometry import group_bboxes, merge_splits, split_indices, \
+    index_chars, query_chars, reading_lines, cell_text, merge_collinear
+
+from reference import reference_group_bboxes, reference_merge_splits, \
+    reference_split_indices
+
+
+
+def random_bboxes(rng, count, extent=100, size=20, integer=True):
+    bboxes = []
+    for _ in range(count):
+        if integer:
+            x0 = rng.randint(0, extent)
+            y0 = rng.randint(0, extent)
+            x1 = x0 + rng.randint(0, size)
+            y1 = y0 + rng.randint(0, size)
+        else:
+            x0 = rng.uniform(0, extent)
+            y0 = rng.uniform(0, extent)
+            x1 = x0 + rng.uniform(0, size)
+            y1 = y0 + rng.uniform(0, size)
+        bboxes.append({
+            "x": (x0, x1),
+            "y": (y0, y1),
+        })
+    return bboxes
+
+
+
+class TestGroupBboxes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_empty(self):
+        self.assertEqual(group_bboxes([], 1), [])
+
+    def test_chain(self):
+        bboxes = [
+            {"x": (0, 10), "y": (0, 10)},
+            {"x": (50, 60), "y": (0, 10)},
+            {"x": (11, 20), "y": (0, 10)},
+        ]
+        self.assertEqual(group_bboxes(bboxes, 1), [[0, 2], [1]])
+        self.assertEqual(group_bboxes(bboxes, 0.5), [[0], [1], [2]])
+
+    def test_hull_touch(self):
+        # The third box touches only the combined hull of the first two.
+        bboxes = [
+            {"x": (0, 10), "y": (0, 1)},
+            {"x": (9, 10), "y": (0, 10)},
+            {"x": (0, 1), "y": (9, 10)},
+        ]
+        self.assertEqual(group_bboxes(bboxes, 0), [[0, 1, 2]])
+
+    def test_reference_random(self):
+        rng = random.Random(1)
+        for trial in range(300):
+            count = rng.randint(1, 60)
+            overlap = rng.choice((0, 1, 1.5))
+            bboxes = random_bboxes(
+                rng, count,
+                extent=rng.choice((50, 200, 1000)),
+                size=rng.choice((2, 20, 200)),
+                integer=bool(trial % 2)
+            )
+            self.assertEqual(
+                group_bboxes(bboxes, overlap),
+                reference_group_bboxes(bboxes, overlap),
+                "trial %d" % trial
+            )
+
+
+    def test_reference_rulings(self):
+        # Page-wide rulings among small boxes are indexed in coarser grids.
+        rng = random.Random(1)
+        for trial in range(50):
+            bboxes = random_bboxes(
+                rng, rng.randint(20, 200), extent=1000, size=5)
+            for _r in range(rng.randint(1, 20)):
+                position = rng.randint(0, 1000)
+                if rng.random() < 0.5:
+                    bboxes.append({"x": (0, 1000), "y": (position, position)})
+                else:
+                    bboxes.append({"x": (position, position), "y": (0, 1000)})
+            rng.shuffle(bboxes)
+            self.assertEqual(
+                group_bboxes(bboxes, 1.5),
+                reference_group_bboxes(bboxes, 1.5),
+                "trial %d" % trial
+            )
+
+    def test_large_candidates(self):
+        hulls = {0: (0, 1000, 0, 0), 1: (500, 505, 2, 7)}
+        for k in range(2, 100):
+            hulls[k] = (k * 10, k * 10 + 5, 500, 505)
+        pairs = set(geometry._grid_candidates(hulls, list(hulls), 1.5))
+        self.assertIn((0, 1), pairs)
+        self.assertFalse(
+            [pair for pair in pairs if 0 in pair and 1 not in pair])
+
+
+class TestMergeCollinear(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_empty(self):
+        self.assertEqual(merge_collinear([], 0.01), [])
+
+    def test_merge(self):
+        segments = [
+            (0, 10, 0, 5),
+            (0, 10, 5, 10),
+            (0, 10, 8, 20),
+            (0, 10, 20.005, 30),
+            (0, 10, 40, 50),
+        ]
+        self.assertEqual(
+            merge_collinear(segments, 0.01),
+            [(0, 10, 0, 30), (0, 10, 40, 50)]
+        )
+
+    def test_contained(self):
+        self.assertEqual(
+            merge_collinear([(1, 0, 0, 100), (1, 0, 10, 20)], 0),
+            [(1, 0, 0, 100)]
+        )
+
+    def test_separate_lines(self):
+        segments = [
+            (1, 5, 0, 10),
+            (0, 5, 0, 10),
+            (0, 5.001, 0, 10),
+        ]
+        self.assertEqual(merge_collinear(segments, 0.01), segments)
+
+    def test_order(self):
+        segments = [
+            (1, 0, 0, 10),
+            (0, 20, 10, 20),
+            (0, 10, 0, 10),
+            (0, 20, 0, 10),
+        ]
+        self.assertEqual(
+            merge_collinear(segments, 0),
+            [(1, 0, 0, 10), (0, 20, 0, 20), (0, 10, 0, 10)]
+        )
+
+    def test_random(self):
+        rng = random.Random(3)
+        for trial in range(200):
+            segments = []
+            for _ in range(rng.randint(0, 40)):
+                low = rng.randint(0, 50)
+                segments.append((
+                    rng.randint(0, 1), rng.randint(0, 3),
+                    low, low + rng.randint(0, 10)))
+            merged = merge_collinear(segments, 0)
+
+            covered = set()
+            for (axis, position, low, high) in segments:
+                covered.update(
+                    (axis, position, v) for v in range(low, high + 1))
+            merged_covered = set()
+            for (axis, position, low, high) in merged:
+                values = set(
+                    (axis, position, v) for v in range(low, high + 1))
+                self.assertFalse(values & merged_covered, "trial %d" % trial)
+                merged_covered |= values
+            self.assertEqual(merged_covered, covered, "trial %d" % trial)
+
+
+
+class TestMergeSplits(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_empty(self):
+        self.assertEqual(merge_splits([], 1), [])
+
+    def test_merge(self):
+        self.assertEqual(merge_splits([10, 0, 1, 10, 20], 1), [0.5, 10, 20])
+        self.assertEqual(merge_splits([0, 1, 1.5], 1), [1.0])
+        self.assertEqual(merge_splits([0, 1, 2], 1), [0.5, 2])
+        self.assertEqual(merge_splits([0, 1, 2], 0.5), [0, 1, 2])
+
+    def test_reference_random(self):
+        rng = random.Random(2)
+        for trial in range(500):
+            count = rng.randint(0, 80)
+            border_width = rng.choice((0, 0.5, 1, 1.5, 3))
+            if trial % 2:
+                splits = [rng.randint(0, 100) for _ in range(count)]
+            else:
+                splits = [rng.uniform(0, 100) for _ in range(count)]
+            self.assertEqual(
+                merge_splits(splits, border_width),
+                reference_merge_splits(splits, border_width),
+                "trial %d" % trial
+            )
+
+
+
+class TestSplitIndices(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def compare_reference(self):
+        rng = random.Random(3)
+        for trial in range(200):
+            splits = merge_splits(
+                [rng.randint(0, 100) for _ in range(rng.randint(0, 30))], 1)
+            values = [rng.choice((rng.randint(-5, 105), rng.uniform(-5, 105)))
+                      for _ in range(rng.randint(0, 200))]
+            self.assertEqual(
+                split_indices(splits, values),
+                reference_split_indices(splits, values),
+                "trial %d" % trial
+            )
+
+    def test_boundaries(self):
+        self.assertEqual(
+            split_indices([10, 20], [5, 10, 15, 20, 25]), [0, 1, 1, 2, 2])
+
+    def test_reference_random(self):
+        self.compare_reference()
+
+    def test_reference_random_without_numpy(self):
+        numpy = geometry.numpy
+        geometry.numpy = None
+        try:
+            self.compare_reference()
+        finally:
+            geometry.numpy = numpy
+
+
+
+class TestCharIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_query_random(self):
+        rng = random.Random(4)
+        chars = []
+        for bbox in random_bboxes(rng, 500, extent=500, size=8, integer=False):
+            chars.append(Char(
+                bbox["x"][0], bbox["x"][1], bbox["y"][0], bbox["y"][1], "a"))
+        index = index_chars(chars)
+
+        for trial, bbox in enumerate(random_bboxes(rng, 50, extent=400, size=200)):
+            margin = rng.choice((0, 1.5))
+            expected = [
+                char for char in chars
+                if bbox["x"][0] - margin <= (char.x0 + char.x1) // 2 <= bbox["x"][1] + margin
+                and bbox["y"][0] - margin <= (char.y0 + char.y1) // 2 <= bbox["y"][1] + margin
+            ]
+            self.assertEqual(
+                query_chars(index, bbox, margin), expected, "trial %d" % trial)
+
+
+
+class TestReadingLines(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_lines(self):
+        def char(text, x0, y0, size=10):
+            return Char(x0, x0 + size * 0.6, y0, y0 + size, text, size)
+
+        # Second line first, then the first line's characters reversed,
+        # with a superscript.
+        chars = [
+            char("d", 0, 0),
+            char("e", 6, 0),
+            char("c", 12, 13, size=6),
+            char("b", 6, 12),
+            char("a", 0, 12),
+        ]
+        self.assertEqual(
+            [[c.text for c in line] for line in reading_lines(chars)],
+            [["a", "b", "c"], ["d", "e"]])
+
+
+
+class TestCellText(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    @staticmethod
+    def line(text, y0, x0=0, size=10):
+        return [
+            Char(x0 + i * 6, x0 + i * 6 + 6, y0, y0 + size, c, size)
+            for (i, c) in enumerate(text)
+        ]
+
+    def test_lines(self):
+        chars = self.line("the Caribbean ", 0) + self.line("Central America and ", 12)
+        self.assertEqual(cell_text(chars), "Central America and\nthe Caribbean")
+        self.assertEqual(
+            cell_text(chars, line_break=" "), "Central America and the Caribbean")
+
+    def test_overlapping_lines(self):
+        # A superscript overlapping its line is not broken from it.
+        chars = self.line("x", 0) + self.line("2", 7, x0=6, size=6)
+        self.assertEqual(cell_text(chars), "x2")
+
+    def test_blank(self):
+        self.assertIsNone(cell_text([]))
+        self.assertEqual(cell_text(self.line("  ", 0)), "")
+        self.assertEqual(cell_text(self.line("a", 0) + self.line(" ", 12)), "a")
+
+    def test_long(self):
+        chars = []
+        for y in range(200):
+            chars += self.line("word %d" % y, -12 * y)
+        random.Random(2).shuffle(chars)
+        self.assertEqual(
+            cell_text(chars),
+            "\n".join("word %d" % y for y in range(200)))
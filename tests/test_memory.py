@@ -0,0 +1,100 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import tempfile
+import unittest
+from subprocess import check_output
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdf2csv import pdf_to_csv_tables
+
+from synthetic import cell_text, write_table_pdf
+
+
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMAGE_SIZE = 200 * 1024
+
+# Extract every page of a PDF in a fresh interpreter, and print the
+# number of tables and the peak RSS in KiB. `ru_maxrss` would include
+# the RSS of the forking test process, so read the high water mark of
+# this process's own memory instead.
+PEAK_RSS_SCRIPT = """
+import sys, logging
+sys.path.insert(0, sys.argv[1])
+logging.basicConfig(level=logging.ERROR)
+from pdf2csv import pdf_to_csv_tables
+tables = 0
+for table in pdf_to_csv_tables(
+        sys.argv[2], extraction="chars", memory_map=True):
+    tables += 1
+with open("/proc/self/status") as fp:
+    rss = [line.split()[1] for line in fp if line.startswith("VmHWM:")][0]
+print(tables, rss)
+"""
+
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"),
+                     "Peak RSS is read from /proc on Linux.")
+class TestMemoryMap(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.tmp = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def write_pdf(self, pages):
+        return write_table_pdf(
+            os.path.join(self.tmp.name, "scan-%d.pdf" % pages),
+            pages=pages, rows=2, cols=2, image_size=IMAGE_SIZE)
+
+    def peak_rss(self, pdf_path):
+        output = check_output(
+            [sys.executable, "-c", PEAK_RSS_SCRIPT, REPO_PATH, pdf_path],
+            universal_newlines=True)
+        (tables, rss) = output.split()
+        return (int(tables), int(rss) * 1024)
+
+    def test_rows(self):
+        pdf_path = self.write_pdf(3)
+        self.assertEqual(
+            list(pdf_to_csv_tables(pdf_path, memory_map=True)),
+            list(pdf_to_csv_tables(pdf_path)))
+        self.assertEqual(
+            list(pdf_to_csv_tables(pdf_path, memory_map=True))[2][1][0],
+            cell_text(3, 0, 1, 0))
+
+    def test_bounded_peak_rss(self):
+        short_pages = 20
+        long_pages = 100
+
+        (short_tables, short_rss) = self.peak_rss(self.write_pdf(short_pages))
+        (long_tables, long_rss) = self.peak_rss(self.write_pdf(long_pages))
+
+        self.assertEqual(short_tables, short_pages)
+        self.assertEqual(long_tables, long_pages)
+        # Keeping the extra pages' images would add 16MB.
+        self.assertLess(
+            long_rss - short_rss,
+            (long_pages - short_pages) * IMAGE_SIZE / 4,
+            "peak RSS %d bytes for %d pages and %d bytes for %d pages" % (
+                short_rss, short_pages, long_rss, long_pages))
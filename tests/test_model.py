@@ -0,0 +1,137 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pickle
+import unittest
+
+from pdf2csv import pdf_to_tables, pdf_to_csv_tables
+from pdf2csv.model import Char, Line, BBox, Table, as_char
+from pdf2csv.pdf2csv import table_to_rows
+
+
+
+TEST_PATH = os.path.abspath(os.path.dirname(__file__))
+
+
+
+class TestRecords(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_char_compatibility(self):
+        char = Char(1, 2, 3, 4, "a", 10)
+        self.assertEqual(char["x0"], 1)
+        self.assertEqual(char["text"], "a")
+        self.assertEqual(char.get("fontname"), None)
+        self.assertNotIn("matrix", char)
+        with self.assertRaises(KeyError):
+            char["fontname"]
+        self.assertEqual(
+            dict(char),
+            {"x0": 1, "x1": 2, "y0": 3, "y1": 4, "text": "a", "size": 10})
+        with self.assertRaises(KeyError):
+            char["colour"]
+
+        char = Char(1, 2, 3, 4, "a", 10, fontname="Helvetica")
+        self.assertEqual(char["fontname"], "Helvetica")
+        self.assertIn("fontname", char)
+
+        self.assertEqual(as_char(dict(char)), char)
+
+    def test_pickle(self):
+        for record in (
+                Char(1, 2, 3, 4, "a", 10, matrix=(1, 0, 0, 1, 0, 0)),
+                Line((0, 10), 5),
+                BBox((0, 10), (0, 5)),
+        ):
+            self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+    def test_line(self):
+        self.assertTrue(Line((0, 10), 5).horizontal)
+        self.assertFalse(Line(5, (0, 10)).horizontal)
+
+    def test_table_to_rows_dict_chars(self):
+        table = {
+            "bbox": BBox((0, 20), (0, 10)),
+            "x_lines": [Line((0, 20), 0), Line((0, 20), 10)],
+            "y_lines": [Line(0, (0, 10)), Line(10, (0, 10)), Line(20, (0, 10))],
+        }
+        chars = [
+            {"x0": 2, "x1": 4, "y0": 2, "y1": 8, "text": "a"},
+            {"x0": 12, "x1": 14, "y0": 2, "y1": 8, "text": "b"},
+        ]
+        self.assertEqual(table_to_rows(table, chars), [["a", "b"]])
+        self.assertEqual(
+            table_to_rows(table, [as_char(char) for char in chars]),
+            [["a", "b"]])
+
+
+
+class TestTable(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_lazy_rows(self):
+        calls = []
+
+        def cells():
+            calls.append(None)
+            return {"rows": [["a", None]], "char_counts": [[1, 0]]}
+
+        table = Table(2, 0, BBox(x=(0, 10), y=(0, 5)), [0, 5, 10], [0, 5], cells)
+        self.assertFalse(table.materialized)
+        self.assertEqual(table.y_splits, [0, 5])
+        self.assertEqual(calls, [])
+
+        self.assertEqual(table.rows, [["a", None]])
+        self.assertEqual(table.char_counts, [[1, 0]])
+        self.assertTrue(table.materialized)
+        self.assertEqual(len(calls), 1)
+
+        # A sequence of rows, equal to the list of rows.
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table[0], ["a", None])
+        self.assertEqual(list(table), [["a", None]])
+        self.assertEqual(table, [["a", None]])
+        self.assertNotEqual(table, [])
+
+        copy = pickle.loads(pickle.dumps(table))
+        self.assertEqual(copy, table)
+        self.assertEqual(copy.bbox, table.bbox)
+        self.assertEqual(copy.char_counts, [[1, 0]])
+
+    def test_case(self):
+        pdf_path = os.path.join(TEST_PATH, "cases", "eu-20th-1020.pdf")
+        tables = list(pdf_to_tables(pdf_path, border_width=1.5))
+
+        self.assertEqual([(t.page, t.index) for t in tables], [(1, 0), (1, 1)])
+        self.assertFalse(any(t.materialized for t in tables))
+        self.assertEqual(
+            [t.rows for t in tables],
+            list(pdf_to_csv_tables(pdf_path, border_width=1.5)))
+
+        for table in tables:
+            self.assertEqual(
+                [len(row) for row in table.char_counts],
+                [len(row) for row in table.rows])
+            for (counts, row) in zip(table.char_counts, table.rows):
+                for (count, text) in zip(counts, row):
+                    self.assertGreaterEqual(count, len(text or ""))
+            self.assertTrue(
+                min(table.bbox["x"]) <= table.x_splits[0] and
+                table.x_splits[-1] <= max(table.bbox["x"]))
@@ -0,0 +1,106 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdfdocument import PDFDocument
+
+from pdf2csv import pdf_to_csv_tables
+from pdf2csv.pages import parse_page_range, resolve_page_ranges, \
+    count_pages, iter_pages
+
+from synthetic import write_table_pdf, cell_text
+
+
+
+class TestPageRange(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_parse(self):
+        self.assertEqual(parse_page_range(None), [(None, None)])
+        self.assertEqual(parse_page_range(" "), [(None, None)])
+        self.assertEqual(parse_page_range("7"), [(7, 7)])
+        self.assertEqual(parse_page_range("2-9"), [(2, 9)])
+        self.assertEqual(
+            parse_page_range("1,5,9-12,40-"),
+            [(1, 1), (5, 5), (9, 12), (40, None)])
+        self.assertEqual(parse_page_range("-3"), [(None, 3)])
+
+    def test_parse_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_page_range("a-b")
+        with self.assertRaises(ValueError):
+            parse_page_range("1-2-3")
+
+    def test_resolve(self):
+        self.assertEqual(resolve_page_ranges(None, 3), [1, 2, 3])
+        self.assertEqual(
+            resolve_page_ranges(parse_page_range("1,5,9-12,40-"), 42),
+            [1, 5, 9, 10, 11, 12, 40, 41, 42])
+        self.assertEqual(resolve_page_ranges([(5, 9)], 3), [])
+
+
+
+class TestIterPages(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.pdf_path = write_table_pdf(
+            os.path.join(cls.tmp.name, "tree.pdf"),
+            pages=40, rows=2, cols=2, fanout=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_iter_pages(self):
+        with open(self.pdf_path, "rb") as fp:
+            document = PDFDocument(PDFParser(fp))
+            self.assertEqual(count_pages(document), 40)
+            all_pages = list(PDFPage.create_pages(document))
+            for page_numbers in ([1], [40], [2, 3, 17, 28, 29, 40], range(1, 41)):
+                pages = list(iter_pages(document, page_numbers))
+                self.assertEqual([p for p, _page in pages], list(page_numbers))
+                self.assertEqual(
+                    [page.pageid for _p, page in pages],
+                    [all_pages[p - 1].pageid for p in page_numbers])
+                self.assertEqual(
+                    [page.mediabox for _p, page in pages],
+                    [all_pages[p - 1].mediabox for p in page_numbers])
+
+    def test_prepass(self):
+        pdf_path = write_table_pdf(
+            os.path.join(self.tmp.name, "prose.pdf"),
+            pages=6, rows=2, cols=2, prose_pages=2)
+        self.assertEqual(
+            list(pdf_to_csv_tables(pdf_path, prepass=True)),
+            list(pdf_to_csv_tables(pdf_path)))
+
+    def test_page_ranges(self):
+        tables = list(pdf_to_csv_tables(
+            self.pdf_path, page_ranges=parse_page_range("2,9-10,39-")))
+        self.assertEqual(
+            [table[0][0] for table in tables],
+            [cell_text(p, 0, 0, 0) for p in (2, 9, 10, 39, 40)])
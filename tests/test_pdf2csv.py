@@ -15,12 +15,19 @@ import os
 import csv
 import sys
 import argparse
+import tempfile
 import unittest
 from subprocess import Popen, PIPE
 
 sys.path.append("../")
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdfminer.layout import LTCurve, LTLine
 
 from pdf2csv import pdf_to_csv_tables
+from pdf2csv.pdf2csv import element_segments, extract_page_elements
+
+from synthetic import RULINGS, cell_text, write_table_pdf
 
 
 
@@ -34,7 +41,7 @@ class TestApi(unittest.TestCase):
     def setUpClass(cls):
         cls.longMessage = True
 
-    def compare_known_result(self, name):
+    def compare_known_result(self, name, **kwargs):
         pdf_path = os.path.join(TEST_PATH, "cases/{name}.pdf".format(name=name))
         csv_known_path = os.path.join(TEST_PATH, "cases/{name}.csv".format(name=name))
 
@@ -42,16 +49,17 @@ class TestApi(unittest.TestCase):
             reader = csv.reader(fp)
             known_rows = [[v or None for v in row] for row in reader]
 
-        kwargs = {
+        kwargs.update({
             "border_width": 1.5,
-        }
+        })
 
         test_rows = []
         for t, table in enumerate(pdf_to_csv_tables(pdf_path, **kwargs)):
             if t:
                 test_rows.append([])
             for row in table:
-                test_rows.append(row)
+                # CSV does not distinguish empty cells from blank ones.
+                test_rows.append([v or None for v in row])
 
         self.assertEqual(len(known_rows), len(test_rows))
         self.assertEqual(known_rows, test_rows)
@@ -68,6 +76,80 @@ class TestApi(unittest.TestCase):
         name = "eu-20th-1020"
         self.compare_known_result(name)
 
+    def test_eu_20th_204_workers(self):
+        name = "eu-20th-204"
+        self.compare_known_result(name, workers=2)
+
+    def test_eu_20th_333_prepass(self):
+        name = "eu-20th-333"
+        self.compare_known_result(name, prepass=True)
+
+    def test_eu_20th_1020_chars(self):
+        name = "eu-20th-1020"
+        self.compare_known_result(name, extraction="chars")
+
+    def test_invalid_extraction(self):
+        pdf_path = os.path.join(TEST_PATH, "cases/eu-20th-204.pdf")
+        with self.assertRaises(ValueError):
+            list(pdf_to_csv_tables(pdf_path, extraction="glyphs"))
+        with self.assertRaises(ValueError):
+            extract_page_elements(None, char_fields=["colour"])
+
+
+
+class TestRulings(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.tmp = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_rulings(self):
+        expected = [
+            [[cell_text(1, t, r, c) for c in range(3)] for r in range(4)]
+            for t in range(2)
+        ]
+        for ruling in RULINGS:
+            pdf_path = write_table_pdf(
+                os.path.join(self.tmp.name, "%s.pdf" % ruling),
+                rows=4, cols=3, tables=2, ruling=ruling)
+            for prepass in (False, True):
+                self.assertEqual(
+                    list(pdf_to_csv_tables(pdf_path, prepass=prepass)),
+                    expected,
+                    "%s prepass=%s" % (ruling, prepass)
+                )
+
+    def test_line_segments(self):
+        self.assertEqual(
+            element_segments(LTLine(1, (10, 5), (0, 5))), [(0, 5, 0, 10)])
+        self.assertEqual(
+            element_segments(LTLine(1, (3, 0), (3, 10))), [(1, 3, 0, 10)])
+        self.assertEqual(element_segments(LTLine(1, (0, 0), (10, 10))), [])
+
+    def test_curve_segments(self):
+        path = [
+            ("m", (0, 0)),
+            ("l", (10, 0)),
+            ("c", (12, 0), (12, 2), (12, 4)),
+            ("l", (12, 10)),
+            ("l", (20, 20)),
+            ("h",),
+        ]
+        pts = [(0, 0), (10, 0), (12, 4), (12, 10), (20, 20), (0, 0)]
+        self.assertEqual(
+            element_segments(LTCurve(1, pts, original_path=path)),
+            [(0, 0, 0, 10), (1, 12, 4, 10)]
+        )
+        self.assertEqual(
+            element_segments(LTCurve(1, pts)),
+            [(0, 0, 0, 10), (1, 12, 4, 10)]
+        )
+
 
 
 class TestCli(unittest.TestCase):
@@ -0,0 +1,299 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import sys
+import json
+import socket
+import tempfile
+import unittest
+import threading
+import http.client
+import multiprocessing
+import unittest.mock
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdf2csv import pdf_to_stream
+from pdf2csv.serve import WorkerPool, ServiceBusy, ConversionTimeout, \
+    PipeOutput, RequestHandler, create_server
+
+from synthetic import write_table_pdf
+
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+
+def expected_output(pdf_path, output_format="csv", **kwargs):
+    out = io.StringIO()
+    pdf_to_stream(pdf_path, out, output_format, **kwargs)
+    return out.getvalue().encode("utf-8")
+
+
+
+class ServerTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.pdf_path = write_table_pdf(
+            os.path.join(cls.tmp.name, "table.pdf"), pages=3, rows=4, cols=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def start(self, pool, **kwargs):
+        server = create_server(pool, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            pool.close()
+            thread.join()
+
+        self.addCleanup(stop)
+        return server
+
+    def connect(self, server):
+        if isinstance(server.server_address, str):
+            return UnixHTTPConnection(server.server_address)
+        return http.client.HTTPConnection(*server.server_address[:2])
+
+    def request(self, server, method, url, body=None):
+        connection = self.connect(server)
+        try:
+            connection.request(method, url, body=body)
+            response = connection.getresponse()
+            return (response.status, response.read())
+        finally:
+            connection.close()
+
+
+
+class TestServer(ServerTestCase):
+
+    def setUp(self):
+        self.server = self.start(WorkerPool(workers=2), port=0)
+
+    def test_convert_body(self):
+        with open(self.pdf_path, "rb") as fp:
+            (status, body) = self.request(
+                self.server, "POST", "/convert", fp.read())
+        self.assertEqual(status, 200)
+        self.assertEqual(body, expected_output(self.pdf_path))
+
+    def test_convert_path(self):
+        (status, body) = self.request(
+            self.server, "POST",
+            "/convert?path=%s&pages=2-3&format=jsonl" % self.pdf_path)
+        self.assertEqual(status, 200)
+        self.assertEqual(body, expected_output(
+            self.pdf_path, "jsonl", page_ranges=[(2, 3)]))
+        self.assertEqual(
+            json.loads(body.splitlines()[0])["page"], 2)
+
+    def test_errors(self):
+        (status, _body) = self.request(
+            self.server, "POST", "/convert?border=1", b"")
+        self.assertEqual(status, 400)
+        (status, _body) = self.request(
+            self.server, "POST", "/convert?format=xls", b"")
+        self.assertEqual(status, 400)
+        (status, _body) = self.request(
+            self.server, "POST", "/convert?path=/no/such.pdf")
+        self.assertEqual(status, 404)
+        (status, body) = self.request(
+            self.server, "POST", "/convert", b"Not a PDF")
+        self.assertEqual(status, 422)
+        self.assertIn("PDFSyntaxError", json.loads(body)["error"])
+
+        # Workers survive failed conversions.
+        (status, body) = self.request(self.server, "GET", "/health")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["killed"], 0)
+
+    def test_short_body(self):
+        sock = socket.create_connection(self.server.server_address[:2])
+        try:
+            sock.sendall(
+                b"POST /convert HTTP/1.1\r\nHost: localhost\r\n"
+                b"Content-Length: 100\r\n\r\n%PDF-1.4")
+            sock.shutdown(socket.SHUT_WR)
+            response = http.client.HTTPResponse(sock)
+            response.begin()
+            self.assertEqual(response.status, 400)
+            self.assertIn("ended early", json.loads(response.read())["error"])
+            self.assertTrue(response.will_close)
+        finally:
+            sock.close()
+
+    def test_stalled_body(self):
+        sock = socket.create_connection(self.server.server_address[:2])
+        try:
+            with unittest.mock.patch.object(RequestHandler, "timeout", 0.2):
+                sock.sendall(
+                    b"POST /convert HTTP/1.1\r\nHost: localhost\r\n"
+                    b"Content-Length: 100\r\n\r\n%PDF-1.4")
+                response = http.client.HTTPResponse(sock)
+                response.begin()
+            self.assertEqual(response.status, 408)
+            self.assertTrue(response.will_close)
+        finally:
+            sock.close()
+
+    def test_concurrent(self):
+        results = []
+
+        def convert():
+            results.append(self.request(
+                self.server, "POST", "/convert?path=%s" % self.pdf_path))
+
+        threads = [threading.Thread(target=convert) for _t in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            results, [(200, expected_output(self.pdf_path))] * 6)
+
+
+
+class TestPaths(ServerTestCase):
+
+    def test_remote(self):
+        server = self.start(WorkerPool(workers=1), host="0.0.0.0", port=0)
+        connection = http.client.HTTPConnection(
+            "127.0.0.1", server.server_address[1])
+        try:
+            connection.request(
+                "POST", "/convert?path=%s" % self.pdf_path)
+            response = connection.getresponse()
+            self.assertEqual(response.status, 403)
+        finally:
+            connection.close()
+
+    def test_root(self):
+        server = self.start(
+            WorkerPool(workers=1), host="0.0.0.0", port=0,
+            path_root=self.tmp.name)
+
+        def convert(pdf_path):
+            connection = http.client.HTTPConnection(
+                "127.0.0.1", server.server_address[1])
+            try:
+                connection.request("POST", "/convert?path=%s" % pdf_path)
+                response = connection.getresponse()
+                return (response.status, response.read())
+            finally:
+                connection.close()
+
+        self.assertEqual(
+            convert("table.pdf"), (200, expected_output(self.pdf_path)))
+        self.assertEqual(
+            convert(self.pdf_path), (200, expected_output(self.pdf_path)))
+        self.assertEqual(convert("../table.pdf")[0], 403)
+        self.assertEqual(convert("/etc/passwd")[0], 403)
+
+
+
+class TestUnixSocket(ServerTestCase):
+
+    def test_convert(self):
+        socket_path = os.path.join(self.tmp.name, "pdf2csv.sock")
+        server = self.start(WorkerPool(workers=1), socket_path=socket_path)
+        (status, body) = self.request(
+            server, "POST", "/convert?path=%s" % self.pdf_path)
+        self.assertEqual(status, 200)
+        self.assertEqual(body, expected_output(self.pdf_path))
+
+        with self.assertRaises(OSError):
+            create_server(WorkerPool(workers=0), socket_path=socket_path)
+
+
+
+class TestWorkerPool(ServerTestCase):
+
+    def test_pipe_output(self):
+        (parent_conn, child_conn) = multiprocessing.Pipe()
+        self.addCleanup(parent_conn.close)
+        self.addCleanup(child_conn.close)
+
+        out = PipeOutput(child_conn)
+        out.write("a")
+        out.write(b"b")
+        self.assertFalse(out.closed)
+        out.close()
+        self.assertTrue(out.closed)
+        self.assertEqual(parent_conn.recv(), ("data", b"ab"))
+
+    def test_recycle(self):
+        pool = WorkerPool(workers=1, max_documents=2)
+        self.addCleanup(pool.close)
+
+        pids = []
+        for _d in range(5):
+            pids.append(pool.idle.queue[0].process.pid)
+            self.assertEqual(
+                b"".join(pool.convert(self.pdf_path)),
+                expected_output(self.pdf_path))
+
+        self.assertEqual(len(set(pids)), 3)
+        self.assertEqual(pool.state()["recycled"], 2)
+        self.assertEqual(pool.state()["documents"], 5)
+
+    def test_timeout(self):
+        pdf_path = write_table_pdf(
+            os.path.join(self.tmp.name, "long.pdf"), pages=40, rows=40, cols=10)
+        pool = WorkerPool(workers=1)
+        self.addCleanup(pool.close)
+
+        with self.assertRaises(ConversionTimeout):
+            b"".join(pool.convert(pdf_path, timeout=0.2))
+        self.assertEqual(pool.state()["killed"], 1)
+
+        # The worker was replaced.
+        self.assertEqual(
+            b"".join(pool.convert(self.pdf_path, timeout=60)),
+            expected_output(self.pdf_path))
+
+    def test_busy(self):
+        pool = WorkerPool(workers=1, max_queue=0)
+        self.addCleanup(pool.close)
+
+        chunks = pool.convert(self.pdf_path)
+        next(chunks)
+        with self.assertRaises(ServiceBusy):
+            next(pool.convert(self.pdf_path))
+
+        # Abandoning a conversion kills its worker.
+        chunks.close()
+        self.assertEqual(pool.state()["killed"], 1)
+        self.assertEqual(
+            b"".join(pool.convert(self.pdf_path)),
+            expected_output(self.pdf_path))
@@ -0,0 +1,106 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import unittest
+from subprocess import run, PIPE
+
+
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT_PATH = os.path.join(REPO_PATH, "scripts", "pdf2csv")
+
+# Packages that are slow to import and only needed for extraction or
+# for particular output formats.
+HEAVY_PACKAGES = (
+    "pdfminer",
+    "numpy",
+    "pyarrow",
+)
+
+# Most time in microseconds, as reported by `python -X importtime`, to
+# import the `pdf2csv` package. Importing pdfminer, NumPy and pyarrow
+# with it took about 250ms.
+STARTUP_BUDGET_US = 100000
+
+STARTUP_RUNS = 3
+
+
+
+def import_times(args):
+    """
+    Run Python with `-X importtime` and `args`, and return the exit
+    status and a dictionary of the cumulative import time of each
+    module in microseconds.
+    """
+
+    env = dict(os.environ, PYTHONPATH=REPO_PATH)
+    process = run(
+        [sys.executable, "-X", "importtime"] + args,
+        stdout=PIPE, stderr=PIPE, env=env, universal_newlines=True)
+
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        (_self, cumulative, name) = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        times[name.strip()] = int(cumulative)
+    return (process.returncode, times)
+
+
+
+def heavy_modules(times):
+    return sorted(
+        name for name in times
+        if name.split(".")[0] in HEAVY_PACKAGES
+    )
+
+
+
+class TestStartup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_import(self):
+        (status, times) = import_times(["-c", "import pdf2csv"])
+        self.assertEqual(status, 0)
+        self.assertIn("pdf2csv", times)
+        self.assertEqual(heavy_modules(times), [])
+
+    def test_lazy_names(self):
+        (status, times) = import_times(
+            ["-c", "import pdf2csv; pdf2csv.pdf_to_tables"])
+        self.assertEqual(status, 0)
+        self.assertIn("pdfminer", times)
+
+    def test_help(self):
+        for args in (["--help"], ["--no-such-option"]):
+            (status, times) = import_times([SCRIPT_PATH] + args)
+            self.assertEqual(status, 0 if args == ["--help"] else 2, args)
+            self.assertEqual(heavy_modules(times), [], args)
+
+    def test_budget(self):
+        # Take the fastest of several runs to discount a busy machine.
+        best = min(
+            import_times(["-c", "import pdf2csv"])[1]["pdf2csv"]
+            for _run in range(STARTUP_RUNS)
+        )
+        self.assertLess(
+            best, STARTUP_BUDGET_US,
+            "importing pdf2csv took %d us" % best)
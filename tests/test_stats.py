@@ -0,0 +1,92 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdf2csv import pdf_to_csv_tables, pdf_to_csv_stream, Stats
+
+from synthetic import write_table_pdf
+
+
+
+class TestStats(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.pdf_path = write_table_pdf(
+            os.path.join(cls.tmp.name, "table.pdf"),
+            pages=4, rows=3, cols=2, tables=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def check_counts(self, stats):
+        data = json.loads(json.dumps(stats.as_dict()))
+
+        self.assertEqual([page["page"] for page in data["pages"]], [1, 2, 3, 4])
+        for page in data["pages"]:
+            self.assertEqual(page["counts"]["segments"], 14)
+            self.assertEqual(page["counts"]["chars"], 12 * 8)
+            self.assertEqual(page["counts"]["tables"], 2)
+            self.assertEqual(page["counts"]["cells"], 12)
+            self.assertGreater(page["seconds"], 0)
+            self.assertGreater(page["stages"]["interpret"], 0)
+
+        self.assertEqual(data["counts"]["tables"], 8)
+        self.assertEqual(data["counts"]["cells"], 48)
+        self.assertEqual(data["stages"]["interpret"]["calls"], 4)
+        self.assertEqual(data["stages"]["binning"]["calls"], 8)
+
+        return data
+
+    def test_tables(self):
+        stats = Stats()
+        list(pdf_to_csv_tables(self.pdf_path, stats=stats))
+        data = self.check_counts(stats)
+        self.assertNotIn("write", data["stages"])
+
+    def test_stream(self):
+        stats = Stats()
+        pdf_to_csv_stream(self.pdf_path, io.StringIO(), stats=stats)
+        data = self.check_counts(stats)
+        self.assertEqual(data["stages"]["write"]["calls"], 8)
+
+    def test_workers(self):
+        stats = Stats()
+        list(pdf_to_csv_tables(self.pdf_path, workers=2, stats=stats))
+        self.check_counts(stats)
+
+    def test_timer(self):
+        stats = Stats()
+        with stats.timer("grouping"):
+            stats.count("rects", 3)
+        stats.start_page(1)
+        with stats.timer("grouping"):
+            stats.count("rects", 2)
+        stats.end_page(0.5)
+
+        data = stats.as_dict()
+        self.assertEqual(data["stages"]["grouping"]["calls"], 2)
+        self.assertEqual(data["counts"], {"rects": 5})
+        self.assertEqual(data["pages"][0]["counts"], {"rects": 2})
+        self.assertEqual(list(data["pages"][0]["stages"]), ["grouping"])
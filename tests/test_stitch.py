@@ -0,0 +1,169 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import csv
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdf2csv import pdf_to_csv_tables, pdf_to_stream, Table
+from pdf2csv.stitch import stitch_tables
+from pdf2csv.writers import create_writer, write_tables
+
+from synthetic import cell_text, write_table_pdf
+
+
+
+SPLITS = [10, 50, 90]
+
+
+
+def table(p, t, rows, x_splits=SPLITS):
+    return Table(p, t, None, x_splits, [], lambda: {
+        "rows": rows,
+        "char_counts": [[1] * len(row) for row in rows],
+    })
+
+
+
+def continues(tables):
+    return [table.continues for table in tables]
+
+
+
+class TestStitchTables(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_continuation(self):
+        tables = list(stitch_tables([
+            table(1, 0, [["a", "b"]]),
+            table(1, 1, [["c", "d"]]),
+            table(2, 0, [["e", "f"]]),
+            table(3, 0, [["g", "h"]], [10.5, 50, 89.5]),
+            table(3, 1, [["i", "j"]]),
+        ], 1))
+        self.assertEqual(
+            continues(tables), [None, None, (1, 1), (1, 1), None])
+
+    def test_not_continued(self):
+        tables = list(stitch_tables([
+            table(1, 0, [["a", "b"]]),
+            # Not the first table on its page.
+            table(2, 1, [["c", "d"]]),
+            # Not on the following page.
+            table(4, 0, [["e", "f"]]),
+            # Columns differ by more than the border width.
+            table(5, 0, [["g", "h"]], [10, 52, 90]),
+            # Different number of columns.
+            table(6, 0, [["i"]], [10, 90]),
+        ], 1))
+        self.assertEqual(continues(tables), [None] * 5)
+
+    def test_keep_headers(self):
+        tables = list(stitch_tables([
+            table(1, 0, [["H1", "H2"], ["a", "b"]]),
+            table(2, 0, [["H1", "H2"], ["c", "d"]]),
+        ], 1))
+        self.assertEqual(tables[1].rows, [["H1", "H2"], ["c", "d"]])
+
+    def test_drop_headers(self):
+        tables = list(stitch_tables([
+            table(1, 0, [["T", None], ["H1", "H2"], ["a", "b"]]),
+            table(2, 0, [["T", None], ["H1", "H2"], ["c", "d"]]),
+            table(3, 0, [["T", None], ["e", "f"]]),
+            table(4, 0, [["g", "h"]]),
+        ], 1, drop_headers=True))
+        self.assertEqual(
+            [table.rows for table in tables],
+            [
+                [["T", None], ["H1", "H2"], ["a", "b"]],
+                [["c", "d"]],
+                [["e", "f"]],
+                [["g", "h"]],
+            ])
+        self.assertEqual(tables[1].char_counts, [[1, 1]])
+        self.assertEqual(
+            continues(tables), [None, (1, 0), (1, 0), (1, 0)])
+
+
+
+class TestStitchWriters(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def stitched(self):
+        tables = [
+            table(1, 0, [["a", "b"], ["c", "d"]]),
+            table(2, 0, [["e", "f"]]),
+            table(2, 1, [["g"]], [10, 90]),
+        ]
+        return stitch_tables(tables, 1)
+
+    def test_csv(self):
+        out = io.StringIO()
+        write_tables(self.stitched(), create_writer("csv", out))
+        self.assertEqual(
+            list(csv.reader(io.StringIO(out.getvalue()))),
+            [["a", "b"], ["c", "d"], ["e", "f"], [], ["g"]])
+
+    def test_jsonl(self):
+        out = io.StringIO()
+        write_tables(self.stitched(), create_writer("jsonl", out))
+        self.assertEqual(
+            [json.loads(line) for line in out.getvalue().splitlines()], [
+                {"page": 1, "table": 0, "row": 0, "cells": ["a", "b"]},
+                {"page": 1, "table": 0, "row": 1, "cells": ["c", "d"]},
+                {"page": 1, "table": 0, "row": 2, "cells": ["e", "f"]},
+                {"page": 2, "table": 1, "row": 0, "cells": ["g"]},
+            ])
+
+
+
+class TestStitchPdf(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.pdf_path = write_table_pdf(
+            os.path.join(cls.tmp.name, "long.pdf"), pages=3, rows=4, cols=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_csv_tables(self):
+        self.assertEqual(len(list(pdf_to_csv_tables(self.pdf_path))), 3)
+
+        tables = list(pdf_to_csv_tables(self.pdf_path, stitch=True))
+        self.assertEqual(len(tables), 1)
+        self.assertEqual(len(tables[0]), 12)
+        self.assertEqual(tables[0][4][0], cell_text(2, 0, 0, 0))
+        self.assertEqual(tables[0][11][2], cell_text(3, 0, 3, 2))
+
+    def test_stream(self):
+        out = io.StringIO()
+        pdf_to_stream(self.pdf_path, out, "csv", stitch=True)
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertNotIn([], rows)
+        self.assertEqual(len(rows), 12)
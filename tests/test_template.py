@@ -0,0 +1,127 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from pdf2csv import pdf_to_csv_tables, PageTemplate, Stats
+from pdf2csv.template import TEMPLATE_VERSION, signatures_match
+
+from synthetic import write_table_pdf
+
+
+
+class TestSignature(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_match(self):
+        signature = [(0, 10, 5, 5), (0, 0, 0, 20)]
+        self.assertTrue(signatures_match(
+            signature, [(0.5, 10, 5, 5.5), (0, 0, 0, 19)], 1))
+        self.assertFalse(signatures_match(
+            signature, [(0, 10, 5, 5), (0, 0, 0, 22)], 1))
+        self.assertFalse(signatures_match(
+            signature, signature + [(0, 10, 15, 15)], 1))
+
+    def test_unlearned(self):
+        template = PageTemplate()
+        self.assertFalse(template.learned)
+        self.assertIsNone(template.match([], 1))
+
+    def test_version(self):
+        with self.assertRaises(ValueError):
+            PageTemplate.from_dict({
+                "version": TEMPLATE_VERSION + 1,
+                "signature": [],
+                "tables": [],
+            })
+
+
+
+class TestTemplatePdf(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.pdf_path = write_table_pdf(
+            os.path.join(cls.tmp.name, "statement.pdf"),
+            pages=5, rows=6, cols=4)
+        cls.other_path = write_table_pdf(
+            os.path.join(cls.tmp.name, "other.pdf"),
+            pages=2, rows=3, cols=4, tables=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_learn(self):
+        template = PageTemplate()
+        stats = Stats()
+        self.assertEqual(
+            list(pdf_to_csv_tables(
+                self.pdf_path, template=template, stats=stats)),
+            list(pdf_to_csv_tables(self.pdf_path)))
+
+        self.assertTrue(template.learned)
+        self.assertEqual(len(template.tables), 1)
+        self.assertEqual((template.hits, template.misses), (4, 0))
+        self.assertEqual(stats.counts["template_pages"], 4)
+        # Only the page the template was learned from is grouped.
+        self.assertEqual(stats.as_dict()["stages"]["grouping"]["calls"], 1)
+
+    def test_save_load(self):
+        template = PageTemplate()
+        list(pdf_to_csv_tables(self.pdf_path, page_ranges=[(1, 1)],
+                               template=template))
+
+        path = os.path.join(self.tmp.name, "template.json")
+        template.save(path)
+        with open(path, encoding="utf-8") as fp:
+            data = json.load(fp)
+        self.assertEqual(len(data["tables"][0]["x_splits"]), 5)
+        self.assertEqual(len(data["tables"][0]["y_splits"]), 7)
+
+        loaded = PageTemplate.load(path)
+        self.assertEqual(
+            list(pdf_to_csv_tables(self.pdf_path, template=loaded)),
+            list(pdf_to_csv_tables(self.pdf_path)))
+        self.assertEqual((loaded.hits, loaded.misses), (5, 0))
+
+    def test_fallback(self):
+        template = PageTemplate()
+        list(pdf_to_csv_tables(self.pdf_path, page_ranges=[(1, 1)],
+                               template=template))
+
+        self.assertEqual(
+            list(pdf_to_csv_tables(self.other_path, template=template)),
+            list(pdf_to_csv_tables(self.other_path)))
+        self.assertEqual((template.hits, template.misses), (0, 2))
+
+    def test_parallel(self):
+        template = PageTemplate()
+        self.assertEqual(
+            list(pdf_to_csv_tables(
+                self.pdf_path, workers=2, template=template)),
+            list(pdf_to_csv_tables(self.pdf_path)))
+        # Each slice of one page learns its own template, and the first
+        # is kept.
+        self.assertTrue(template.learned)
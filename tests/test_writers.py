@@ -0,0 +1,116 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import csv
+import sys
+import json
+import unittest
+
+sys.path.append("../")
+
+from pdf2csv import pdf_to_tables, pdf_to_stream, Table
+from pdf2csv.writers import pyarrow, create_writer, write_tables
+
+
+
+TEST_PATH = os.path.abspath(os.path.dirname(__file__))
+
+
+
+def table(p, t, rows):
+    return Table(p, t, None, [], [], lambda: {
+        "rows": rows,
+        "char_counts": [],
+    })
+
+
+
+TABLES = [
+    table(1, 0, [["a", "b"], ["c", None]]),
+    table(1, 1, []),
+    table(3, 0, [["d", "e, f"]]),
+]
+
+
+
+class TestWriters(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.longMessage = True
+
+    def test_csv(self):
+        out = io.StringIO()
+        write_tables(TABLES, create_writer("csv", out))
+        self.assertEqual(
+            list(csv.reader(io.StringIO(out.getvalue()))),
+            [["a", "b"], ["c", ""], [], ["d", "e, f"]])
+
+    def test_jsonl(self):
+        out = io.StringIO()
+        write_tables(TABLES, create_writer("jsonl", out))
+        self.assertEqual(
+            [json.loads(line) for line in out.getvalue().splitlines()], [
+                {"page": 1, "table": 0, "row": 0, "cells": ["a", "b"]},
+                {"page": 1, "table": 0, "row": 1, "cells": ["c", None]},
+                {"page": 3, "table": 0, "row": 0, "cells": ["d", "e, f"]},
+            ])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            create_writer("xls", io.StringIO())
+
+    def test_incremental(self):
+        out = io.StringIO()
+        writer = create_writer("jsonl", out)
+
+        def tables():
+            for (i, result) in enumerate(TABLES):
+                # Earlier tables are written before the next is extracted.
+                self.assertEqual(
+                    len(out.getvalue().splitlines()),
+                    sum(len(result) for result in TABLES[:i]))
+                yield result
+
+        write_tables(tables(), writer)
+
+    @unittest.skipIf(pyarrow is None, "Requires pyarrow")
+    def test_arrow(self):
+        out = io.BytesIO()
+        write_tables(TABLES, create_writer("arrow", out))
+        table = pyarrow.ipc.open_stream(out.getvalue()).read_all()
+        self.assertEqual(table.to_pylist(), [
+            {"page": 1, "table": 0, "row": 0, "cells": ["a", "b"]},
+            {"page": 1, "table": 0, "row": 1, "cells": ["c", None]},
+            {"page": 3, "table": 0, "row": 0, "cells": ["d", "e, f"]},
+        ])
+
+    @unittest.skipIf(pyarrow is None, "Requires pyarrow")
+    def test_parquet_case(self):
+        pdf_path = os.path.join(TEST_PATH, "cases", "eu-20th-1020.pdf")
+        out = io.BytesIO()
+        pdf_to_stream(pdf_path, out, "parquet", border_width=1.5)
+
+        out.seek(0)
+        table = pyarrow.parquet.read_table(out)
+        rows = [
+            (row["page"], row["table"], row["row"], row["cells"])
+            for row in table.to_pylist()
+        ]
+        self.assertEqual(rows, [
+            (result.page, result.index, r, cells)
+            for result in pdf_to_tables(pdf_path, border_width=1.5)
+            for (r, cells) in enumerate(result.rows)
+        ])